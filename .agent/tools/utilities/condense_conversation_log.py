@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""Incrementally condense the handoff log into a summary file.
+
+This script is intentionally portable and uses only the Python standard library.
+It reads the append-only log written by update_agent_conversation_log.py and
+never modifies it.
+
+A checkpoint (byte offset into the active segment plus rolling counts per
+agent, status, tag and handoff target) is kept between runs, so each run only
+parses entries appended since the previous one. A run over an unchanged log
+stops after a stat() and a short head read, without parsing anything.
+
+Default paths:
+  Log:        .agent/docs/agent_handoffs/agent_conversation_log.md
+  Summary:    <log dir>/<log stem>.summary.md
+  Checkpoint: .agent/.cache/handoff_condense.json
+
+Usage:
+  python3 condense_conversation_log.py
+  python3 condense_conversation_log.py --recent 20
+  python3 condense_conversation_log.py --full
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tempfile
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# The logger is a sibling script, not an installed module
+_UTILITIES = str(Path(__file__).resolve().parent)
+if _UTILITIES not in sys.path:
+    sys.path.insert(0, _UTILITIES)
+
+from update_agent_conversation_log import (  # noqa: E402
+    DEFAULT_BOUNDARY,
+    DEFAULT_LOG_PATH,
+    boundary_pattern,
+    iter_entries_forward,
+    log_segments,
+    open_segment,
+    parse_entry,
+    strip_boundary,
+)
+
+DEFAULT_STATE_PATH = Path(".agent/.cache/handoff_condense.json")
+DEFAULT_RECENT = 10
+
+# Bytes hashed from the start of the active segment to detect replacement
+HEAD_BYTES = 4096
+
+STATE_VERSION = 2
+
+
+@dataclass
+class CondenseState:
+    """Checkpoint persisted between runs."""
+
+    version: int = STATE_VERSION
+    log: str = ""
+    boundary: str = DEFAULT_BOUNDARY
+    recent_limit: int = DEFAULT_RECENT
+    sealed: List[str] = field(default_factory=list)
+    active_offset: int = 0
+    active_head: str = ""
+    active_head_len: int = 0
+    entries: int = 0
+    first: Optional[str] = None
+    last: Optional[str] = None
+    agents: Dict[str, int] = field(default_factory=dict)
+    statuses: Dict[str, int] = field(default_factory=dict)
+    tags: Dict[str, int] = field(default_factory=dict)
+    handoffs: Dict[str, int] = field(default_factory=dict)
+    recent: List[Dict[str, str]] = field(default_factory=list)
+
+
+@dataclass
+class CondenseResult:
+    """What a run did."""
+
+    parsed: int = 0
+    bytes_read: int = 0
+    rebuilt: bool = False
+    unchanged: bool = False
+
+
+def _segment_key(name: str) -> str:
+    """Compare sealed segments regardless of later gzip compression."""
+    return name[:-3] if name.endswith(".gz") else name
+
+
+def _head_digest(path: Path, length: int) -> str:
+    """Hash the first ``length`` bytes of a (possibly gzipped) segment."""
+    with open_segment(path) as handle:
+        if handle is None:
+            return ""
+        return hashlib.sha1(handle.read(length)).hexdigest()
+
+
+def load_state(state_path: Path) -> Optional[CondenseState]:
+    """Load the checkpoint, or None if missing or from another version."""
+    try:
+        data = json.loads(state_path.read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        return None
+    if data.get("version") != STATE_VERSION:
+        return None
+    known = CondenseState.__dataclass_fields__
+    return CondenseState(**{key: value for key, value in data.items() if key in known})
+
+
+def _write_atomic(path: Path, text: str) -> None:
+    """Write a text file via temp file + rename."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(prefix=path.name + ".", dir=str(path.parent))
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as out:
+            out.write(text)
+        os.replace(tmp_name, path)
+    except BaseException:
+        if os.path.exists(tmp_name):
+            os.unlink(tmp_name)
+        raise
+
+
+def _is_unchanged(state: CondenseState, sealed: List[Path], active: Path) -> bool:
+    """True when nothing was appended or sealed since the checkpoint."""
+    if [_segment_key(p.name) for p in sealed] != [_segment_key(n) for n in state.sealed]:
+        return False
+    try:
+        size = active.stat().st_size
+    except FileNotFoundError:
+        return state.active_offset == 0
+    if size != state.active_offset:
+        return False
+    return _head_digest(active, state.active_head_len) == state.active_head
+
+
+def _consume(
+    state: CondenseState,
+    segment: Path,
+    start: int,
+    recent: int,
+    result: CondenseResult,
+) -> int:
+    """Fold entries from ``start`` onwards into the state; returns the end offset."""
+    pattern = boundary_pattern(state.boundary)
+    end = start
+    with open_segment(segment) as handle:
+        if handle is None:
+            return start
+        for offset, raw in iter_entries_forward(handle, state.boundary, start):
+            end = offset + len(raw)
+            result.bytes_read += len(raw)
+            if not pattern.match(raw):
+                continue
+            text = strip_boundary(raw, state.boundary).strip()
+            if not text:
+                continue
+            entry, _ = parse_entry(text)
+            result.parsed += 1
+            stamp = entry.timestamp.strftime("%Y-%m-%dT%H:%M:%SZ")
+            state.entries += 1
+            state.first = state.first or stamp
+            state.last = stamp
+            for counts, keys in (
+                (state.agents, [entry.agent or "unknown"]),
+                (state.statuses, [entry.status or "unspecified"]),
+                (state.tags, entry.tags),
+                (state.handoffs, [entry.handoff or "unspecified"]),
+            ):
+                for key in keys:
+                    counts[key] = counts.get(key, 0) + 1
+            state.recent.append({
+                "timestamp": stamp,
+                "agent": entry.agent,
+                "handoff": entry.handoff or "",
+                "status": entry.status or "",
+                "summary": entry.summary,
+            })
+            if len(state.recent) > recent:
+                del state.recent[:len(state.recent) - recent]
+        # The scan ran to EOF; this also covers a log that is only a header
+        end = max(end, handle.tell())
+    return end
+
+
+def condense(
+    log_path: Path,
+    state_path: Path,
+    *,
+    boundary: str = DEFAULT_BOUNDARY,
+    recent: int = DEFAULT_RECENT,
+    full: bool = False,
+) -> Tuple[CondenseState, CondenseResult]:
+    """Bring the checkpoint up to date with the log."""
+    result = CondenseResult()
+    segments = log_segments(log_path)
+    sealed, active = segments[:-1], segments[-1]
+
+    state = None if full else load_state(state_path)
+    if state is not None and (
+        state.log != str(log_path)
+        or state.boundary != boundary
+        or state.recent_limit != recent
+    ):
+        # Another log, boundary or recent-list length: the summary must change
+        state = None
+    if state is not None and _is_unchanged(state, sealed, active):
+        result.unchanged = True
+        return state, result
+
+    done = {_segment_key(name) for name in (state.sealed if state else [])}
+    if state is not None and not done <= {_segment_key(p.name) for p in sealed}:
+        # A processed segment disappeared: the history changed, start over
+        state = None
+        done = set()
+    if state is None:
+        state = CondenseState(log=str(log_path), boundary=boundary, recent_limit=recent)
+        result.rebuilt = True
+
+    resumed = False
+    for segment in sealed:
+        if _segment_key(segment.name) in done:
+            continue
+        start = 0
+        if (
+            not resumed
+            and state.active_head_len
+            and _head_digest(segment, state.active_head_len) == state.active_head
+        ):
+            # This segment was the active log at the last checkpoint
+            start = state.active_offset
+            resumed = True
+        _consume(state, segment, start, recent, result)
+        state.sealed.append(segment.name)
+
+    start = 0
+    if not resumed and state.active_head_len:
+        if not active.exists() or _head_digest(active, state.active_head_len) != state.active_head:
+            # The previously active log was replaced, not sealed: start over
+            return condense(log_path, state_path, boundary=boundary, recent=recent, full=True)
+        start = state.active_offset
+    if start > (active.stat().st_size if active.exists() else 0):
+        return condense(log_path, state_path, boundary=boundary, recent=recent, full=True)
+    state.active_offset = _consume(state, active, start, recent, result)
+    state.active_head_len = min(HEAD_BYTES, state.active_offset)
+    state.active_head = _head_digest(active, state.active_head_len)
+    return state, result
+
+
+def _count_table(title: str, label: str, counts: Dict[str, int]) -> List[str]:
+    lines = [f"## {title}", ""]
+    if not counts:
+        return lines + ["(none)", ""]
+    lines += [f"| {label} | Entries |", "|---|---|"]
+    for key, count in Counter(counts).most_common():
+        lines.append(f"| {key} | {count} |")
+    return lines + [""]
+
+
+def render_summary(state: CondenseState) -> str:
+    """Render the summary markdown from the checkpoint."""
+    lines = [
+        "# Handoff Log Summary",
+        "",
+        f"Generated by condense_conversation_log.py from `{state.log}`.",
+        "Do not edit; rerun the script to refresh. The source log is unchanged.",
+        "",
+        f"- Entries: {state.entries}",
+        f"- First entry: {state.first or 'n/a'}",
+        f"- Last entry: {state.last or 'n/a'}",
+        f"- Sealed segments: {len(state.sealed)}",
+        "",
+    ]
+    lines += _count_table("Agents", "Agent", state.agents)
+    lines += _count_table("Status", "Status", state.statuses)
+    lines += _count_table("Tags", "Tag", state.tags)
+    lines += _count_table("Handoff Targets", "HandoffTo", state.handoffs)
+    lines += [f"## Recent Entries (last {len(state.recent)})", ""]
+    for item in reversed(state.recent):
+        target = f" -> {item['handoff']}" if item.get("handoff") else ""
+        status = f" [{item['status']}]" if item.get("status") else ""
+        lines.append(f"- {item['timestamp']} {item['agent']}{target}{status}: {item['summary']}")
+    return "\n".join(lines).rstrip() + "\n"
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the argument parser."""
+    parser = argparse.ArgumentParser(
+        description=(
+            "Summarize the handoff log into a separate file, processing only "
+            "entries appended since the last run."
+        ),
+    )
+    parser.add_argument(
+        "--logfile", type=Path, default=DEFAULT_LOG_PATH,
+        help=f"Log file path (default: {DEFAULT_LOG_PATH}).",
+    )
+    parser.add_argument(
+        "--output", type=Path, default=None,
+        help="Summary file (default: <log dir>/<log stem>.summary.md).",
+    )
+    parser.add_argument(
+        "--state", type=Path, default=DEFAULT_STATE_PATH,
+        help=f"Checkpoint file (default: {DEFAULT_STATE_PATH}).",
+    )
+    parser.add_argument(
+        "--boundary", default=DEFAULT_BOUNDARY,
+        help="Boundary marker between entries.",
+    )
+    parser.add_argument(
+        "--recent", type=int, default=DEFAULT_RECENT,
+        help=f"Number of recent entries listed in the summary (default: {DEFAULT_RECENT}).",
+    )
+    parser.add_argument(
+        "--full", action="store_true",
+        help="Ignore the checkpoint and rescan the whole log.",
+    )
+    parser.add_argument(
+        "--quiet", action="store_true",
+        help="Suppress console output.",
+    )
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Main entry point."""
+    args = build_parser().parse_args(argv)
+    log_path: Path = args.logfile
+    output: Path = args.output or log_path.with_name(log_path.stem + ".summary.md")
+
+    state, result = condense(
+        log_path,
+        args.state,
+        boundary=args.boundary,
+        recent=max(args.recent, 0),
+        full=args.full,
+    )
+    if result.unchanged and output.exists():
+        if not args.quiet:
+            print(f"No new entries since last run; {output} is up to date.")
+        return 0
+
+    _write_atomic(output, render_summary(state))
+    _write_atomic(args.state, json.dumps(asdict(state), indent=2, sort_keys=True) + "\n")
+    if not args.quiet:
+        mode = "full scan" if result.rebuilt else "incremental"
+        print(
+            f"Condensed {result.parsed} new entries ({result.bytes_read} bytes, {mode}); "
+            f"{state.entries} total."
+        )
+        print(f"Summary: {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,28 +8,122 @@ Default paths:
   Task:     .agent/task.md
   Plan:     .agent/implementation_plan.md
   Persona:  .gemini/personas/auditor.md
+  Cache:    .agent/.cache/audits/ (keyed on prompt, persona and model)
+  Env:      .agent/.cache/gemini_env.json (node/gemini checks, GEMINI_ENV_TTL)
+  Baseline: .agent/.cache/audit_baselines/ (last audited task/plan, for delta audits)
+  Worker:   .agent/.cache/gemini_audit.sock (see --serve)
 
 Usage:
   python3 gemini_audit.py --auto
   python3 gemini_audit.py --task .agent/task.md --plan .agent/implementation_plan.md
   python3 gemini_audit.py --model gemini-2.5-flash --auto
+  python3 gemini_audit.py --batch audits.jsonl --workers 4
+  python3 gemini_audit.py --agent-glob '/srv/repos/*/.agent'
+  python3 gemini_audit.py --serve &   # later audits use the warm worker
 """
 
 from __future__ import annotations
 
 import argparse
+import difflib
+import glob
+import hashlib
+import json
 import os
 import re
+import shutil
+import socket
+import socketserver
 import subprocess
 import sys
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional
+from typing import Deque, Dict, List, Optional, Tuple
+
+try:
+    import update_agent_conversation_log as handoff_log
+except ImportError:  # copied without the logger: fall back to running its script
+    handoff_log = None  # type: ignore[assignment]
 
 # Default paths
 DEFAULT_TASK = Path(".agent/task.md")
 DEFAULT_PLAN = Path(".agent/implementation_plan.md")
 DEFAULT_PERSONA = Path(".gemini/personas/auditor.md")
 DEFAULT_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-pro")
+DEFAULT_TIMEOUT = 120
+DEFAULT_WORKERS = 4
+DEFAULT_REPORT = Path(".reports/gemini_audits.jsonl")
+LOG_RELATIVE_PATH = Path("docs/agent_handoffs/agent_conversation_log.md")
+DEFAULT_CACHE_DIR = Path(".agent/.cache/audits")
+DEFAULT_BASELINE_DIR = Path(".agent/.cache/audit_baselines")
+# A delta prompt larger than this share of the full prompt falls back to a full audit
+DELTA_MAX_RATIO = 0.5
+DELTA_CONTEXT_LINES = 3
+ENV_CACHE_PATH = Path(".agent/.cache/gemini_env.json")
+ENV_CACHE_TTL = float(os.getenv("GEMINI_ENV_TTL", "3600"))
+DEFAULT_WORKER_SOCKET = Path(".agent/.cache/gemini_audit.sock")
+# Variables an audit on the worker takes from the client (model settings, API keys)
+CLIENT_ENV_PREFIXES = ("GEMINI_", "GOOGLE_")
+# A pre-started CLI older than this is replaced (its auth may have gone stale)
+SPARE_MAX_AGE = 600
+# Streaming mode keeps at most this many characters of CLI output
+CAPTURE_LIMIT = 64 * 1024
+READ_CHUNK = 8192
+
+# The lines that follow "Decision:" in the requested output format
+FIELD_PATTERNS = {
+    "rationale": re.compile(r"^\W*Rationale\W*:\s*\S", re.IGNORECASE),
+    "next_action": re.compile(r"^\W*Next action\W*:\s*\S", re.IGNORECASE),
+}
+
+
+@dataclass
+class AuditJob:
+    """One task/plan pair to audit in a batch."""
+
+    job_id: str
+    task: Path
+    plan: Path
+    persona: Path
+    model: str
+    logfile: Optional[Path] = None
+
+
+@dataclass
+class AuditResult:
+    """Outcome of one batch job, written as a line of the JSONL report."""
+
+    job: AuditJob
+    decision: Optional[str]
+    returncode: int
+    elapsed: float
+    output: str
+    cached: bool = False
+    delta: bool = False
+
+    @property
+    def exit_code(self) -> int:
+        return decision_exit_code(self.decision)
+
+    def to_record(self) -> Dict[str, object]:
+        return {
+            "id": self.job.job_id,
+            "task": str(self.job.task),
+            "plan": str(self.job.plan),
+            "model": self.job.model,
+            "decision": self.decision,
+            "exit_code": self.exit_code,
+            "returncode": self.returncode,
+            "elapsed_s": round(self.elapsed, 3),
+            "cached": self.cached,
+            "delta": self.delta,
+            "output": self.output,
+        }
 
 
 def get_node_version() -> Optional[str]:
@@ -48,17 +142,33 @@ def get_node_version() -> Optional[str]:
     return None
 
 
-def check_gemini_installed() -> bool:
-    """Check if Gemini CLI is available and meets requirements."""
-    # Check Node.js version (v20+ required for Gemini CLI)
-    node_ver = get_node_version()
-    if node_ver:
-        major = int(node_ver.split(".")[0])
-        if major < 20:
-            print(f"ERROR: Node.js {node_ver} detected. v20.0.0 or higher is required.", file=sys.stderr)
-            print("Use 'nvm install 22 && nvm use 22' to update your environment.", file=sys.stderr)
-            sys.exit(1)
+def _write_json_atomic(path: Path, data: object) -> None:
+    """Write JSON via temp file + rename."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(prefix=path.name[:16] + ".", dir=str(path.parent))
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as out:
+            json.dump(data, out)
+        os.replace(tmp_name, path)
+    except BaseException:
+        if os.path.exists(tmp_name):
+            os.unlink(tmp_name)
+        raise
+
+
+def _binary_stamp(name: str) -> Optional[List[object]]:
+    """Resolved path and mtime of an executable on PATH, or None."""
+    found = shutil.which(name)
+    if found is None:
+        return None
+    real = os.path.realpath(found)
+    try:
+        return [real, os.stat(real).st_mtime_ns]
+    except OSError:
+        return None
+
 
+def _gemini_version_ok() -> bool:
     try:
         result = subprocess.run(
             ["gemini", "--version"],
@@ -71,6 +181,77 @@ def check_gemini_installed() -> bool:
         return False
 
 
+def probe_environment(
+    cache_path: Path = ENV_CACHE_PATH,
+    ttl: float = ENV_CACHE_TTL,
+) -> Dict[str, object]:
+    """Node.js version and Gemini CLI availability, cached for ``ttl`` seconds.
+
+    The cache is keyed on PATH and the resolved node/gemini binaries with their
+    mtimes, so installing, upgrading or switching versions re-runs the checks.
+    Only a working CLI is cached.
+    """
+    key = {
+        "path": os.environ.get("PATH", ""),
+        "node": _binary_stamp("node"),
+        "gemini": _binary_stamp("gemini"),
+    }
+    if ttl > 0:
+        try:
+            cached = json.loads(cache_path.read_text(encoding="utf-8"))
+            if cached["key"] == key and 0 <= time.time() - float(cached["checked"]) < ttl:
+                return cached
+        except (OSError, ValueError, TypeError, KeyError):
+            pass
+    status: Dict[str, object] = {
+        "key": key,
+        "checked": time.time(),
+        "node_version": get_node_version(),
+        "gemini_ok": _gemini_version_ok(),
+    }
+    if ttl > 0 and status["gemini_ok"]:
+        try:
+            _write_json_atomic(cache_path, status)
+        except OSError:
+            pass
+    return status
+
+
+_cli_lock = threading.Lock()
+_cli_usable: Optional[bool] = None
+
+
+def require_gemini_cli() -> None:
+    """Exit with an install hint unless the Gemini CLI is usable.
+
+    Checked once per process, so batch workers share one check.
+    """
+    global _cli_usable
+    with _cli_lock:
+        if _cli_usable is None:
+            _cli_usable = False     # stays False if an old Node.js exits inside the check
+            _cli_usable = check_gemini_installed()
+            if not _cli_usable:
+                print("ERROR: Gemini CLI not found.", file=sys.stderr)
+                print("Install with: npm install -g @google/gemini-cli", file=sys.stderr)
+    if not _cli_usable:
+        sys.exit(1)
+
+
+def check_gemini_installed() -> bool:
+    """Check if Gemini CLI is available and meets requirements."""
+    status = probe_environment()
+    # Check Node.js version (v20+ required for Gemini CLI)
+    node_ver = status["node_version"]
+    if node_ver:
+        major = int(str(node_ver).split(".")[0])
+        if major < 20:
+            print(f"ERROR: Node.js {node_ver} detected. v20.0.0 or higher is required.", file=sys.stderr)
+            print("Use 'nvm install 22 && nvm use 22' to update your environment.", file=sys.stderr)
+            sys.exit(1)
+    return bool(status["gemini_ok"])
+
+
 def read_file_safe(path: Path) -> str:
     """Read file contents or return placeholder if missing."""
     if path.exists():
@@ -106,6 +287,146 @@ Next action: <what should happen next>
 """
 
 
+_HEADING_RE = re.compile(r"^#{1,6}\s+\S")
+
+
+def _sections(text: str) -> List[Tuple[str, str]]:
+    """Split markdown into (heading, body) pairs; text before the first heading is "(preamble)"."""
+    sections: List[Tuple[str, List[str]]] = [("(preamble)", [])]
+    for line in text.splitlines():
+        if _HEADING_RE.match(line):
+            sections.append((line.strip(), []))
+        else:
+            sections[-1][1].append(line)
+    return [(heading, "\n".join(body)) for heading, body in sections if heading != "(preamble)" or body]
+
+
+def _unchanged_sections(label: str, old: str, new: str) -> List[str]:
+    """Summary lines for sections whose heading and body are identical."""
+    previous = dict(_sections(old))
+    lines = []
+    for heading, body in _sections(new):
+        if previous.get(heading) == body:
+            count = len(body.strip().splitlines())
+            lines.append(f"- {label}: {heading} ({count} line{'' if count == 1 else 's'})")
+    return lines
+
+
+def _unified_diff(old: str, new: str, name: str) -> str:
+    return "".join(difflib.unified_diff(
+        old.splitlines(keepends=True),
+        new.splitlines(keepends=True),
+        fromfile=f"a/{name} (previously audited)",
+        tofile=f"b/{name}",
+        n=DELTA_CONTEXT_LINES,
+    ))
+
+
+def build_delta_prompt(
+    baseline: Dict[str, object],
+    task_content: str,
+    plan_content: str,
+    max_chars: int,
+) -> Optional[str]:
+    """Prompt with the previous decision, unchanged-section summary and changed hunks.
+
+    Returns None when nothing changed or the delta would exceed ``max_chars``,
+    in which case the caller sends the full prompt.
+    """
+    old_task, old_plan = str(baseline.get("task", "")), str(baseline.get("plan", ""))
+    if old_task == task_content and old_plan == plan_content:
+        return None
+    unchanged = (
+        _unchanged_sections("Task", old_task, task_content)
+        + _unchanged_sections("Plan", old_plan, plan_content)
+    )
+    changes = []
+    for title, old, new, name in (
+        ("TASK", old_task, task_content, "task.md"),
+        ("IMPLEMENTATION PLAN", old_plan, plan_content, "implementation_plan.md"),
+    ):
+        diff = _unified_diff(old, new, name)
+        changes.append(f"### {title}\n" + (f"```diff\n{diff.rstrip()}\n```" if diff else "(unchanged)"))
+    nl = "\n"
+    prompt = f"""# PACK HANDOFF: RE-AUDIT REQUEST (REVISION)
+
+The task and plan were audited before ({baseline.get("audited", "unknown time")}) and have since been revised.
+Only the changes are shown; unchanged sections were covered by the previous audit.
+
+## 1. PREVIOUS AUDIT
+Decision: {baseline.get("decision") or "UNKNOWN"}
+Rationale: {baseline.get("rationale") or "(not recorded)"}
+Next action: {baseline.get("next_action") or "(not recorded)"}
+
+## 2. UNCHANGED SECTIONS
+{nl.join(unchanged) if unchanged else "(none)"}
+
+## 3. CHANGES
+{(nl + nl).join(changes)}
+
+## 4. INSTRUCTIONS
+Decide whether the revised plan still (or now) satisfies the task, given the
+previous decision and these changes.
+
+Check for:
+- Whether the changes address the previous rationale and next action
+- Alignment between stated objectives and the changed implementation
+- Missing acceptance criteria, edge cases, security or architectural problems introduced by the changes
+
+Output your decision in this format:
+```
+Decision: {{APPROVE | REJECT | NEEDS_INFO}}
+Rationale: <one sentence>
+Next action: <what should happen next>
+```
+"""
+    return prompt if len(prompt) <= max_chars else None
+
+
+def _baseline_path(baseline_dir: Path, task_path: Path, plan_path: Path) -> Path:
+    name = f"{task_path.resolve()}\0{plan_path.resolve()}".encode("utf-8")
+    return baseline_dir / f"{hashlib.sha256(name).hexdigest()[:24]}.json"
+
+
+def load_baseline(baseline_dir: Path, task_path: Path, plan_path: Path) -> Optional[Dict[str, object]]:
+    """The last audited task/plan contents and decision for this pair, if any."""
+    try:
+        record = json.loads(_baseline_path(baseline_dir, task_path, plan_path).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    return record if isinstance(record, dict) and "task" in record and "plan" in record else None
+
+
+def save_baseline(
+    baseline_dir: Path,
+    task_path: Path,
+    plan_path: Path,
+    task_content: str,
+    plan_content: str,
+    output: str,
+    model: str,
+) -> None:
+    """Remember what was audited; only decided audits become the new baseline."""
+    decision = extract_decision(output)
+    if decision is None:
+        return
+    record = {
+        "task_path": str(task_path),
+        "plan_path": str(plan_path),
+        "task": task_content,
+        "plan": plan_content,
+        "decision": decision,
+        "rationale": _decision_field(output, "rationale"),
+        "next_action": _decision_field(output, "next_action"),
+        "model": model,
+        "audited": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+    try:
+        _write_json_atomic(_baseline_path(baseline_dir, task_path, plan_path), record)
+    except OSError as exc:
+        print(f"Warning: Could not record audit baseline: {exc}", file=sys.stderr)
+
+
 def extract_decision(output: str) -> Optional[str]:
     """Extract the decision from Gemini output."""
     patterns = [
@@ -120,43 +441,515 @@ def extract_decision(output: str) -> Optional[str]:
     return None
 
 
+def audit_cache_key(prompt: str, persona_path: Path, model: str, partial: bool = False) -> str:
+    """Content address of an audit: the prompt, persona file contents and model.
+
+    ``partial`` addresses output cut short by --stop-early or the streaming
+    capture limit, kept apart so a full audit never gets it back.
+    """
+    digest = hashlib.sha256()
+    parts = [prompt.encode("utf-8"), persona_path.read_bytes(), model.encode("utf-8")]
+    if partial:
+        parts.append(b"partial")
+    for part in parts:
+        digest.update(len(part).to_bytes(8, "big"))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+def lookup_cached_audit(
+    cache_dir: Optional[Path],
+    prompt: str,
+    persona_path: Path,
+    model: str,
+    *,
+    refresh: bool = False,
+    partial: bool = False,
+) -> Tuple[Optional[str], Optional[Dict[str, object]]]:
+    """Return (cache key, cached record); the key is None when caching is off."""
+    if cache_dir is None:
+        return None, None
+    key = audit_cache_key(prompt, persona_path, model, partial)
+    if refresh:
+        return key, None
+    try:
+        record = json.loads((cache_dir / f"{key}.json").read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return key, None
+    if not isinstance(record, dict) or not isinstance(record.get("output"), str):
+        return key, None
+    return key, record
+
+
+def store_cached_audit(
+    cache_dir: Optional[Path],
+    key: Optional[str],
+    output: str,
+    returncode: int,
+    model: str,
+    partial: bool = False,
+) -> None:
+    """Cache a completed audit; failed runs and undecided output are not cached.
+
+    ``key`` must come from the matching ``partial`` lookup.
+    """
+    decision = extract_decision(output)
+    if cache_dir is None or key is None or returncode != 0 or decision is None:
+        return
+    record = {
+        "decision": decision,
+        "model": model,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "output": output,
+    }
+    if partial:
+        record["partial"] = True
+    try:
+        _write_json_atomic(cache_dir / f"{key}.json", record)
+    except OSError as exc:
+        print(f"Warning: Could not write audit cache: {exc}", file=sys.stderr)
+
+
+def gemini_command(model: str, yolo: bool) -> List[str]:
+    """Gemini CLI command line for a non-interactive audit."""
+    cmd = ["gemini", "--model", model]
+    if yolo:
+        cmd.append("--yolo")
+    return cmd
+
+
 def run_gemini_audit(
     prompt: str,
     persona_path: Path,
     model: str,
     yolo: bool = True,
+    timeout: float = DEFAULT_TIMEOUT,
 ) -> tuple[str, int]:
     """Run Gemini CLI with the audit prompt."""
     env = os.environ.copy()
     env["GEMINI_SYSTEM_MD"] = str(persona_path)
 
-    cmd = ["gemini", "--model", model]
-    if yolo:
-        cmd.append("--yolo")
-
     try:
         result = subprocess.run(
-            cmd,
+            gemini_command(model, yolo),
             input=prompt,
             capture_output=True,
             text=True,
-            timeout=120,
+            timeout=timeout,
             env=env,
         )
         return result.stdout + result.stderr, result.returncode
     except subprocess.TimeoutExpired:
-        return "ERROR: Gemini CLI timed out after 120 seconds", 1
+        return f"ERROR: Gemini CLI timed out after {timeout:g} seconds", 1
     except FileNotFoundError:
         return "ERROR: Gemini CLI not found. Install with: npm install -g @google/gemini-cli", 1
 
 
+class BoundedCapture:
+    """First and last ``limit // 2`` characters of a stream, plus the decision lines.
+
+    Decision, rationale and next-action lines dropped from the middle are
+    re-inserted after the omission marker so extract_decision() still works.
+    """
+
+    def __init__(self, limit: int = CAPTURE_LIMIT) -> None:
+        self.half = max(1, limit // 2)
+        self.head: List[str] = []
+        self.head_size = 0
+        self.tail: Deque[str] = deque()
+        self.tail_size = 0
+        self.omitted = 0
+        self.dropped_fields: Dict[str, str] = {}
+
+    def add(self, text: str) -> None:
+        if self.head_size < self.half:
+            self.head.append(text)
+            self.head_size += len(text)
+            return
+        self.tail.append(text)
+        self.tail_size += len(text)
+        while self.tail_size > self.half and len(self.tail) > 1:
+            old = self.tail.popleft()
+            self.tail_size -= len(old)
+            self.omitted += len(old)
+            name = _field_name(old)
+            if name is not None:
+                self.dropped_fields.setdefault(name, old)
+
+    def text(self) -> str:
+        parts = list(self.head)
+        if self.omitted:
+            parts.append(f"\n[... {self.omitted} characters omitted ...]\n")
+            parts.extend(line if line.endswith("\n") else line + "\n" for line in self.dropped_fields.values())
+        parts.extend(self.tail)
+        return "".join(parts)
+
+
+def _decision_field(output: str, name: str) -> Optional[str]:
+    """Text of the first rationale / next-action line of the output."""
+    pattern = FIELD_PATTERNS[name]
+    for line in output.splitlines():
+        if pattern.match(line):
+            return line.split(":", 1)[1].strip(" *") or None
+    return None
+
+
+def _field_name(line: str) -> Optional[str]:
+    """Which part of the decision block a line is, if any."""
+    if extract_decision(line):
+        return "decision"
+    for name, pattern in FIELD_PATTERNS.items():
+        if pattern.match(line):
+            return name
+    return None
+
+
+def stream_gemini_audit(
+    prompt: str,
+    persona_path: Path,
+    model: str,
+    yolo: bool = True,
+    timeout: float = DEFAULT_TIMEOUT,
+    *,
+    echo: bool = True,
+    stop_early: bool = False,
+    capture_limit: int = CAPTURE_LIMIT,
+) -> tuple[str, int, bool]:
+    """Run Gemini CLI reading its output as it arrives.
+
+    Output is echoed live (``echo``) and kept in a BoundedCapture. With
+    ``stop_early`` the CLI is stopped once the decision, rationale and next
+    action lines have appeared. Returns (output, returncode, complete);
+    output is not complete when it was stopped early or clipped.
+    """
+    env = os.environ.copy()
+    env["GEMINI_SYSTEM_MD"] = str(persona_path)
+    try:
+        proc = subprocess.Popen(
+            gemini_command(model, yolo),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            env=env,
+        )
+    except FileNotFoundError:
+        return "ERROR: Gemini CLI not found. Install with: npm install -g @google/gemini-cli", 1, True
+
+    timed_out = threading.Event()
+
+    def expire() -> None:
+        timed_out.set()
+        proc.kill()
+
+    watchdog = threading.Timer(timeout, expire)
+    watchdog.daemon = True
+    watchdog.start()
+    capture = BoundedCapture(capture_limit)
+    seen = set()
+    start = time.perf_counter()
+    stopped = False
+    try:
+        try:
+            proc.stdin.write(prompt)  # type: ignore[union-attr]
+            proc.stdin.close()  # type: ignore[union-attr]
+        except BrokenPipeError:
+            pass
+        while True:
+            chunk = proc.stdout.readline(READ_CHUNK)  # type: ignore[union-attr]
+            if not chunk:
+                break
+            capture.add(chunk)
+            if echo:
+                sys.stdout.write(chunk)
+                sys.stdout.flush()
+            name = _field_name(chunk)
+            if name is None or name in seen or (name != "decision" and "decision" not in seen):
+                continue
+            seen.add(name)
+            if name == "decision" and echo:
+                print(f"[decision after {time.perf_counter() - start:.1f} s]", file=sys.stderr)
+            if stop_early and seen == {"decision", *FIELD_PATTERNS}:
+                stopped = True
+                proc.terminate()
+                break
+        try:
+            proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+    finally:
+        watchdog.cancel()
+        proc.stdout.close()  # type: ignore[union-attr]
+
+    returncode, trailer = proc.returncode, ""
+    if timed_out.is_set():
+        returncode, trailer = 1, f"ERROR: Gemini CLI timed out after {timeout:g} seconds"
+    elif stopped:
+        returncode, trailer = 0, "[stopped after the decision block]"
+    complete = not stopped and not capture.omitted
+    if not trailer:
+        return capture.text(), returncode, complete
+    if echo:
+        print(trailer)
+    return capture.text() + "\n" + trailer + "\n", returncode, complete
+
+
+class WarmGeminiPool:
+    """Pre-started Gemini CLI processes waiting on stdin, one per persona/model/yolo.
+
+    The CLI loads Node.js modules and its configuration before it reads the
+    prompt from stdin, so a spare started ahead of time skips that start-up.
+    The next spare is started while the current audit runs. Spares are also
+    kept apart by the client's directory and GEMINI_*/GOOGLE_* variables.
+    """
+
+    def __init__(self, max_age: float = SPARE_MAX_AGE) -> None:
+        self.max_age = max_age
+        self._spares: Dict[Tuple[object, ...], Tuple[subprocess.Popen, float]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(
+        persona_path: Path, model: str, yolo: bool, cwd: Optional[str], env: Optional[Dict[str, str]]
+    ) -> Tuple[object, ...]:
+        st = persona_path.stat()
+        client_env = None if env is None else tuple(sorted(env.items()))
+        return (str(persona_path), st.st_mtime_ns, st.st_size, model, yolo, cwd, client_env)
+
+    @staticmethod
+    def _spawn(
+        persona_path: Path, model: str, yolo: bool, cwd: Optional[str], env: Optional[Dict[str, str]]
+    ) -> subprocess.Popen:
+        full_env = os.environ.copy()
+        if env is not None:
+            # The client's settings replace the worker's own, including an unset API key
+            full_env = {k: v for k, v in full_env.items() if not k.startswith(CLIENT_ENV_PREFIXES)}
+            full_env.update(env)
+        full_env["GEMINI_SYSTEM_MD"] = str(persona_path)
+        return subprocess.Popen(
+            gemini_command(model, yolo),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            cwd=cwd,
+            env=full_env,
+        )
+
+    def _take(self, key: Tuple[object, ...]) -> Optional[subprocess.Popen]:
+        with self._lock:
+            spare = self._spares.pop(key, None)
+        if spare is None:
+            return None
+        proc, started = spare
+        if proc.poll() is None and time.monotonic() - started < self.max_age:
+            return proc
+        proc.kill()
+        proc.communicate()
+        return None
+
+    def _replenish(self, key: Tuple[object, ...], *spawn_args: object) -> None:
+        with self._lock:
+            if key not in self._spares:
+                self._spares[key] = (self._spawn(*spawn_args), time.monotonic())  # type: ignore[arg-type]
+
+    def run(
+        self,
+        prompt: str,
+        persona_path: Path,
+        model: str,
+        yolo: bool,
+        timeout: float,
+        cwd: Optional[str] = None,
+        env: Optional[Dict[str, str]] = None,
+    ) -> Tuple[str, int, bool]:
+        """Run one audit in ``cwd`` with the client's ``env``; returns (output, returncode, warm).
+
+        ``cwd`` and ``env`` default to the worker's own.
+        """
+        spawn_args = (persona_path, model, yolo, cwd, env)
+        try:
+            key = self._key(*spawn_args)
+            proc = self._take(key)
+            warm = proc is not None
+            if proc is None:
+                proc = self._spawn(*spawn_args)
+            self._replenish(key, *spawn_args)
+        except FileNotFoundError as exc:
+            return f"ERROR: {exc}", 1, False
+        try:
+            stdout, stderr = proc.communicate(prompt, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.communicate()
+            return f"ERROR: Gemini CLI timed out after {timeout:g} seconds", 1, warm
+        return stdout + stderr, proc.returncode, warm
+
+    def close(self) -> None:
+        with self._lock:
+            spares, self._spares = list(self._spares.values()), {}
+        for proc, _ in spares:
+            proc.kill()
+            proc.communicate()
+
+
+class _AuditRequestHandler(socketserver.StreamRequestHandler):
+    """One JSON request line in, one JSON reply line out."""
+
+    def handle(self) -> None:
+        line = self.rfile.readline()
+        if not line:
+            return  # liveness probe from _connect_worker
+        try:
+            request = json.loads(line)
+            cwd = request.get("cwd")
+            if cwd is not None and not os.path.isdir(cwd):
+                raise ValueError(f"client directory {cwd} does not exist on the worker")
+            env = request.get("env")
+            if env is not None:
+                env = {str(k): str(v) for k, v in dict(env).items() if str(k).startswith(CLIENT_ENV_PREFIXES)}
+            output, returncode, warm = self.server.pool.run(  # type: ignore[attr-defined]
+                str(request["prompt"]),
+                Path(request["persona"]),
+                str(request["model"]),
+                bool(request.get("yolo", True)),
+                float(request.get("timeout", DEFAULT_TIMEOUT)),
+                cwd,
+                env,
+            )
+            reply: Dict[str, object] = {"output": output, "returncode": returncode, "warm": warm}
+        except (ValueError, KeyError, TypeError, OSError) as exc:
+            reply = {"error": str(exc)}
+        try:
+            self.wfile.write((json.dumps(reply) + "\n").encode("utf-8"))
+        except OSError:
+            pass  # the client gave up (timeout or Ctrl-C)
+
+
+def serve_worker(socket_path: Path, quiet: bool = False) -> None:
+    """Serve audits on a Unix socket until interrupted."""
+    if not hasattr(socket, "AF_UNIX"):
+        raise SystemExit("--serve needs Unix domain sockets, which this platform lacks.")
+    require_gemini_cli()
+    if socket_path.exists():
+        if _connect_worker(socket_path) is not None:
+            raise SystemExit(f"An audit worker is already listening on {socket_path}")
+        socket_path.unlink()
+    socket_path.parent.mkdir(parents=True, exist_ok=True)
+    server = socketserver.ThreadingUnixStreamServer(str(socket_path), _AuditRequestHandler)
+    server.daemon_threads = True
+    server.pool = WarmGeminiPool()  # type: ignore[attr-defined]
+    if not quiet:
+        print(f"Audit worker listening on {socket_path} (Ctrl-C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.pool.close()  # type: ignore[attr-defined]
+        if socket_path.exists():
+            socket_path.unlink()
+
+
+def _connect_worker(socket_path: Path) -> Optional[socket.socket]:
+    if not hasattr(socket, "AF_UNIX") or not socket_path.exists():
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(2)
+        sock.connect(str(socket_path))
+    except OSError:
+        sock.close()
+        return None
+    return sock
+
+
+def run_via_worker(
+    socket_path: Optional[Path],
+    prompt: str,
+    persona_path: Path,
+    model: str,
+    yolo: bool = True,
+    timeout: float = DEFAULT_TIMEOUT,
+) -> Optional[Tuple[str, int]]:
+    """Run the audit on a listening worker; None if there is none (run locally).
+
+    The worker runs the CLI in this process's directory with its GEMINI_* and
+    GOOGLE_* variables (API keys, model settings), as a local run would.
+    """
+    sock = _connect_worker(socket_path) if socket_path is not None else None
+    if sock is None:
+        return None
+    request = {
+        "prompt": prompt,
+        "persona": str(persona_path.resolve()),
+        "model": model,
+        "yolo": yolo,
+        "timeout": timeout,
+        "cwd": os.getcwd(),
+        "env": {k: v for k, v in os.environ.items() if k.startswith(CLIENT_ENV_PREFIXES)},
+    }
+    try:
+        with sock:
+            sock.settimeout(timeout + 10)
+            sock.sendall((json.dumps(request) + "\n").encode("utf-8"))
+            with sock.makefile("rb") as reader:
+                reply = json.loads(reader.readline())
+    except (OSError, ValueError) as exc:
+        print(f"Warning: Audit worker failed ({exc}); running locally", file=sys.stderr)
+        return None
+    if "error" in reply:
+        print(f"Warning: Audit worker error ({reply['error']}); running locally", file=sys.stderr)
+        return None
+    return str(reply["output"]), int(reply["returncode"])
+
+
 def log_audit_result(
     decision: Optional[str],
     output: str,
     task_path: Path,
     plan_path: Path,
+    logfile: Optional[Path] = None,
+    cached: bool = False,
+) -> None:
+    """Log the audit result with the handoff logger, in-process when it can be imported."""
+    summary = f"Audit decision: {decision or 'UNKNOWN'}"
+    if cached:
+        summary += " (cached)"
+    tags = ["cached"] if cached else []
+    notes = ["Decision served from the audit cache; Gemini CLI not run"] if cached else []
+
+    if handoff_log is not None:
+        try:
+            handoff_log.log_handoff(
+                "gemini_auditor",
+                summary,
+                role="reviewer",
+                handoff="human",
+                context="audit",
+                references=[str(task_path), str(plan_path)],
+                tags=tags,
+                notes=notes,
+                logfile=logfile or handoff_log.DEFAULT_LOG_PATH,
+            )
+        except (OSError, SystemExit) as e:
+            print(f"Warning: Failed to log audit result: {e}")
+        return
+
+    _log_audit_result_subprocess(summary, task_path, plan_path, logfile, tags, notes)
+
+
+def _log_audit_result_subprocess(
+    summary: str,
+    task_path: Path,
+    plan_path: Path,
+    logfile: Optional[Path],
+    tags: List[str],
+    notes: List[str],
 ) -> None:
-    """Log the audit result using the existing handoff logging tool."""
+    """Fallback: run update_agent_conversation_log.py in a child interpreter."""
     script_dir = Path(__file__).resolve().parent
     log_script = script_dir / "update_agent_conversation_log.py"
 
@@ -164,8 +957,6 @@ def log_audit_result(
         print(f"Warning: Could not find {log_script} for logging")
         return
 
-    summary = f"Audit decision: {decision or 'UNKNOWN'}"
-
     cmd = [
         sys.executable,
         str(log_script),
@@ -178,6 +969,12 @@ def log_audit_result(
         "--reference", str(plan_path),
         "--quiet",
     ]
+    if logfile is not None:
+        cmd += ["--logfile", str(logfile)]
+    for tag in tags:
+        cmd += ["--tag", tag]
+    for note in notes:
+        cmd += ["--note", note]
 
     try:
         subprocess.run(cmd, check=True, capture_output=True)
@@ -185,6 +982,264 @@ def log_audit_result(
         print(f"Warning: Failed to log audit result: {e}")
 
 
+def decision_exit_code(decision: Optional[str]) -> int:
+    """Exit code for one decision: 0 APPROVE, 1 REJECT, 2 anything else."""
+    if decision == "APPROVE":
+        return 0
+    if decision == "REJECT":
+        return 1
+    return 2
+
+
+def aggregate_exit_code(results: List[AuditResult]) -> int:
+    """1 if any plan was rejected, else 2 if any was not approved, else 0."""
+    codes = {result.exit_code for result in results}
+    if 1 in codes:
+        return 1
+    return 2 if 2 in codes else 0
+
+
+def read_manifest(source: str, args: argparse.Namespace) -> List[AuditJob]:
+    """Read jobs from a JSONL manifest (or STDIN when source is '-').
+
+    Each line is an object with "task" and "plan" paths and optional "id",
+    "persona", "model" and "logfile"; defaults come from the CLI flags.
+    """
+    handle = sys.stdin if source == "-" else None
+    try:
+        if handle is None:
+            handle = open(source, "r", encoding="utf-8")
+    except FileNotFoundError as exc:
+        raise SystemExit(f"Manifest not found: {exc.filename}") from exc
+    jobs: List[AuditJob] = []
+    try:
+        for line_no, line in enumerate(handle, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                if not isinstance(record, dict):
+                    raise ValueError("expected a JSON object")
+                for key in ("task", "plan"):
+                    if not str(record.get(key) or "").strip():
+                        raise ValueError(f"missing required field '{key}'")
+            except ValueError as exc:
+                raise SystemExit(f"Invalid manifest record on line {line_no}: {exc}") from exc
+            logfile = record.get("logfile")
+            jobs.append(AuditJob(
+                job_id=str(record.get("id") or f"line-{line_no}"),
+                task=Path(record["task"]),
+                plan=Path(record["plan"]),
+                persona=Path(record.get("persona") or args.persona),
+                model=str(record.get("model") or args.model),
+                logfile=Path(logfile) if logfile else None,
+            ))
+    finally:
+        if handle is not sys.stdin:
+            handle.close()
+    return jobs
+
+
+def jobs_from_globs(patterns: List[str], args: argparse.Namespace) -> List[AuditJob]:
+    """One job per matching .agent directory, logged to that directory's handoff log.
+
+    A repository's own .gemini/personas/auditor.md is used when present.
+    """
+    jobs: List[AuditJob] = []
+    seen = set()
+    for pattern in patterns:
+        for match in sorted(glob.glob(os.path.expanduser(pattern))):
+            agent_dir = Path(match)
+            if not agent_dir.is_dir() or agent_dir.resolve() in seen:
+                continue
+            seen.add(agent_dir.resolve())
+            persona = agent_dir.parent / DEFAULT_PERSONA
+            jobs.append(AuditJob(
+                job_id=str(agent_dir),
+                task=agent_dir / DEFAULT_TASK.name,
+                plan=agent_dir / DEFAULT_PLAN.name,
+                persona=persona if persona.exists() else args.persona,
+                model=args.model,
+                logfile=agent_dir / LOG_RELATIVE_PATH,
+            ))
+    return jobs
+
+
+@dataclass
+class AuditRun:
+    """What one audit returned and how it was produced."""
+
+    output: str
+    returncode: int
+    cached: bool = False
+    cached_at: Optional[str] = None
+    delta: bool = False
+    prompt_chars: int = 0
+    full_chars: int = 0
+
+
+def execute_audit(
+    task_path: Path,
+    plan_path: Path,
+    persona_path: Path,
+    model: str,
+    *,
+    yolo: bool = True,
+    timeout: float = DEFAULT_TIMEOUT,
+    cache_dir: Optional[Path] = None,
+    refresh: bool = False,
+    worker_socket: Optional[Path] = None,
+    stream: bool = False,
+    stop_early: bool = False,
+    baseline_dir: Optional[Path] = DEFAULT_BASELINE_DIR,
+    full: bool = False,
+    check_cli: bool = False,
+) -> AuditRun:
+    """Answer from the cache, or send a delta or full prompt to the Gemini CLI.
+
+    Results are cached under the full prompt's key, so an unchanged task and
+    plan hit the cache however they were last audited. Output cut short by
+    ``stop_early`` or the streaming capture limit is cached under a separate
+    partial key that only streaming runs read. ``check_cli`` runs the
+    environment check before a local CLI run.
+    """
+    task_content = read_file_safe(task_path)
+    plan_content = read_file_safe(plan_path)
+    prompt = build_audit_prompt(task_content, plan_content)
+    key, hit = lookup_cached_audit(cache_dir, prompt, persona_path, model, refresh=refresh)
+    partial_key = None
+    if stream or stop_early:
+        partial_key, partial_hit = lookup_cached_audit(
+            cache_dir, prompt, persona_path, model, refresh=refresh, partial=True
+        )
+        hit = hit or partial_hit
+    if hit is not None:
+        if baseline_dir is not None:
+            save_baseline(
+                baseline_dir, task_path, plan_path, task_content, plan_content, str(hit["output"]), model
+            )
+        return AuditRun(
+            str(hit["output"]), 0, cached=True, cached_at=str(hit.get("created") or ""),
+            prompt_chars=len(prompt), full_chars=len(prompt),
+        )
+
+    baseline = None
+    if baseline_dir is not None and not full:
+        baseline = load_baseline(baseline_dir, task_path, plan_path)
+    delta_prompt = None
+    if baseline is not None:
+        delta_prompt = build_delta_prompt(
+            baseline, task_content, plan_content, int(len(prompt) * DELTA_MAX_RATIO)
+        )
+    sent = delta_prompt or prompt
+
+    remote = None
+    complete = True
+    if not (stream or stop_early):
+        remote = run_via_worker(worker_socket, sent, persona_path, model, yolo, timeout)
+    if remote is not None:
+        output, returncode = remote
+    else:
+        if check_cli:
+            require_gemini_cli()
+        if stream or stop_early:
+            output, returncode, complete = stream_gemini_audit(
+                sent, persona_path, model, yolo=yolo, timeout=timeout, echo=stream, stop_early=stop_early
+            )
+        else:
+            output, returncode = run_gemini_audit(sent, persona_path, model, yolo=yolo, timeout=timeout)
+
+    if complete:
+        store_cached_audit(cache_dir, key, output, returncode, model)
+    else:
+        store_cached_audit(cache_dir, partial_key, output, returncode, model, partial=True)
+    if baseline_dir is not None and returncode == 0:
+        save_baseline(baseline_dir, task_path, plan_path, task_content, plan_content, output, model)
+    return AuditRun(
+        output, returncode, delta=delta_prompt is not None,
+        prompt_chars=len(sent), full_chars=len(prompt),
+    )
+
+
+def audit_job(
+    job: AuditJob,
+    *,
+    log: bool,
+    **options: object,
+) -> AuditResult:
+    """Audit one task/plan pair; never raises for a failed CLI run.
+
+    A job that cannot be audited (a missing persona, task or plan file, no
+    usable Gemini CLI) gets the decision ERROR and is not logged. ``options``
+    are passed on to execute_audit().
+    """
+    start = time.perf_counter()
+    error = None
+    for label, path in (("Persona", job.persona), ("Task", job.task), ("Plan", job.plan)):
+        if not path.exists():
+            error = f"{label} file not found: {path}"
+            break
+    else:
+        try:
+            run = execute_audit(job.task, job.plan, job.persona, job.model, **options)  # type: ignore[arg-type]
+        except SystemExit as exc:
+            # The CLI check exits after printing why; in a batch that fails this job only
+            error = exc.code if isinstance(exc.code, str) else "Gemini CLI not usable"
+    if error is not None:
+        return AuditResult(job, "ERROR", 1, time.perf_counter() - start, f"ERROR: {error}")
+    decision = extract_decision(run.output)
+    if log:
+        log_audit_result(decision, run.output, job.task, job.plan, logfile=job.logfile, cached=run.cached)
+    return AuditResult(
+        job, decision, run.returncode, time.perf_counter() - start, run.output, run.cached, run.delta
+    )
+
+
+def run_batch(jobs: List[AuditJob], args: argparse.Namespace) -> int:
+    """Audit all jobs over a worker pool, write the JSONL report, return the exit code."""
+    if not jobs:
+        raise SystemExit("No audit jobs found (check --batch / --agent-glob).")
+    workers = max(1, min(args.workers, len(jobs)))
+    report: Path = args.report
+    report.parent.mkdir(parents=True, exist_ok=True)
+    start = time.perf_counter()
+    results: List[AuditResult] = []
+    with report.open("w", encoding="utf-8") as out, ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(
+                audit_job, job,
+                yolo=not args.no_yolo, timeout=args.timeout, log=not args.no_log,
+                cache_dir=None if args.no_cache else args.cache_dir, refresh=args.refresh,
+                worker_socket=None if args.no_worker else args.worker_socket,
+                stop_early=args.stop_early, full=args.full, check_cli=True,
+            )
+            for job in jobs
+        ]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            out.write(json.dumps(result.to_record()) + "\n")
+            out.flush()
+            if not args.quiet:
+                source = "cached" if result.cached else f"{result.elapsed:.1f} s"
+                if result.delta:
+                    source += ", delta"
+                print(f"[{result.decision or 'UNKNOWN':<10}] {result.job.job_id} ({source})")
+
+    elapsed = time.perf_counter() - start
+    code = aggregate_exit_code(results)
+    if not args.quiet:
+        counts: Dict[str, int] = {}
+        for result in results:
+            key = result.decision or "UNKNOWN"
+            counts[key] = counts.get(key, 0) + 1
+        summary = ", ".join(f"{count} {key}" for key, count in sorted(counts.items()))
+        print("-" * 40)
+        print(f"Audited {len(results)} plans in {elapsed:.1f} s with {workers} workers: {summary}")
+        print(f"Report: {report}")
+    return code
+
+
 def build_parser() -> argparse.ArgumentParser:
     """Build the argument parser."""
     parser = argparse.ArgumentParser(
@@ -203,6 +1258,30 @@ Examples:
 
   # Skip logging
   python3 gemini_audit.py --auto --no-log
+
+  # Audit many task/plan pairs, 4 at a time, with a JSONL report
+  python3 gemini_audit.py --batch audits.jsonl --workers 4 --report .reports/audits.jsonl
+
+  # Re-run an audit even if the same prompt was audited before
+  python3 gemini_audit.py --auto --refresh
+
+  # Show the review as it is written; stop once the decision block is out
+  python3 gemini_audit.py --auto --stream --stop-early
+
+  # Re-audit a revised plan from scratch instead of sending only the changes
+  python3 gemini_audit.py --auto --full
+
+  # Keep a worker with a pre-started Gemini CLI; later audits use it
+  python3 gemini_audit.py --serve &
+  python3 gemini_audit.py --auto
+
+  # Audit every repository's .agent directory
+  python3 gemini_audit.py --agent-glob '/srv/repos/*/.agent' --timeout 300
+
+Manifest lines look like:
+  {"id": "api", "task": "api/.agent/task.md", "plan": "api/.agent/implementation_plan.md"}
+
+Batch exit code: 0 if every plan is approved, 1 if any is rejected, 2 otherwise.
         """,
     )
 
@@ -234,6 +1313,83 @@ Examples:
         default=DEFAULT_MODEL,
         help=f"Gemini model to use (default: {DEFAULT_MODEL}).",
     )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=DEFAULT_TIMEOUT,
+        help=f"Seconds before an audit is killed (default: {DEFAULT_TIMEOUT}).",
+    )
+    parser.add_argument(
+        "--batch",
+        metavar="FILE.jsonl",
+        help="Audit every task/plan pair listed in a JSONL manifest ('-' for STDIN).",
+    )
+    parser.add_argument(
+        "--agent-glob",
+        action="append",
+        default=[],
+        metavar="PATTERN",
+        help="Audit the task.md/implementation_plan.md of each matching .agent directory (repeatable).",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help=f"Concurrent audits in batch mode (default: {DEFAULT_WORKERS}).",
+    )
+    parser.add_argument(
+        "--report",
+        type=Path,
+        default=DEFAULT_REPORT,
+        help=f"JSONL report written in batch mode (default: {DEFAULT_REPORT}).",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=DEFAULT_CACHE_DIR,
+        help=f"Audit result cache (default: {DEFAULT_CACHE_DIR}).",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Neither read nor write the audit cache.",
+    )
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Ignore cached results and re-run the audit, updating the cache.",
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Send the whole task and plan even if an earlier version was audited.",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Echo Gemini output as it arrives (runs locally, not on the worker).",
+    )
+    parser.add_argument(
+        "--stop-early",
+        action="store_true",
+        help="Stop the Gemini CLI once Decision, Rationale and Next action are printed.",
+    )
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="Run an audit worker that keeps a Gemini CLI started, until Ctrl-C.",
+    )
+    parser.add_argument(
+        "--worker-socket",
+        type=Path,
+        default=DEFAULT_WORKER_SOCKET,
+        help=f"Worker socket; audits use it when a worker listens (default: {DEFAULT_WORKER_SOCKET}).",
+    )
+    parser.add_argument(
+        "--no-worker",
+        action="store_true",
+        help="Run the Gemini CLI here even if a worker is listening.",
+    )
     parser.add_argument(
         "--no-yolo",
         action="store_true",
@@ -256,12 +1412,17 @@ Examples:
 def main() -> None:
     """Main entry point."""
     args = build_parser().parse_args()
+    cache_dir = None if args.no_cache else args.cache_dir
+    worker_socket = None if args.no_worker else args.worker_socket
 
-    # Check Gemini CLI is installed
-    if not check_gemini_installed():
-        print("ERROR: Gemini CLI not found.", file=sys.stderr)
-        print("Install with: npm install -g @google/gemini-cli", file=sys.stderr)
-        sys.exit(1)
+    if args.serve:
+        serve_worker(args.worker_socket, quiet=args.quiet)
+        return
+
+    if args.batch or args.agent_glob:
+        jobs = read_manifest(args.batch, args) if args.batch else []
+        jobs += jobs_from_globs(args.agent_glob, args)
+        sys.exit(run_batch(jobs, args))
 
     # Check persona file exists
     if not args.persona.exists():
@@ -269,45 +1430,56 @@ def main() -> None:
         print("Run the gemini-cli-init skill to set up Gemini integration.", file=sys.stderr)
         sys.exit(1)
 
-    # Read task and plan
-    task_content = read_file_safe(args.task)
-    plan_content = read_file_safe(args.plan)
-
     if not args.quiet:
         print(f"Task: {args.task}")
         print(f"Plan: {args.plan}")
         print(f"Model: {args.model}")
         print("-" * 40)
 
-    # Build and run audit
-    prompt = build_audit_prompt(task_content, plan_content)
-    output, returncode = run_gemini_audit(
-        prompt,
+    # Answer from cache, or send a delta or full prompt to the CLI
+    run = execute_audit(
+        args.task,
+        args.plan,
         args.persona,
         args.model,
         yolo=not args.no_yolo,
+        timeout=args.timeout,
+        cache_dir=cache_dir,
+        refresh=args.refresh,
+        worker_socket=worker_socket,
+        stream=args.stream,
+        stop_early=args.stop_early,
+        full=args.full,
+        check_cli=True,
     )
+    output = run.output
 
-    # Print output
-    print(output)
+    # Print output (already echoed while streaming)
+    if not (args.stream and not run.cached):
+        print(output)
 
     # Extract and log decision
     decision = extract_decision(output)
 
+    if not args.quiet and (run.cached or run.delta):
+        print("-" * 40)
+        if run.cached:
+            print(f"Cached result from {run.cached_at or 'an earlier run'} (use --refresh to re-run)")
+        else:
+            print(
+                f"Delta audit: sent {run.prompt_chars:,} of {run.full_chars:,} prompt characters "
+                "(use --full for a full audit)"
+            )
+
     if not args.no_log:
-        log_audit_result(decision, output, args.task, args.plan)
+        log_audit_result(decision, output, args.task, args.plan, cached=run.cached)
         if not args.quiet:
             print("-" * 40)
-            print(f"Decision: {decision or 'UNKNOWN'}")
+            print(f"Decision: {decision or 'UNKNOWN'}" + (" (cached)" if run.cached else ""))
             print("Result logged to agent_conversation_log.md")
 
     # Exit with appropriate code
-    if decision == "APPROVE":
-        sys.exit(0)
-    elif decision == "REJECT":
-        sys.exit(1)
-    else:
-        sys.exit(2)
+    sys.exit(decision_exit_code(decision))
 
 
 if __name__ == "__main__":
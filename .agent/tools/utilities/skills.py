@@ -4,15 +4,52 @@
 Usage:
   python3 .agent/tools/utilities/skills.py list
   python3 .agent/tools/utilities/skills.py show <skill-name>
-  python3 .agent/tools/utilities/skills.py search <keyword>
+  python3 .agent/tools/utilities/skills.py search <term> [<term> ...]
+
+Search uses an inverted index (token -> skill -> field -> positions) kept in
+.agent/.cache/skills_index.{json,postings}. Each run re-indexes only the SKILL.md files
+whose mtime or size changed, then ranks skills containing every term with
+BM25, weighting matches in the name and description above the body.
 """
 
 from __future__ import annotations
 
 import argparse
+import bisect
+import json
+import math
+import os
+import re
+import stat
 import sys
+import tempfile
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Iterable, List, Optional, Tuple
+from typing import Dict, Iterable, List, Optional, Tuple
+
+INDEX_RELATIVE_PATH = Path(".agent/.cache/skills_index.json")
+INDEX_VERSION = 1
+
+# Mode for index files, as O_CREAT with 0o644 gives (mkstemp alone gives 0600)
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+INDEX_MODE = 0o644 & ~_UMASK
+
+# Fields indexed per skill and their weight in the ranking
+FIELD_BOOSTS = {"name": 3.0, "description": 2.0, "body": 1.0}
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+DEFAULT_LIMIT = 20
+SNIPPET_WIDTH = 100
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Field codes used in the encoded postings
+FIELD_CODES = {"name": "n", "description": "d", "body": "b"}
+_CODE_FIELDS = {code: name for name, code in FIELD_CODES.items()}
 
 
 def _repo_root_from_this_file() -> Path:
@@ -150,6 +187,301 @@ def _find_skill_dir(skills_root: Path, skill_name: str) -> Optional[Path]:
     return None
 
 
+def _tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+def _skill_fields(skill_dir: Path, text: str) -> Dict[str, str]:
+    name, description, short_desc = _parse_frontmatter(text)
+    names = [name or skill_dir.name]
+    if skill_dir.name not in names:
+        names.append(skill_dir.name)
+    return {
+        "name": " ".join(names),
+        "description": " ".join(d for d in (description, short_desc) if d),
+        "body": _strip_frontmatter(text),
+    }
+
+
+def _encode_posting(skill_id: int, fields: Dict[str, List[int]]) -> str:
+    parts = [FIELD_CODES[name] + ",".join(map(str, positions)) for name, positions in fields.items()]
+    return f"{skill_id}:" + "/".join(parts)
+
+
+def _decode_postings(encoded: str) -> Dict[int, Dict[str, List[int]]]:
+    """Decode "id:n0,4/b7;id2:b3" into {id: {field: positions}}."""
+    decoded: Dict[int, Dict[str, List[int]]] = {}
+    for item in encoded.split(";"):
+        if not item:
+            continue
+        skill_id, _, fields = item.partition(":")
+        decoded[int(skill_id)] = {
+            _CODE_FIELDS[part[0]]: [int(n) for n in part[1:].split(",")]
+            for part in fields.split("/")
+        }
+    return decoded
+
+
+def _write_atomic(path: Path, text: str) -> None:
+    """Write a text file via temp file + rename."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(prefix=path.name + ".", dir=str(path.parent))
+    try:
+        os.fchmod(fd, INDEX_MODE)
+        with os.fdopen(fd, "w", encoding="utf-8", newline="\n") as out:
+            out.write(text)
+        os.replace(tmp_name, path)
+    except BaseException:
+        if os.path.exists(tmp_name):
+            os.unlink(tmp_name)
+        raise
+
+
+@dataclass
+class SkillIndex:
+    """Persistent inverted index over the SKILL.md files.
+
+    Stored as two files. ``skills_index.json`` holds per-skill metadata and
+    field lengths, plus the sorted token list with each token's byte offset
+    in ``skills_index.postings``. That file has one line per token, encoding
+    (skill id, field, positions). A search parses only the JSON and reads
+    the postings lines of the tokens it matches. The postings are loaded in
+    full only when a skill has to be re-indexed.
+    """
+
+    skills: Dict[str, dict] = field(default_factory=dict)
+    tokens: List[str] = field(default_factory=list)
+    offsets: List[int] = field(default_factory=list)
+    generation: str = ""
+    next_id: int = 0
+    postings_path: Optional[Path] = None
+    postings: Optional[Dict[str, str]] = None
+    updated: int = 0
+    removed: int = 0
+
+    @staticmethod
+    def _postings_file(path: Path) -> Path:
+        return path.with_suffix(".postings")
+
+    @classmethod
+    def load(cls, path: Path) -> "SkillIndex":
+        """Load the index, or an empty one if missing, outdated or torn."""
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return cls()
+        if data.get("version") != INDEX_VERSION:
+            return cls()
+        postings_path = cls._postings_file(path)
+        try:
+            with postings_path.open("rb") as handle:
+                header = handle.readline().decode("ascii", "replace").strip()
+                size = os.fstat(handle.fileno()).st_size
+        except OSError:
+            return cls()
+        offsets = data.get("offsets", [])
+        if header != data.get("generation") or not offsets or offsets[-1] != size:
+            # Interrupted save: the two files are from different runs
+            return cls()
+        return cls(
+            skills=data.get("skills", {}),
+            tokens=data.get("tokens", []),
+            offsets=offsets,
+            generation=header,
+            next_id=data.get("next_id", 0),
+            postings_path=postings_path,
+        )
+
+    def save(self, path: Path) -> None:
+        postings = self._all_postings()
+        generation = os.urandom(8).hex()
+        lines = [generation]
+        offsets = [len(generation) + 1]
+        for token in self.tokens:
+            lines.append(postings[token])
+            offsets.append(offsets[-1] + len(postings[token]) + 1)
+        # Postings first: a torn save is caught by the generation check in load()
+        _write_atomic(self._postings_file(path), "\n".join(lines) + "\n")
+        data = {
+            "version": INDEX_VERSION,
+            "generation": generation,
+            "next_id": self.next_id,
+            "skills": self.skills,
+            "tokens": self.tokens,
+            "offsets": offsets,
+        }
+        _write_atomic(path, json.dumps(data, separators=(",", ":")))
+        self.generation = generation
+        self.offsets = offsets
+
+    def _all_postings(self) -> Dict[str, str]:
+        if self.postings is None:
+            self.postings = {}
+            if self.postings_path is not None and self.tokens:
+                with self.postings_path.open("r", encoding="ascii") as handle:
+                    handle.readline()
+                    lines = handle.read().split("\n")
+                self.postings = dict(zip(self.tokens, lines))
+        return self.postings
+
+    def _drop(self, keys: List[str]) -> None:
+        ids = {self.skills.pop(key)["id"] for key in keys}
+        if not ids:
+            return
+        postings = self._all_postings()
+        for token, encoded in list(postings.items()):
+            kept = [item for item in encoded.split(";") if int(item.partition(":")[0]) not in ids]
+            if kept:
+                postings[token] = ";".join(kept)
+            else:
+                del postings[token]
+
+    def _add(self, key: str, skill_dir: Path, text: str, stamp: List[int]) -> None:
+        postings = self._all_postings()
+        skill_id = self.next_id
+        self.next_id += 1
+        terms: Dict[str, Dict[str, List[int]]] = {}
+        lengths: Dict[str, int] = {}
+        for name, value in _skill_fields(skill_dir, text).items():
+            tokens = _tokenize(value)
+            lengths[name] = len(tokens)
+            for position, token in enumerate(tokens):
+                terms.setdefault(token, {}).setdefault(name, []).append(position)
+        for token, fields in terms.items():
+            posting = _encode_posting(skill_id, fields)
+            existing = postings.get(token)
+            postings[token] = f"{existing};{posting}" if existing else posting
+        name, short_desc, _ = _skill_metadata(skill_dir)
+        self.skills[key] = {
+            "id": skill_id,
+            "stamp": stamp,
+            "name": name,
+            "short": short_desc,
+            "lengths": lengths,
+        }
+
+    def refresh(self, skills_root: Path) -> bool:
+        """Re-index skills whose SKILL.md changed; True if anything did."""
+        # One stat per skill (os.scandir, not pathlib: this runs on every search)
+        current: Dict[str, List[int]] = {}
+        with os.scandir(skills_root) as entries:
+            for entry in entries:
+                if entry.name.startswith("."):
+                    continue
+                try:
+                    st = os.stat(os.path.join(entry.path, "SKILL.md"))
+                except OSError:
+                    continue
+                if stat.S_ISREG(st.st_mode):
+                    current[entry.name] = [st.st_mtime_ns, st.st_size]
+
+        gone = [key for key in self.skills if key not in current]
+        stale = [
+            key for key, stamp in current.items()
+            if self.skills.get(key, {}).get("stamp") != stamp
+        ]
+        self._drop(gone + [key for key in stale if key in self.skills])
+        self.removed = len(gone)
+        self.updated = 0
+        for key in stale:
+            skill_dir = skills_root / key
+            text = _read_text(skill_dir / "SKILL.md")
+            if text is not None:
+                self._add(key, skill_dir, text, current[key])
+                self.updated += 1
+        if gone or stale:
+            self.tokens = sorted(self._all_postings())
+            return True
+        return False
+
+    def _matching(self, term: str) -> Iterable[str]:
+        """Encoded postings of every token starting with ``term``."""
+        start = bisect.bisect_left(self.tokens, term)
+        end = start
+        while end < len(self.tokens) and self.tokens[end].startswith(term):
+            end += 1
+        if start == end:
+            return []
+        if self.postings is not None:
+            return [self.postings[token] for token in self.tokens[start:end]]
+        assert self.postings_path is not None
+        with self.postings_path.open("rb") as handle:
+            handle.seek(self.offsets[start])
+            data = handle.read(self.offsets[end] - self.offsets[start])
+        return data.decode("ascii").split("\n")[:-1]
+
+    def search(self, query: str) -> List[Tuple[str, float]]:
+        """Skills containing every query term, best first, as (dir name, score).
+
+        Each term also matches longer tokens it is a prefix of, so "audit"
+        finds "auditor" as the substring search did.
+        """
+        terms = list(dict.fromkeys(_tokenize(query)))
+        if not terms or not self.skills:
+            return []
+        by_id = {skill["id"]: key for key, skill in self.skills.items()}
+        total = len(self.skills)
+
+        # One entry per term: {skill id: {field: term frequency}}
+        matches: List[Dict[int, Dict[str, int]]] = []
+        candidates: Optional[set] = None
+        for term in terms:
+            found: Dict[int, Dict[str, int]] = {}
+            for encoded in self._matching(term):
+                for skill_id, fields in _decode_postings(encoded).items():
+                    counts = found.setdefault(skill_id, {})
+                    for name, positions in fields.items():
+                        counts[name] = counts.get(name, 0) + len(positions)
+            candidates = set(found) if candidates is None else candidates & set(found)
+            if not candidates:
+                return []
+            matches.append(found)
+
+        average = {
+            name: max(sum(s["lengths"].get(name, 0) for s in self.skills.values()) / total, 1.0)
+            for name in FIELD_BOOSTS
+        }
+        scores: Dict[str, float] = {}
+        for skill_id in candidates or ():
+            lengths = self.skills[by_id[skill_id]]["lengths"]
+            score = 0.0
+            for found in matches:
+                idf = math.log(1.0 + (total - len(found) + 0.5) / (len(found) + 0.5))
+                weight = 0.0
+                for name, count in found[skill_id].items():
+                    norm = 1.0 - BM25_B + BM25_B * lengths.get(name, 0) / average[name]
+                    weight += FIELD_BOOSTS[name] * count / norm
+                score += idf * weight * (BM25_K1 + 1.0) / (weight + BM25_K1)
+            scores[by_id[skill_id]] = score
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+
+
+def _snippet(text: str, query: str) -> str:
+    """The body line matching the most query terms, cut to SNIPPET_WIDTH."""
+    terms = list(dict.fromkeys(_tokenize(query)))
+    if not terms:
+        return ""
+    pattern = re.compile(r"(?<![a-z0-9])(" + "|".join(map(re.escape, terms)) + ")", re.IGNORECASE)
+    best, best_hits, best_at = "", 0, 0
+    for raw in _strip_frontmatter(text).splitlines():
+        line = raw.strip().lstrip("#-* ").strip()
+        found = pattern.findall(line)
+        hits = len({hit.lower() for hit in found})
+        if hits > best_hits:
+            best, best_hits = line, hits
+            best_at = pattern.search(line).start()  # type: ignore[union-attr]
+    if len(best) <= SNIPPET_WIDTH:
+        return best
+    start = max(0, min(best_at - SNIPPET_WIDTH // 3, len(best) - SNIPPET_WIDTH))
+    end = start + SNIPPET_WIDTH
+    if start:
+        start = best.find(" ", start, best_at) + 1 or best_at
+    if end < len(best):
+        end = best.rfind(" ", best_at, end) if " " in best[best_at:end] else end
+    cut = best[start:end].strip()
+    return ("..." if start else "") + cut + ("..." if end < len(best) else "")
+
+
 def _print_table(rows: List[Tuple[str, str, str]]) -> None:
     widths = [max(len(row[i]) for row in rows) for i in range(3)]
     for row in rows:
@@ -184,19 +516,34 @@ def _cmd_show(skills_root: Path, skill_name: str) -> int:
     return 0
 
 
-def _cmd_search(skills_root: Path, keyword: str) -> int:
-    keyword_lower = keyword.lower()
-    matches: List[str] = []
-    for skill_dir in _iter_skill_dirs(skills_root):
-        text = _read_text(skill_dir / "SKILL.md")
-        if not text:
+def _cmd_search(
+    skills_root: Path,
+    index_path: Path,
+    query: str,
+    *,
+    limit: int = DEFAULT_LIMIT,
+    names_only: bool = False,
+    rebuild: bool = False,
+) -> int:
+    index = SkillIndex() if rebuild else SkillIndex.load(index_path)
+    if index.refresh(skills_root) or rebuild:
+        try:
+            index.save(index_path)
+        except OSError as exc:
+            sys.stderr.write(f"WARNING: unable to write skills index {index_path}: {exc}\n")
+
+    results = index.search(query)
+    if limit > 0:
+        results = results[:limit]
+    for key, score in results:
+        name = index.skills[key]["name"]
+        if names_only:
+            sys.stdout.write(name + "\n")
             continue
-        if keyword_lower in text.lower():
-            name, _, _ = _parse_frontmatter(text)
-            matches.append(name or skill_dir.name)
-
-    for name in matches:
-        sys.stdout.write(name + "\n")
+        sys.stdout.write(f"{name} ({score:.2f}) - {index.skills[key]['short']}\n")
+        snippet = _snippet(_read_text(skills_root / key / "SKILL.md") or "", query)
+        if snippet:
+            sys.stdout.write(f"    {snippet}\n")
     return 0
 
 
@@ -212,8 +559,20 @@ def main(argv: Optional[List[str]] = None) -> int:
     show_parser = subparsers.add_parser("show", help="Print a skill's SKILL.md")
     show_parser.add_argument("skill_name", help="Skill directory name")
 
-    search_parser = subparsers.add_parser("search", help="Search SKILL.md content")
-    search_parser.add_argument("keyword", help="Keyword to search for")
+    search_parser = subparsers.add_parser(
+        "search", help="Search skills (all terms must match), best match first"
+    )
+    search_parser.add_argument("terms", nargs="+", help="Search terms (prefixes match)")
+    search_parser.add_argument(
+        "--limit", type=int, default=DEFAULT_LIMIT,
+        help=f"Maximum results (default: {DEFAULT_LIMIT}; 0 for all)",
+    )
+    search_parser.add_argument(
+        "--names", action="store_true", help="Print skill names only, one per line"
+    )
+    search_parser.add_argument(
+        "--rebuild", action="store_true", help="Rebuild the search index from scratch"
+    )
 
     args = parser.parse_args(argv)
 
@@ -228,7 +587,14 @@ def main(argv: Optional[List[str]] = None) -> int:
     if args.command == "show":
         return _cmd_show(skills_root, args.skill_name)
     if args.command == "search":
-        return _cmd_search(skills_root, args.keyword)
+        return _cmd_search(
+            skills_root,
+            repo_root / INDEX_RELATIVE_PATH,
+            " ".join(args.terms),
+            limit=args.limit,
+            names_only=args.names,
+            rebuild=args.rebuild,
+        )
 
     sys.stderr.write("ERROR: invalid command\n")
     return 2
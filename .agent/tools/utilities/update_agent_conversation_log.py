@@ -10,10 +10,24 @@ Default log path:
 Default boundary:
   === MESSAGE BOUNDARY ===
 
+Sidecar index:
+  <log>.idx holds one JSON record per entry (byte offset, length, timestamp,
+  agent, role, handoff, status, tags). Each append adds its records in one
+  write under the log lock. An index that is missing, torn or no longer
+  matches the log is rebuilt into a temporary file and renamed into place;
+  --reindex forces that rebuild.
+
+Segments:
+  With a rotation policy (--rotate monthly|size) the active log keeps its path
+  and full segments are renamed to <stem>.<YYYY-MM>.md (or
+  <stem>.<YYYY-MM>_<YYYY-MM>.md when they span months, optionally gzipped)
+  and listed in <stem>.segments.json. Query mode reads all segments as one log.
+
 Environment variables:
   AGENT_CONVERSATION_LOG  - Override default log path
   AGENT_CONVERSATION_BOUNDARY - Override boundary marker
   PROJECT_NAME - Project identifier in log entries
+  AGENT_CONVERSATION_LOCK_TIMEOUT - Seconds to wait for the log lock (default 30)
 
 Usage:
   python3 update_agent_conversation_log.py \
@@ -22,19 +36,38 @@ Usage:
     --handoff reviewer \
     --task "Review auth flow" \
     --reference "src/auth.py"
+
+  python3 update_agent_conversation_log.py query \
+    --agent gemini_auditor --since 2026-01-01 --newest-first --limit 10
+
+Python API (same locking, dedupe and index updates as the CLI):
+  from update_agent_conversation_log import log_handoff
+  log_handoff("builder", "Implemented login feature", handoff="reviewer",
+              references=["src/auth.py"])
 """
 
 from __future__ import annotations
 
 import argparse
+import gzip
+import json
 import os
 import re
+import shutil
 import sys
+import tempfile
 import textwrap
-from dataclasses import dataclass, field
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import List, Optional
+from typing import BinaryIO, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends run unlocked
+    fcntl = None  # type: ignore[assignment]
 
 
 # Configuration defaults (can be overridden via environment or CLI)
@@ -43,6 +76,26 @@ DEFAULT_LOG_PATH = Path(
 )
 DEFAULT_BOUNDARY = os.getenv("AGENT_CONVERSATION_BOUNDARY", "=== MESSAGE BOUNDARY ===")
 DEFAULT_PROJECT = os.getenv("PROJECT_NAME", "[PROJECT_NAME]")
+DEFAULT_LOCK_TIMEOUT = float(os.getenv("AGENT_CONVERSATION_LOCK_TIMEOUT", "30"))
+
+# Block size used when scanning the log backwards from EOF
+TAIL_BLOCK_SIZE = 64 * 1024
+
+# Sidecar index file: <log>.idx, one JSON record per entry
+INDEX_SUFFIX = ".idx"
+
+# Mode for index files, as O_CREAT with 0o644 gives (mkstemp alone gives 0600)
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+INDEX_MODE = 0o644 & ~_UMASK
+
+# Advisory lock file: <log>.lock, held for each read-check-append cycle
+LOCK_SUFFIX = ".lock"
+
+# Segment manifest: <stem>.segments.json lists sealed segments oldest-first
+MANIFEST_SUFFIX = ".segments.json"
+ROTATE_CHOICES = ("none", "monthly", "size")
+DEFAULT_ROTATE_SIZE = 10 * 1024 * 1024
 
 
 def _clean_items(items: List[str]) -> List[str]:
@@ -104,16 +157,118 @@ def _normalize_entry(text: str) -> str:
     return "\n".join(line.rstrip() for line in text.strip().splitlines())
 
 
-def _extract_last_entry(raw: str, boundary: str) -> Optional[str]:
-    """Extract the last entry from the log for duplicate detection."""
-    if not raw.strip():
-        return None
-    parts = re.split(rf"^{re.escape(boundary)}\s*$", raw, flags=re.MULTILINE)
-    for part in reversed(parts):
-        stripped = part.strip()
-        if stripped:
-            return stripped
-    return None
+def boundary_pattern(boundary: str) -> re.Pattern:
+    """Compile a byte pattern matching a boundary line."""
+    return re.compile(rb"^" + re.escape(boundary.encode("utf-8")) + rb"\s*$", re.MULTILINE)
+
+
+def iter_entries_reverse(handle: BinaryIO, boundary: str) -> Iterator[Tuple[int, bytes]]:
+    """Yield (offset, raw entry bytes) newest-first by seeking back from EOF.
+
+    Blocks of TAIL_BLOCK_SIZE bytes are read backwards until a boundary line is
+    found, so the cost of reaching an entry depends on the entry size, not on
+    the size of the log. The offset is that of the boundary line; text before
+    the first boundary (the log header) is yielded last with its own offset.
+    """
+    pattern = boundary_pattern(boundary)
+    handle.seek(0, os.SEEK_END)
+    pos = handle.tell()
+    buffer = b""
+    while True:
+        # A match at buffer start is only a line start once the file start is reached
+        starts = [
+            m.start() for m in pattern.finditer(buffer)
+            if m.start() > 0 or pos == 0
+        ]
+        end = len(buffer)
+        for start in reversed(starts):
+            yield pos + start, buffer[start:end]
+            end = start
+        buffer = buffer[:end]
+        if pos == 0:
+            if buffer:
+                yield 0, buffer
+            return
+        step = min(TAIL_BLOCK_SIZE, pos)
+        pos -= step
+        handle.seek(pos)
+        buffer = handle.read(step) + buffer
+
+
+def iter_entries_forward(
+    handle: BinaryIO, boundary: str, start: int = 0
+) -> Iterator[Tuple[int, bytes]]:
+    """Yield (offset, raw entry bytes) oldest-first, streaming line by line.
+
+    Scanning starts at byte offset ``start``, which must be a line start. Text
+    before the first boundary line in the scanned region is not yielded.
+    """
+    pattern = boundary_pattern(boundary)
+    handle.seek(start)
+    offset = start
+    entry_start: Optional[int] = None
+    chunks: List[bytes] = []
+    for line in iter(handle.readline, b""):
+        if pattern.match(line):
+            if entry_start is not None:
+                yield entry_start, b"".join(chunks)
+            entry_start = offset
+            chunks = [line]
+        elif entry_start is not None:
+            chunks.append(line)
+        offset += len(line)
+    if entry_start is not None:
+        yield entry_start, b"".join(chunks)
+
+
+def strip_boundary(raw: bytes, boundary: str) -> str:
+    """Decode a raw entry and drop its leading boundary line."""
+    text = raw.decode("utf-8", errors="replace")
+    first, sep, rest = text.partition("\n")
+    if first.strip() == boundary:
+        return rest if sep else ""
+    return text
+
+
+@dataclass
+class LogTail:
+    """What an append needs to know about the end of the log."""
+
+    last_entry: Optional[str] = None
+    ends_with_newline: bool = True
+    has_content: bool = False
+    has_entries: bool = False
+    size: int = 0
+
+
+def _read_log_tail(log_path: Path, boundary: str) -> LogTail:
+    """Inspect the end of the log without reading the whole file."""
+    tail = LogTail()
+    try:
+        handle = log_path.open("rb")
+    except FileNotFoundError:
+        return tail
+    with handle:
+        handle.seek(0, os.SEEK_END)
+        size = handle.tell()
+        if size == 0:
+            return tail
+        tail.size = size
+        handle.seek(size - 1)
+        tail.ends_with_newline = handle.read(1) == b"\n"
+        pattern = boundary_pattern(boundary)
+        for _, raw in iter_entries_reverse(handle, boundary):
+            if pattern.match(raw):
+                tail.has_entries = True
+            text = strip_boundary(raw, boundary).strip()
+            if text:
+                tail.last_entry = text
+                tail.has_content = True
+                break
+            if raw.strip():
+                # A bare boundary line still counts as existing content.
+                tail.has_content = True
+    return tail
 
 
 @dataclass
@@ -168,55 +323,1080 @@ class ConversationEntry:
         return "\n".join(lines).strip() + "\n"
 
 
-def append_entry(args: argparse.Namespace) -> None:
-    """Append a new entry to the conversation log."""
-    log_path: Path = args.logfile
-    boundary: str = args.boundary
-    project: str = args.project
+# Labels written by ConversationEntry.render, mapped to attribute names
+_SCALAR_LABELS = {
+    "TimestampUTC": "timestamp",
+    "Project": "project",
+    "Agent": "agent",
+    "Role": "role",
+    "Status": "status",
+    "Context": "context",
+    "HandoffTo": "handoff",
+    "Tags": "tags",
+    "Summary": "summary",
+}
+_LIST_LABELS = {"References": "references", "Tasks": "tasks", "Notes": "notes"}
+
+# Timestamp used for entries without a valid TimestampUTC line
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
 
+
+def _parse_entry_timestamp(raw: str) -> datetime:
+    """Parse a logged timestamp, falling back to the epoch if invalid."""
+    try:
+        return _parse_timestamp(raw)
+    except SystemExit:
+        return _EPOCH
+
+
+def parse_entry(text: str) -> Tuple[ConversationEntry, Optional[str]]:
+    """Parse rendered entry text back into (entry, project).
+
+    This is the inverse of ConversationEntry.render and also accepts the
+    hand-written layout from the handoffs README (sections in any order).
+    """
+    values = {}
+    lists: dict = {attr: [] for attr in _LIST_LABELS.values()}
+    details: List[str] = []
+    section: Optional[str] = None
+
+    for line in text.strip("\n").splitlines():
+        if section == "details":
+            if not line.strip():
+                details.append("")
+                continue
+            if line.startswith("  "):
+                details.append(line[2:])
+                continue
+            section = None
+        elif section is not None:
+            if line.startswith("- "):
+                lists[section].append(line[2:].strip())
+                continue
+            if not line.strip():
+                continue
+            section = None
+
+        stripped = line.strip()
+        label, sep, value = stripped.partition(":")
+        if not sep:
+            continue
+        value = value.strip()
+        if label == "Details" and not value:
+            section = "details"
+        elif label in _LIST_LABELS and not value:
+            section = _LIST_LABELS[label]
+        elif label in _SCALAR_LABELS:
+            values[_SCALAR_LABELS[label]] = value
+
+    tags = [tag.strip() for tag in values.get("tags", "").split(",") if tag.strip()]
     entry = ConversationEntry(
-        summary=args.summary.strip(),
-        agent=args.agent.strip(),
-        role=args.role.strip(),
-        details=_collect_details(args),
-        tasks=_clean_items(args.task or []),
-        tags=_clean_items(args.tag or []),
-        references=_clean_items(args.reference or []),
-        handoff=args.handoff.strip() if args.handoff else None,
-        context=args.context.strip() if args.context else None,
-        status=args.status.strip() if args.status else None,
-        notes=_clean_items(args.note or []),
-        timestamp=_parse_timestamp(args.timestamp),
+        summary=values.get("summary", ""),
+        agent=values.get("agent", ""),
+        role=values.get("role", ""),
+        details="\n".join(details).strip(),
+        tasks=lists["tasks"],
+        tags=tags,
+        references=lists["references"],
+        handoff=values.get("handoff") or None,
+        context=values.get("context") or None,
+        status=values.get("status") or None,
+        notes=lists["notes"],
+        timestamp=_parse_entry_timestamp(values.get("timestamp", "")),
     )
+    return entry, values.get("project")
 
-    entry_text = entry.render(project)
-    normalized_new = _normalize_entry(entry_text)
 
-    # Read existing log for duplicate detection
-    raw_text = log_path.read_text(encoding="utf-8") if log_path.exists() else ""
-    last_entry = _extract_last_entry(raw_text, boundary)
-    
-    if last_entry and not args.force:
-        if _normalize_entry(last_entry) == normalized_new:
-            if not args.quiet:
-                print("Skipped: entry matches the previous handoff message.")
+@dataclass
+class LoggedEntry:
+    """An entry read back from the log, with its location and raw text."""
+
+    offset: int
+    text: str
+    entry: ConversationEntry
+    project: Optional[str] = None
+    segment: Optional[str] = None
+
+
+def iter_log_entries(
+    log_path: Path, boundary: str, *, newest_first: bool = False
+) -> Iterator[LoggedEntry]:
+    """Stream parsed entries from all segments of the log, one at a time.
+
+    Memory use is bounded by the largest entry, not the log size. Newest-first
+    iteration seeks backwards from EOF, so stopping early costs only the bytes
+    of the entries actually consumed. Offsets are relative to each segment.
+    """
+    pattern = boundary_pattern(boundary)
+    segments = log_segments(log_path)
+    if newest_first:
+        segments.reverse()
+    for segment in segments:
+        with open_segment(segment, seekable=newest_first) as handle:
+            if handle is None:
+                continue
+            if newest_first:
+                raw_entries = iter_entries_reverse(handle, boundary)
+            else:
+                raw_entries = iter_entries_forward(handle, boundary)
+            for offset, raw in raw_entries:
+                if not pattern.match(raw):
+                    # Log header before the first boundary
+                    continue
+                text = strip_boundary(raw, boundary).strip()
+                if not text:
+                    continue
+                entry, project = parse_entry(text)
+                yield LoggedEntry(
+                    offset=offset, text=text, entry=entry, project=project,
+                    segment=segment.name,
+                )
+
+
+# Header fields copied into the sidecar index, keyed by their log label
+_INDEX_FIELDS = {
+    "TimestampUTC": "timestamp",
+    "Agent": "agent",
+    "Role": "role",
+    "HandoffTo": "handoff",
+    "Status": "status",
+    "Tags": "tags",
+}
+
+
+@dataclass
+class IndexRecord:
+    """Location and header fields of one entry in the sidecar index."""
+
+    offset: int
+    length: int
+    timestamp: Optional[str] = None
+    agent: Optional[str] = None
+    role: Optional[str] = None
+    handoff: Optional[str] = None
+    status: Optional[str] = None
+    tags: List[str] = field(default_factory=list)
+
+    @property
+    def end(self) -> int:
+        return self.offset + self.length
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self), sort_keys=True)
+
+    @classmethod
+    def from_json(cls, line: str) -> "IndexRecord":
+        data = json.loads(line)
+        return cls(
+            offset=int(data["offset"]),
+            length=int(data["length"]),
+            timestamp=data.get("timestamp"),
+            agent=data.get("agent"),
+            role=data.get("role"),
+            handoff=data.get("handoff"),
+            status=data.get("status"),
+            tags=list(data.get("tags") or []),
+        )
+
+    @classmethod
+    def from_raw(cls, offset: int, raw: bytes, boundary: str) -> "IndexRecord":
+        """Build a record from raw entry bytes, reading only the header block."""
+        record = cls(offset=offset, length=len(raw))
+        for line in strip_boundary(raw, boundary).strip().splitlines():
+            if not line.strip():
+                break
+            label, sep, value = line.partition(":")
+            attr = _INDEX_FIELDS.get(label.strip())
+            if not sep or attr is None:
+                continue
+            value = value.strip()
+            if attr == "tags":
+                record.tags = [tag.strip() for tag in value.split(",") if tag.strip()]
+            else:
+                setattr(record, attr, value)
+        return record
+
+
+def _index_path(log_path: Path) -> Path:
+    """Return the sidecar index path for a log file."""
+    return log_path.with_name(log_path.name + INDEX_SUFFIX)
+
+
+def _last_index_record(index_path: Path) -> Optional[IndexRecord]:
+    """Read the last record of the index by seeking back from EOF."""
+    try:
+        handle = index_path.open("rb")
+    except FileNotFoundError:
+        return None
+    with handle:
+        handle.seek(0, os.SEEK_END)
+        pos = handle.tell()
+        buffer = b""
+        while pos > 0 and buffer.strip().count(b"\n") < 1:
+            step = min(TAIL_BLOCK_SIZE, pos)
+            pos -= step
+            handle.seek(pos)
+            buffer = handle.read(step) + buffer
+    lines = buffer.strip().splitlines()
+    if not lines:
+        return None
+    try:
+        return IndexRecord.from_json(lines[-1].decode("utf-8"))
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+def _write_index_records(index_path: Path, records: List[IndexRecord]) -> None:
+    """Append records to the index with a single O_APPEND write."""
+    if not records:
+        return
+    payload = "".join(record.to_json() + "\n" for record in records).encode("utf-8")
+    fd = os.open(str(index_path), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, payload)
+    finally:
+        os.close(fd)
+
+
+def rebuild_index(log_path: Path, boundary: str) -> int:
+    """Rebuild the sidecar index from scratch; returns the number of entries.
+
+    The new index is written to a temporary file and renamed over the old
+    one, so readers see either the old index or the complete new one.
+    """
+    index_path = _index_path(log_path)
+    count = 0
+    fd, tmp_name = tempfile.mkstemp(prefix=index_path.name + ".", dir=str(index_path.parent))
+    try:
+        os.fchmod(fd, INDEX_MODE)
+        with os.fdopen(fd, "w", encoding="utf-8") as out:
+            if log_path.exists():
+                with log_path.open("rb") as handle:
+                    for offset, raw in iter_entries_forward(handle, boundary):
+                        out.write(IndexRecord.from_raw(offset, raw, boundary).to_json() + "\n")
+                        count += 1
+        os.replace(tmp_name, index_path)
+    except BaseException:
+        if os.path.exists(tmp_name):
+            os.unlink(tmp_name)
+        raise
+    return count
+
+
+def _record_matches_log(log_path: Path, record: IndexRecord, boundary: str) -> bool:
+    """Check that an index record still describes the bytes it points at."""
+    with log_path.open("rb") as handle:
+        handle.seek(record.offset)
+        raw = handle.read(record.length)
+    if len(raw) != record.length or not boundary_pattern(boundary).match(raw):
+        return False
+    return IndexRecord.from_raw(record.offset, raw, boundary) == record
+
+
+def sync_index(log_path: Path, boundary: str) -> None:
+    """Bring the index up to date with the log.
+
+    Entries added without this script (for example by hand) are indexed by
+    scanning only the bytes past the last indexed entry. A missing or
+    unreadable index, a log that shrank, or a last record that no longer
+    matches the log (the log was rewritten) triggers a full rebuild.
+    """
+    if not log_path.exists():
+        return
+    index_path = _index_path(log_path)
+    size = log_path.stat().st_size
+    last = _last_index_record(index_path)
+    if last is None:
+        rebuild_index(log_path, boundary)
+        return
+    if last.end > size or not _record_matches_log(log_path, last, boundary):
+        rebuild_index(log_path, boundary)
+        return
+    if last.end == size:
+        return
+    with log_path.open("rb") as handle:
+        records = [
+            IndexRecord.from_raw(offset, raw, boundary)
+            for offset, raw in iter_entries_forward(handle, boundary, last.end)
+        ]
+    _write_index_records(index_path, records)
+
+
+def iter_index(log_path: Path) -> Iterator[IndexRecord]:
+    """Yield index records oldest-first (call sync_index first)."""
+    try:
+        handle = _index_path(log_path).open("r", encoding="utf-8")
+    except FileNotFoundError:
+        return
+    with handle:
+        for line in handle:
+            if line.strip():
+                yield IndexRecord.from_json(line)
+
+
+def read_entry_at(log_path: Path, record: IndexRecord, boundary: str) -> str:
+    """Read one entry's text using its index record."""
+    with log_path.open("rb") as handle:
+        handle.seek(record.offset)
+        raw = handle.read(record.length)
+    return strip_boundary(raw, boundary).strip()
+
+
+@dataclass
+class SegmentPolicy:
+    """When to seal the active segment and whether to gzip sealed ones."""
+
+    rotate: str = "none"
+    max_bytes: int = DEFAULT_ROTATE_SIZE
+    compress: bool = False
+
+
+@dataclass
+class SegmentInfo:
+    """A sealed segment as recorded in the manifest."""
+
+    name: str
+    entries: int = 0
+    bytes: int = 0
+    first: Optional[str] = None
+    last: Optional[str] = None
+    compressed: bool = False
+
+
+@dataclass
+class SegmentManifest:
+    """Rotation policy plus the sealed segments, oldest-first."""
+
+    policy: SegmentPolicy = field(default_factory=SegmentPolicy)
+    segments: List[SegmentInfo] = field(default_factory=list)
+
+
+def _manifest_path(log_path: Path) -> Path:
+    """Return the segment manifest path for a log file."""
+    return log_path.with_name(log_path.stem + MANIFEST_SUFFIX)
+
+
+def load_manifest(log_path: Path) -> SegmentManifest:
+    """Load the segment manifest; a missing manifest means a single segment."""
+    path = _manifest_path(log_path)
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return SegmentManifest()
+    except ValueError as exc:
+        raise SystemExit(f"Invalid segment manifest {path}: {exc}") from exc
+    policy_fields = SegmentPolicy.__dataclass_fields__
+    info_fields = SegmentInfo.__dataclass_fields__
+    return SegmentManifest(
+        policy=SegmentPolicy(**{
+            key: value for key, value in (data.get("policy") or {}).items()
+            if key in policy_fields
+        }),
+        segments=[
+            SegmentInfo(**{key: value for key, value in item.items() if key in info_fields})
+            for item in data.get("segments") or []
+        ],
+    )
+
+
+def save_manifest(log_path: Path, manifest: SegmentManifest) -> None:
+    """Write the manifest atomically (temp file + rename)."""
+    path = _manifest_path(log_path)
+    fd, tmp_name = tempfile.mkstemp(prefix=path.name + ".", dir=str(path.parent))
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as out:
+            json.dump(asdict(manifest), out, indent=2, sort_keys=True)
+            out.write("\n")
+        os.replace(tmp_name, path)
+    except BaseException:
+        if os.path.exists(tmp_name):
+            os.unlink(tmp_name)
+        raise
+
+
+def log_segments(log_path: Path) -> List[Path]:
+    """Return every segment path oldest-first; the active log comes last."""
+    sealed = [log_path.with_name(info.name) for info in load_manifest(log_path).segments]
+    return sealed + [log_path]
+
+
+@contextmanager
+def open_segment(path: Path, *, seekable: bool = False) -> Iterator[Optional[BinaryIO]]:
+    """Open a segment for binary reading, decompressing sealed .gz segments.
+
+    Backwards scans need cheap seeks, so with ``seekable`` a gzipped segment is
+    first inflated into an anonymous temporary file. Yields None if missing.
+    """
+    try:
+        handle: BinaryIO = gzip.open(path, "rb") if path.suffix == ".gz" else path.open("rb")
+    except FileNotFoundError:
+        yield None
+        return
+    with handle:
+        if not seekable or path.suffix != ".gz":
+            yield handle
+            return
+        with tempfile.TemporaryFile() as inflated:
+            shutil.copyfileobj(handle, inflated)
+            yield inflated  # type: ignore[misc]
+
+
+def _read_log_header(log_path: Path, boundary: str) -> bytes:
+    """Return the bytes before the first boundary line (the log preamble)."""
+    pattern = boundary_pattern(boundary)
+    chunks: List[bytes] = []
+    with log_path.open("rb") as handle:
+        for line in iter(handle.readline, b""):
+            if pattern.match(line):
+                break
+            chunks.append(line)
+    return b"".join(chunks)
+
+
+def _first_entry_timestamp(log_path: Path, boundary: str) -> Optional[datetime]:
+    """Timestamp of the oldest entry in a segment, reading only its head."""
+    with log_path.open("rb") as handle:
+        for _, raw in iter_entries_forward(handle, boundary):
+            entry, _ = parse_entry(strip_boundary(raw, boundary))
+            return entry.timestamp
+    return None
+
+
+def _sealed_name(
+    log_path: Path, first: datetime, last: Optional[datetime], manifest: SegmentManifest
+) -> str:
+    """Pick <stem>.<YYYY-MM>.md, or <stem>.<YYYY-MM>_<YYYY-MM>.md for a segment
+    whose entries span several months, adding -2, -3... if the name is taken."""
+    taken = {info.name for info in manifest.segments}
+    months = first.strftime("%Y-%m")
+    if last is not None and last.strftime("%Y-%m") != months:
+        months += "_" + last.strftime("%Y-%m")
+    base = f"{log_path.stem}.{months}"
+    name = base + log_path.suffix
+    counter = 2
+    while (
+        name in taken or name + ".gz" in taken
+        or log_path.with_name(name).exists()
+        or log_path.with_name(name + ".gz").exists()
+    ):
+        name = f"{base}-{counter}{log_path.suffix}"
+        counter += 1
+    return name
+
+
+def _compress_segment(path: Path) -> Path:
+    """Gzip a sealed segment, replacing the plain file and its index."""
+    gz_path = path.with_name(path.name + ".gz")
+    tmp_path = gz_path.with_name(gz_path.name + ".tmp")
+    with path.open("rb") as src, gzip.open(tmp_path, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    os.replace(tmp_path, gz_path)
+    path.unlink()
+    index_path = _index_path(path)
+    if index_path.exists():
+        index_path.unlink()
+    return gz_path
+
+
+def seal_active_segment(log_path: Path, boundary: str) -> Optional[SegmentInfo]:
+    """Seal the active log as a new segment and start a fresh one.
+
+    Nothing is rewritten: the active file (and its index) is renamed, the
+    preamble is copied into a new active file, and the manifest is updated.
+    Call with the log lock held. Returns None when there is nothing to seal.
+    """
+    first = _first_entry_timestamp(log_path, boundary) if log_path.exists() else None
+    if first is None:
+        return None
+    manifest = load_manifest(log_path)
+    sync_index(log_path, boundary)
+    records = list(iter_index(log_path))
+
+    last = _parse_entry_timestamp(records[-1].timestamp or "") if records else None
+    if last == _EPOCH:
+        last = None
+    sealed = log_path.with_name(_sealed_name(log_path, first, last, manifest))
+    header = _read_log_header(log_path, boundary)
+    info = SegmentInfo(
+        name=sealed.name,
+        entries=len(records),
+        bytes=log_path.stat().st_size,
+        first=first.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        last=records[-1].timestamp if records else None,
+    )
+    os.rename(log_path, sealed)
+    if _index_path(log_path).exists():
+        os.rename(_index_path(log_path), _index_path(sealed))
+    with log_path.open("xb") as handle:
+        if header.strip():
+            handle.write(header.rstrip() + b"\n")
+    manifest.segments.append(info)
+    save_manifest(log_path, manifest)
+
+    if manifest.policy.compress:
+        info.name = _compress_segment(sealed).name
+        info.compressed = True
+        save_manifest(log_path, manifest)
+    return info
+
+
+def _last_sealed_entry(log_path: Path, boundary: str) -> Optional[str]:
+    """Text of the last entry in the newest sealed segment, if there is one."""
+    segments = load_manifest(log_path).segments
+    if not segments:
+        return None
+    pattern = boundary_pattern(boundary)
+    with open_segment(log_path.with_name(segments[-1].name), seekable=True) as handle:
+        if handle is None:
+            return None
+        for _, raw in iter_entries_reverse(handle, boundary):
+            text = strip_boundary(raw, boundary).strip()
+            if text and pattern.match(raw):
+                return text
+    return None
+
+
+def _maybe_rotate(log_path: Path, boundary: str) -> Optional[SegmentInfo]:
+    """Seal the active segment if the manifest policy says it is full."""
+    policy = load_manifest(log_path).policy
+    if policy.rotate == "none" or not log_path.exists():
+        return None
+    if policy.rotate == "size":
+        if log_path.stat().st_size < policy.max_bytes:
+            return None
+    elif policy.rotate == "monthly":
+        first = _first_entry_timestamp(log_path, boundary)
+        now = datetime.now(timezone.utc)
+        if first is None or (first.year, first.month) == (now.year, now.month):
+            return None
+    return seal_active_segment(log_path, boundary)
+
+
+def configure_rotation(
+    log_path: Path,
+    *,
+    rotate: Optional[str] = None,
+    max_bytes: Optional[int] = None,
+    compress: Optional[bool] = None,
+) -> SegmentPolicy:
+    """Update the rotation policy stored in the manifest."""
+    manifest = load_manifest(log_path)
+    if rotate is not None:
+        manifest.policy.rotate = rotate
+    if max_bytes is not None:
+        manifest.policy.max_bytes = max_bytes
+    if compress is not None:
+        manifest.policy.compress = compress
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    save_manifest(log_path, manifest)
+    return manifest.policy
+
+
+def _segment_records(segment: Path, boundary: str) -> Iterator[Tuple[IndexRecord, Optional[str]]]:
+    """Yield (record, text) per entry; text is only filled for gzipped segments."""
+    if segment.suffix != ".gz":
+        sync_index(segment, boundary)
+        for record in iter_index(segment):
+            yield record, None
+        return
+    pattern = boundary_pattern(boundary)
+    with open_segment(segment) as handle:
+        if handle is None:
             return
+        for offset, raw in iter_entries_forward(handle, boundary):
+            if pattern.match(raw):
+                text = strip_boundary(raw, boundary).strip()
+                yield IndexRecord.from_raw(offset, raw, boundary), text
+
+
+def select_entries(
+    log_path: Path,
+    boundary: str,
+    *,
+    last: Optional[int] = None,
+    agent: Optional[str] = None,
+    role: Optional[str] = None,
+    handoff: Optional[str] = None,
+    status: Optional[str] = None,
+    tag: Optional[str] = None,
+) -> List[str]:
+    """Return entry texts matching the filters, oldest-first.
+
+    Plain segments are filtered through their sidecar index and read with one
+    seek per match; gzipped segments are streamed. With ``last``, older
+    segments are only visited until enough entries were found.
+    """
+    wanted = {"agent": agent, "role": role, "handoff": handoff, "status": status}
+    picked: List[str] = []
+    for segment in reversed(log_segments(log_path)):
+        if not segment.exists():
+            continue
+        found: List[str] = []
+        for record, text in _segment_records(segment, boundary):
+            if any(
+                value is not None and (getattr(record, attr) or "").lower() != value.lower()
+                for attr, value in wanted.items()
+            ):
+                continue
+            if tag is not None and tag.lower() not in (t.lower() for t in record.tags):
+                continue
+            found.append(text if text is not None else read_entry_at(segment, record, boundary))
+        picked = found + picked
+        if last is not None and len(picked) >= last:
+            break
+    if last is not None:
+        picked = picked[-last:] if last > 0 else []
+    return picked
+
+
+class LogLock:
+    """Advisory exclusive lock serializing writers of one log.
 
-    # Ensure directory exists
+    The lock lives in a separate <log>.lock file so it also covers the sidecar
+    index. Acquisition polls with a non-blocking flock and backs off up to the
+    timeout; ``waited`` records how long acquisition took. On platforms without
+    fcntl the lock is a no-op.
+    """
+
+    def __init__(self, log_path: Path, *, timeout: float = DEFAULT_LOCK_TIMEOUT,
+                 enabled: bool = True) -> None:
+        self.path = log_path.with_name(log_path.name + LOCK_SUFFIX)
+        self.timeout = timeout
+        self.enabled = enabled and fcntl is not None
+        self.waited = 0.0
+        self._fd: Optional[int] = None
+
+    def __enter__(self) -> "LogLock":
+        if not self.enabled:
+            return self
+        fd = os.open(str(self.path), os.O_RDWR | os.O_CREAT, 0o644)
+        start = time.monotonic()
+        delay = 0.001
+        while True:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                elapsed = time.monotonic() - start
+                if elapsed >= self.timeout:
+                    os.close(fd)
+                    raise SystemExit(
+                        f"Timed out after {self.timeout:g}s waiting for log lock: {self.path}"
+                    )
+                time.sleep(min(delay, self.timeout - elapsed))
+                delay = min(delay * 2, 0.05)
+        self.waited = time.monotonic() - start
+        self._fd = fd
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+
+
+@dataclass
+class AppendResult:
+    """Outcome of writing one or more entries to the log."""
+
+    appended: List[ConversationEntry] = field(default_factory=list)
+    skipped: List[ConversationEntry] = field(default_factory=list)
+    lock_wait: float = 0.0
+    locked: bool = False
+    sealed: Optional[SegmentInfo] = None
+
+
+def write_entries(
+    log_path: Path,
+    entries: List[ConversationEntry],
+    *,
+    boundary: str = DEFAULT_BOUNDARY,
+    project: str = DEFAULT_PROJECT,
+    force: bool = False,
+    lock_timeout: float = DEFAULT_LOCK_TIMEOUT,
+    lock: bool = True,
+) -> AppendResult:
+    """Append entries under the log lock with one buffered write.
+
+    Unless ``force`` is set, an entry is skipped when it matches the last entry
+    already in the log or an earlier entry of the same batch.
+    """
+    result = AppendResult()
+
+    # Ensure directory exists (the lock file lives next to the log)
     log_path.parent.mkdir(parents=True, exist_ok=True)
 
-    # Append the entry
-    with log_path.open("a", encoding="utf-8") as handle:
-        if raw_text and not raw_text.endswith("\n"):
-            handle.write("\n")
-        if raw_text.strip():
-            handle.write("\n")
-        handle.write(f"{boundary}\n")
-        handle.write(entry_text.rstrip() + "\n\n")
+    with LogLock(log_path, timeout=lock_timeout, enabled=lock) as log_lock:
+        result.locked = log_lock.enabled
+        result.lock_wait = log_lock.waited
+
+        # Seal the active segment first if the rotation policy says so
+        result.sealed = _maybe_rotate(log_path, boundary)
+
+        # Only the tail of the log is needed for duplicate detection; right
+        # after a rotation the previous entry is in the newest sealed segment
+        tail = _read_log_tail(log_path, boundary)
+        previous = tail.last_entry if tail.has_entries else _last_sealed_entry(log_path, boundary)
+        seen = set()
+        if previous:
+            seen.add(_normalize_entry(previous))
+
+        texts: List[str] = []
+        for entry in entries:
+            entry_text = entry.render(project)
+            normalized = _normalize_entry(entry_text)
+            if not force and normalized in seen:
+                result.skipped.append(entry)
+                continue
+            seen.add(normalized)
+            texts.append(entry_text)
+            result.appended.append(entry)
+
+        if not texts:
+            return result
+
+        # Index whatever is already in the log before it grows
+        try:
+            sync_index(log_path, boundary)
+            index_ok = True
+        except OSError as exc:
+            print(f"Warning: could not update log index: {exc}", file=sys.stderr)
+            index_ok = False
+
+        # Lay entries out exactly as consecutive single appends would
+        prefix = ""
+        if not tail.ends_with_newline:
+            prefix += "\n"
+        if tail.has_content:
+            prefix += "\n"
+        payload = bytearray(prefix.encode("utf-8"))
+        records: List[IndexRecord] = []
+        for entry_text in texts:
+            if records:
+                payload += b"\n"
+            block = f"{boundary}\n{entry_text.rstrip()}\n\n".encode("utf-8")
+            records.append(IndexRecord.from_raw(tail.size + len(payload), block, boundary))
+            payload += block
+        with log_path.open("ab") as handle:
+            handle.write(payload)
+
+        if index_ok:
+            try:
+                _write_index_records(_index_path(log_path), records)
+            except OSError as exc:
+                print(f"Warning: could not update log index: {exc}", file=sys.stderr)
+
+    return result
+
+
+def _print_lock_wait(result: AppendResult) -> None:
+    if result.sealed:
+        print(f"Sealed segment: {result.sealed.name} ({result.sealed.entries} entries)")
+    if result.locked:
+        print(f"Lock wait: {result.lock_wait * 1000:.1f} ms")
+
+
+def log_handoff(
+    agent: str,
+    summary: str,
+    *,
+    role: str = "assistant",
+    handoff: Optional[str] = None,
+    status: Optional[str] = "ready",
+    context: Optional[str] = None,
+    tasks: Sequence[str] = (),
+    references: Sequence[str] = (),
+    tags: Sequence[str] = (),
+    notes: Sequence[str] = (),
+    details: str = "",
+    timestamp: Optional[datetime] = None,
+    logfile: Path = DEFAULT_LOG_PATH,
+    boundary: str = DEFAULT_BOUNDARY,
+    project: str = DEFAULT_PROJECT,
+    force: bool = False,
+    lock_timeout: float = DEFAULT_LOCK_TIMEOUT,
+    lock: bool = True,
+) -> AppendResult:
+    """Append one handoff entry in-process; the importable form of the CLI.
+
+    Arguments mirror the command-line flags. ``result.skipped`` is non-empty
+    when the entry matched the previous one. A lock timeout raises SystemExit,
+    as on the command line.
+    """
+    entry = ConversationEntry(
+        summary=summary.strip(),
+        agent=agent.strip(),
+        role=role.strip(),
+        details=details,
+        tasks=_clean_items(list(tasks)),
+        tags=_clean_items(list(tags)),
+        references=_clean_items([str(ref) for ref in references]),
+        handoff=handoff.strip() if handoff else None,
+        context=context.strip() if context else None,
+        status=status.strip() if status else None,
+        notes=_clean_items(list(notes)),
+        timestamp=timestamp or datetime.now(timezone.utc),
+    )
+    return write_entries(
+        Path(logfile),
+        [entry],
+        boundary=boundary,
+        project=project,
+        force=force,
+        lock_timeout=lock_timeout,
+        lock=lock,
+    )
+
+
+def append_entry(args: argparse.Namespace) -> None:
+    """Append a new entry to the conversation log."""
+    log_path: Path = args.logfile
+
+    result = log_handoff(
+        args.agent,
+        args.summary,
+        role=args.role,
+        handoff=args.handoff,
+        status=args.status,
+        context=args.context,
+        tasks=args.task or [],
+        references=args.reference or [],
+        tags=args.tag or [],
+        notes=args.note or [],
+        details=_collect_details(args),
+        timestamp=_parse_timestamp(args.timestamp),
+        logfile=log_path,
+        boundary=args.boundary,
+        project=args.project,
+        force=args.force,
+        lock_timeout=args.lock_timeout,
+        lock=not args.no_lock,
+    )
 
     if not args.quiet:
+        if result.skipped:
+            print("Skipped: entry matches the previous handoff message.")
+            return
+        entry = result.appended[0]
         print(f"Appended handoff entry: {entry.agent} -> {entry.handoff or 'unspecified'}")
         print(f"Log: {log_path}")
+        _print_lock_wait(result)
+
+
+def _as_list(record: dict, key: str) -> List[str]:
+    """Accept a list of strings or a single string from a batch record."""
+    value = record.get(key)
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [value]
+    if not isinstance(value, list):
+        raise ValueError(f"'{key}' must be a string or a list")
+    return [str(item) for item in value]
+
+
+def _entry_from_record(record: dict) -> ConversationEntry:
+    """Build an entry from one batch JSON object (same names as the CLI flags)."""
+    for key in ("agent", "summary"):
+        if not str(record.get(key) or "").strip():
+            raise ValueError(f"missing required field '{key}'")
+
+    def optional(key: str, default: Optional[str] = None) -> Optional[str]:
+        value = record.get(key, default)
+        if value is None:
+            return None
+        return str(value).strip() or None
+
+    raw_timestamp = record.get("timestamp")
+    if raw_timestamp is not None and not isinstance(raw_timestamp, str):
+        raise ValueError(f"invalid timestamp {raw_timestamp!r} (expected an ISO8601 string)")
+    try:
+        timestamp = _parse_timestamp(raw_timestamp)
+    except SystemExit:
+        raise ValueError(f"invalid timestamp {raw_timestamp!r}") from None
+
+    details = record.get("details") or ""
+    return ConversationEntry(
+        summary=str(record["summary"]).strip(),
+        agent=str(record["agent"]).strip(),
+        role=optional("role", "assistant") or "assistant",
+        details=textwrap.dedent(str(details)).strip(),
+        tasks=_clean_items(_as_list(record, "tasks")),
+        tags=_clean_items(_as_list(record, "tags")),
+        references=_clean_items(_as_list(record, "references")),
+        handoff=optional("handoff"),
+        context=optional("context"),
+        status=optional("status", "ready"),
+        notes=_clean_items(_as_list(record, "notes")),
+        timestamp=timestamp,
+    )
+
+
+def read_batch(source: str) -> List[ConversationEntry]:
+    """Read entries from a JSONL file, or from STDIN when source is '-'."""
+    handle = sys.stdin if source == "-" else None
+    try:
+        if handle is None:
+            handle = open(source, "r", encoding="utf-8")
+    except FileNotFoundError as exc:
+        raise SystemExit(f"Batch file not found: {exc.filename}") from exc
+    entries: List[ConversationEntry] = []
+    try:
+        for line_no, line in enumerate(handle, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                if not isinstance(record, dict):
+                    raise ValueError("expected a JSON object")
+                entries.append(_entry_from_record(record))
+            except ValueError as exc:
+                raise SystemExit(f"Invalid batch record on line {line_no}: {exc}") from exc
+    finally:
+        if handle is not sys.stdin:
+            handle.close()
+    return entries
+
+
+def append_batch(args: argparse.Namespace) -> None:
+    """Append every entry from a JSONL batch in one locked, buffered write."""
+    start = time.perf_counter()
+    entries = read_batch(args.batch)
+    result = write_entries(
+        args.logfile,
+        entries,
+        boundary=args.boundary,
+        project=args.project,
+        force=args.force,
+        lock_timeout=args.lock_timeout,
+        lock=not args.no_lock,
+    )
+    elapsed = time.perf_counter() - start
+    if not args.quiet:
+        rate = len(result.appended) / elapsed if elapsed > 0 else 0.0
+        print(
+            f"Appended {len(result.appended)} entries "
+            f"({len(result.skipped)} duplicates skipped) "
+            f"in {elapsed * 1000:.1f} ms ({rate:,.0f} entries/sec)"
+        )
+        print(f"Log: {args.logfile}")
+        _print_lock_wait(result)
+
+
+def _entry_matches(logged: LoggedEntry, args: argparse.Namespace) -> bool:
+    """Check a parsed entry against the query filters."""
+    entry = logged.entry
+    scalar_filters = (
+        (args.agent, entry.agent),
+        (args.role, entry.role),
+        (args.handoff, entry.handoff),
+        (args.status, entry.status),
+        (args.context, entry.context),
+    )
+    for wanted, actual in scalar_filters:
+        if wanted is not None and (actual or "").lower() != wanted.lower():
+            return False
+    if args.tag:
+        tags = {tag.lower() for tag in entry.tags}
+        if not all(tag.lower() in tags for tag in args.tag):
+            return False
+    if args.since is not None and entry.timestamp < args.since:
+        return False
+    if args.until is not None and entry.timestamp > args.until:
+        return False
+    return True
+
+
+def _entry_to_json(logged: LoggedEntry) -> str:
+    """Serialize a parsed entry as one JSON line."""
+    record = asdict(logged.entry)
+    record["timestamp"] = logged.entry.timestamp.strftime("%Y-%m-%dT%H:%M:%SZ")
+    record["project"] = logged.project
+    record["offset"] = logged.offset
+    record["segment"] = logged.segment
+    return json.dumps(record, sort_keys=True)
+
+
+def query_entries(args: argparse.Namespace) -> int:
+    """Stream matching entries to stdout; returns the number printed."""
+    printed = 0
+    if args.limit is not None and args.limit <= 0:
+        return printed
+    for logged in iter_log_entries(args.logfile, args.boundary, newest_first=args.newest_first):
+        if not _entry_matches(logged, args):
+            continue
+        if args.format == "jsonl":
+            sys.stdout.write(_entry_to_json(logged) + "\n")
+        else:
+            if printed:
+                sys.stdout.write("\n")
+            sys.stdout.write(f"{args.boundary}\n{logged.text}\n")
+        printed += 1
+        if args.limit is not None and printed >= args.limit:
+            break
+    sys.stdout.flush()
+    return printed
+
+
+def build_query_parser() -> argparse.ArgumentParser:
+    """Build the argument parser for the query subcommand."""
+    parser = argparse.ArgumentParser(
+        prog="update_agent_conversation_log.py query",
+        description=(
+            "Stream entries from the conversation log, filtered by header fields. "
+            "Runs in constant memory regardless of log size."
+        ),
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=textwrap.dedent("""
+        Examples:
+          # What did gemini_auditor say this week?
+          python3 update_agent_conversation_log.py query \\
+            --agent gemini_auditor --since 2026-10-12
+
+          # Last 5 blocked entries as JSON lines
+          python3 update_agent_conversation_log.py query \\
+            --status blocked --newest-first --limit 5 --format jsonl
+        """),
+    )
+    parser.add_argument("--agent", help="Only entries from this agent.")
+    parser.add_argument("--role", help="Only entries with this role.")
+    parser.add_argument("--handoff", help="Only entries handed off to this target.")
+    parser.add_argument("--status", help="Only entries with this status.")
+    parser.add_argument("--context", help="Only entries with this context label.")
+    parser.add_argument(
+        "--tag", action="append",
+        help="Only entries carrying this tag (repeatable; all must match)."
+    )
+    parser.add_argument(
+        "--since", type=_parse_timestamp,
+        help="Only entries at or after this ISO8601 timestamp (UTC if no offset)."
+    )
+    parser.add_argument(
+        "--until", type=_parse_timestamp,
+        help="Only entries at or before this ISO8601 timestamp (UTC if no offset)."
+    )
+    parser.add_argument(
+        "--limit", type=int,
+        help="Stop after this many matching entries."
+    )
+    parser.add_argument(
+        "--newest-first", action="store_true",
+        help="Iterate from the end of the log backwards."
+    )
+    parser.add_argument(
+        "--format", choices=("markdown", "jsonl"), default="markdown",
+        help="Output format (default: markdown)."
+    )
+    parser.add_argument(
+        "--logfile", type=Path, default=DEFAULT_LOG_PATH,
+        help=f"Log file path (default: {DEFAULT_LOG_PATH})."
+    )
+    parser.add_argument(
+        "--boundary", default=DEFAULT_BOUNDARY,
+        help="Boundary marker between entries."
+    )
+    return parser
 
 
 def build_parser() -> argparse.ArgumentParser:
@@ -250,17 +1430,29 @@ def build_parser() -> argparse.ArgumentParser:
             --context documentation \\
             --tag api --tag docs \\
             --handoff human
+
+          # Append many entries from JSON lines in one write
+          python3 update_agent_conversation_log.py --batch handoffs.jsonl
+
+          # Seal the log into monthly segments, gzipping sealed ones
+          python3 update_agent_conversation_log.py --rotate monthly --compress-sealed
+
+          # Rebuild the sidecar index
+          python3 update_agent_conversation_log.py --reindex
+
+          # Query the log (see: update_agent_conversation_log.py query --help)
+          python3 update_agent_conversation_log.py query --agent reviewer --limit 3
         """),
     )
     
-    # Required arguments
+    # Required arguments (unless --reindex)
     parser.add_argument(
-        "--agent", required=True,
-        help="Name of the agent emitting this handoff."
+        "--agent",
+        help="Name of the agent emitting this handoff (required)."
     )
     parser.add_argument(
-        "--summary", required=True,
-        help="Short headline summarizing what was done."
+        "--summary",
+        help="Short headline summarizing what was done (required)."
     )
     
     # Optional arguments
@@ -342,13 +1534,84 @@ def build_parser() -> argparse.ArgumentParser:
         "--quiet", action="store_true",
         help="Suppress console output."
     )
+    parser.add_argument(
+        "--lock-timeout", type=float, default=DEFAULT_LOCK_TIMEOUT,
+        help=f"Seconds to wait for the log lock (default: {DEFAULT_LOCK_TIMEOUT:g})."
+    )
+    parser.add_argument(
+        "--no-lock", action="store_true",
+        help="Append without taking the advisory log lock."
+    )
+    parser.add_argument(
+        "--batch", metavar="FILE.jsonl",
+        help=(
+            "Append every entry from a JSONL file ('-' for STDIN) in one write. "
+            "Keys match the flags: agent, summary, role, handoff, status, context, "
+            "tasks, references, tags, notes, details, timestamp."
+        )
+    )
+    parser.add_argument(
+        "--rotate", choices=ROTATE_CHOICES,
+        help=f"Set the segment rotation policy (stored in <stem>{MANIFEST_SUFFIX})."
+    )
+    parser.add_argument(
+        "--rotate-size", type=int, metavar="BYTES",
+        help=f"Seal the active segment at this size with --rotate size "
+             f"(default: {DEFAULT_ROTATE_SIZE})."
+    )
+    parser.add_argument(
+        "--compress-sealed", dest="compress_sealed", action="store_const", const=True,
+        help="Gzip segments when they are sealed (stored in the manifest)."
+    )
+    parser.add_argument(
+        "--no-compress-sealed", dest="compress_sealed", action="store_const", const=False,
+        help="Keep sealed segments as plain markdown."
+    )
+    parser.add_argument(
+        "--reindex", action="store_true",
+        help=f"Rebuild the sidecar index (<log>{INDEX_SUFFIX}) from scratch and exit."
+    )
     
     return parser
 
 
-def main() -> None:
+def main(argv: Optional[List[str]] = None) -> None:
     """Main entry point."""
-    args = build_parser().parse_args()
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] == "query":
+        query_entries(build_query_parser().parse_args(argv[1:]))
+        return
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.reindex:
+        with LogLock(args.logfile, timeout=args.lock_timeout, enabled=not args.no_lock):
+            count = rebuild_index(args.logfile, args.boundary)
+        if not args.quiet:
+            print(f"Indexed {count} entries: {_index_path(args.logfile)}")
+        return
+    if args.rotate or args.rotate_size is not None or args.compress_sealed is not None:
+        args.logfile.parent.mkdir(parents=True, exist_ok=True)
+        with LogLock(args.logfile, timeout=args.lock_timeout, enabled=not args.no_lock):
+            policy = configure_rotation(
+                args.logfile,
+                rotate=args.rotate,
+                max_bytes=args.rotate_size,
+                compress=args.compress_sealed,
+            )
+        if not args.quiet:
+            print(
+                f"Rotation policy: {policy.rotate} (max {policy.max_bytes} bytes, "
+                f"compress sealed: {'yes' if policy.compress else 'no'})"
+            )
+        if not (args.batch or args.agent or args.summary):
+            return
+    if args.batch:
+        append_batch(args)
+        return
+    missing = [flag for flag in ("agent", "summary") if not getattr(args, flag)]
+    if missing:
+        parser.error("the following arguments are required: "
+                     + ", ".join(f"--{flag}" for flag in missing))
     append_entry(args)
 
 
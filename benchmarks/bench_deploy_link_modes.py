@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""Benchmark deploy_agent_kit.py fan-out by link mode.
+
+Copies this repository's .agent/ kit into a scratch directory, pads it with
+large read-only assets (skills/ and ai/) and tool scripts, then deploys it to
+many fresh destinations with deploy_fleet() once per --link-mode. For each
+mode it reports wall time, bytes the process wrote (wchar from
+/proc/self/io, Linux only) and disk usage of the destinations counted over
+unique inodes, so hardlinked files are only counted once.
+
+Usage:
+  python3 benchmarks/bench_deploy_link_modes.py
+  python3 benchmarks/bench_deploy_link_modes.py --dests 500 --modes copy,hardlink
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Optional, Set, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+
+import deploy_agent_kit as dak  # noqa: E402
+
+
+def bytes_written() -> Optional[int]:
+    """Bytes this process has passed to write(), or None off Linux."""
+    try:
+        for line in Path("/proc/self/io").read_text().splitlines():
+            if line.startswith("wchar:"):
+                return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def disk_usage(root: Path) -> int:
+    """Allocated bytes under ``root``, counting each inode once."""
+    seen: Set[Tuple[int, int]] = set()
+    total = 0
+    for dirpath, _dirnames, filenames in os.walk(root):
+        for name in filenames:
+            st = os.lstat(os.path.join(dirpath, name))
+            key = (st.st_dev, st.st_ino)
+            if key not in seen:
+                seen.add(key)
+                total += st.st_blocks * 512
+    return total
+
+
+def build_kit(root: Path, pad_files: int, pad_size: int) -> Path:
+    kit = root / "kit" / ".agent"
+    shutil.copytree(REPO_ROOT / ".agent", kit, ignore=shutil.ignore_patterns(
+        "__pycache__", ".cache", "agent_handoffs"))
+    blob = os.urandom(pad_size)
+    for i in range(pad_files):
+        area = ("skills/bench", "ai/bench", "tools/bench")[i % 3]
+        path = kit / area / f"asset_{i:03d}.bin"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(blob[i:] + blob[:i])
+    # --link-mode hardlink only links read-only prompts, rules and skills
+    for area in ("skills", "ai/prompts", "ai/rules"):
+        for path in (kit / area).rglob("*"):
+            if path.is_file():
+                path.chmod(path.stat().st_mode & ~0o222)
+    return kit
+
+
+def run_mode(kit: Path, root: Path, mode: str, count: int, workers: int) -> Tuple[float, Optional[int], int]:
+    dests: List[Path] = []
+    for i in range(count):
+        dest = root / mode / f"repo{i:04d}"
+        dest.mkdir(parents=True)
+        dests.append(dest)
+    before = bytes_written()
+    start = time.perf_counter()
+    results = dak.deploy_fleet(kit, dests, workers=workers, link_mode=mode)
+    elapsed = time.perf_counter() - start
+    after = bytes_written()
+    errors = [err for _dest, result in results for err in result.errors]
+    if errors:
+        raise SystemExit(f"{mode}: {errors[0]}")
+    written = None if before is None or after is None else after - before
+    return elapsed, written, disk_usage(root / mode)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark deploy fan-out by link mode.")
+    parser.add_argument("--dests", type=int, default=200, help="Destinations per mode (default: 200).")
+    parser.add_argument("--modes", default="copy,reflink,hardlink,auto",
+                        help="Comma-separated link modes (default: all).")
+    parser.add_argument("--pad-files", type=int, default=30,
+                        help="Extra files added to the kit (default: 30).")
+    parser.add_argument("--pad-size", type=int, default=1024 * 1024,
+                        help="Size of each extra file in bytes (default: 1 MiB).")
+    parser.add_argument("--workers", type=int, default=dak.DEFAULT_WORKERS,
+                        help=f"Parallel deploys (default: {dak.DEFAULT_WORKERS}).")
+    parser.add_argument("--dir", type=Path, default=None, help="Scratch directory (default: temp).")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        root = Path(tmp)
+        kit = build_kit(root, args.pad_files, args.pad_size)
+        kit_size = disk_usage(kit)
+        print(f"kit: {kit_size / 1e6:.1f} MB, {args.dests} destinations per mode")
+        print(f"{'mode':>9}  {'wall':>9}  {'written':>11}  {'disk used':>11}")
+        for mode in args.modes.split(","):
+            mode = mode.strip()
+            if mode not in dak.LINK_MODES:
+                parser.error(f"unknown link mode: {mode}")
+            elapsed, written, used = run_mode(kit, root, mode, args.dests, args.workers)
+            shown = "-" if written is None else f"{written / 1e6:.1f} MB"
+            print(f"{mode:>9}  {elapsed:>7.2f} s  {shown:>11}  {used / 1e6:>8.1f} MB")
+            shutil.rmtree(root / mode)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""Benchmark end-to-end gemini_audit.py runs by how the result is logged.
+
+Each audit is a full ``gemini_audit.py`` process against the stand-in Gemini
+CLI (tests/gemini_support.py) with the environment checks cached, so the
+wall time is the script's own overhead plus logging. Three setups:
+
+  no-log       --no-log, the floor
+  in-process   log_handoff() imported from update_agent_conversation_log
+  subprocess   the logger import blocked, so the fallback runs
+               update_agent_conversation_log.py in a child interpreter
+               (what every audit did before)
+
+Audits alternate between an approved and a rejected plan so every entry is
+appended rather than skipped as a duplicate. The handoff log is seeded to
+--log-size first.
+
+Usage:
+  python3 benchmarks/bench_gemini_audit_logging.py
+  python3 benchmarks/bench_gemini_audit_logging.py --audits 40 --log-size 50M
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Optional
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(REPO_ROOT / "benchmarks"))
+
+from bench_log_append import build_log, parse_size  # noqa: E402
+from tests.gemini_support import NO_LOGGER, make_fake_cli, make_project, run_audit  # noqa: E402
+
+LOG_PATH = Path(".agent/docs/agent_handoffs/agent_conversation_log.md")
+
+SETUPS = {
+    "no-log": (["--no-log"], []),
+    "in-process": ([], []),
+    "subprocess": ([], NO_LOGGER),
+}
+
+
+def time_audits(repo: Path, bin_dir: Path, args: List[str], python_args: List[str], count: int) -> List[float]:
+    timings = []
+    for i in range(count):
+        plan = "plan_b.md" if i % 2 else "plan_a.md"
+        start = time.perf_counter()
+        result = run_audit(
+            ["--no-worker", "--no-cache", "--full", "--quiet", "--plan", plan, *args],
+            repo, [bin_dir], python_args=python_args,
+        )
+        timings.append(time.perf_counter() - start)
+        if result.returncode not in (0, 1):
+            raise SystemExit(f"audit failed ({result.returncode}): {result.stderr or result.stdout}")
+    return timings
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark gemini_audit.py result logging.")
+    parser.add_argument("--audits", type=int, default=20, help="Audits per setup (default: 20).")
+    parser.add_argument("--log-size", default="1M", help="Seeded handoff log size (default: 1M).")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bin_dir = make_fake_cli(Path(tmp) / "bin")
+        repo = make_project(Path(tmp) / "repo")
+        (repo / "plan_a.md").write_text("1. Build the form.\n", encoding="utf-8")
+        (repo / "plan_b.md").write_text("REJECTME: skip the tests.\n", encoding="utf-8")
+        log = repo / LOG_PATH
+        log.parent.mkdir(parents=True, exist_ok=True)
+        build_log(log, parse_size(args.log_size))
+        time_audits(repo, bin_dir, ["--no-log"], [], 1)     # fills the environment cache
+
+        print(f"handoff log {args.log_size}, {args.audits} audits per setup")
+        print(f"{'setup':>10}  {'p50':>9}  {'max':>9}  {'logging':>9}")
+        floor = None
+        for name, (extra, python_args) in SETUPS.items():
+            before = log.stat().st_size
+            runs = time_audits(repo, bin_dir, extra, python_args, args.audits)
+            if name != "no-log" and log.stat().st_size == before:
+                raise SystemExit(f"{name}: nothing was logged")
+            p50 = statistics.median(runs)
+            floor = p50 if floor is None else floor
+            print(f"{name:>10}  {p50 * 1000:>6.0f} ms  {max(runs) * 1000:>6.0f} ms"
+                  f"  {(p50 - floor) * 1000:>6.0f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""Benchmark per-audit overhead of gemini_audit.py with a stand-in Gemini CLI.
+
+The stand-in (tests/gemini_support.py) sleeps --startup seconds on every
+launch, like Node.js loading the real CLI, and answers instantly otherwise,
+so the wall time of an audit is all overhead. Three setups are timed:
+
+  cold    GEMINI_ENV_TTL=0, no worker: node --version, gemini --version and
+          the audit itself each pay a cold start (the original behaviour)
+  cached  environment checks served from .agent/.cache/gemini_env.json
+  worker  audits sent to a running ``gemini_audit.py --serve``, which keeps
+          a pre-started CLI waiting
+
+Usage:
+  python3 benchmarks/bench_gemini_cold_start.py
+  python3 benchmarks/bench_gemini_cold_start.py --startup 0.5 --audits 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Optional
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+
+from tests.gemini_support import GEMINI_AUDIT, make_fake_cli, make_project, run_audit  # noqa: E402
+
+AUDIT_ARGS = ["--no-cache", "--no-log", "--full", "--quiet"]
+
+
+def time_audits(repo: Path, bin_dir: Path, env: dict, extra: List[str], count: int, gap: float) -> List[float]:
+    timings = []
+    for _ in range(count):
+        start = time.perf_counter()
+        result = run_audit(AUDIT_ARGS + extra, repo, [bin_dir], env)
+        timings.append(time.perf_counter() - start)
+        if result.returncode != 0:
+            raise SystemExit(f"audit failed ({result.returncode}): {result.stderr or result.stdout}")
+        time.sleep(gap)
+    return timings
+
+
+def start_worker(repo: Path, bin_dir: Path, env: dict) -> subprocess.Popen:
+    full_env = dict(os.environ, PATH=str(bin_dir), **env)
+    proc = subprocess.Popen(
+        [sys.executable, str(GEMINI_AUDIT), "--serve", "--quiet"],
+        cwd=repo, env=full_env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    socket_path = repo / ".agent/.cache/gemini_audit.sock"
+    deadline = time.monotonic() + 30
+    while not socket_path.exists():
+        if proc.poll() is not None or time.monotonic() > deadline:
+            raise SystemExit("audit worker did not start")
+        time.sleep(0.05)
+    return proc
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark gemini_audit.py per-audit overhead.")
+    parser.add_argument("--startup", type=float, default=0.3,
+                        help="Stand-in CLI start-up time in seconds (default: 0.3).")
+    parser.add_argument("--audits", type=int, default=10, help="Audits per setup (default: 10).")
+    parser.add_argument("--gap", type=float, default=None,
+                        help="Pause between audits (default: 1.5 x --startup, time for the worker's spare).")
+    args = parser.parse_args(argv)
+    gap = args.startup * 1.5 if args.gap is None else args.gap
+    env = {"FAKE_GEMINI_STARTUP": str(args.startup)}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bin_dir = make_fake_cli(Path(tmp) / "bin")
+        print(f"stand-in CLI start-up {args.startup * 1000:.0f} ms, {args.audits} audits per setup")
+        print(f"{'setup':>7}  {'p50':>9}  {'max':>9}")
+        for setup in ("cold", "cached", "worker"):
+            repo = make_project(Path(tmp) / setup)
+            worker = None
+            if setup == "cold":
+                runs = time_audits(repo, bin_dir, dict(env, GEMINI_ENV_TTL="0"), ["--no-worker"],
+                                   args.audits, gap)
+            elif setup == "cached":
+                time_audits(repo, bin_dir, env, ["--no-worker"], 1, 0)   # fills the env cache
+                runs = time_audits(repo, bin_dir, env, ["--no-worker"], args.audits, gap)
+            else:
+                worker = start_worker(repo, bin_dir, env)
+                try:
+                    time.sleep(gap)
+                    runs = time_audits(repo, bin_dir, env, [], args.audits, gap)
+                finally:
+                    worker.send_signal(signal.SIGINT)
+                    worker.wait(timeout=30)
+            print(f"{setup:>7}  {statistics.median(runs) * 1000:>6.0f} ms  {max(runs) * 1000:>6.0f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""Benchmark the generated lmstudio_mcp.py HTTP client against a local stub.
+
+Starts an OpenAI-compatible stub server (tests/lmstudio_support.py) and
+times _call_lmstudio() over the pooled keep-alive client, sequentially and
+from several threads, reporting p50/p99 latency and requests/sec. For
+comparison it also times what the server did before the pool: one
+``curl`` subprocess per call with the JSON payload on argv. Finally it
+sends a message too large for a single argv string to both.
+
+Usage:
+  python3 benchmarks/bench_lmstudio_pool.py
+  python3 benchmarks/bench_lmstudio_pool.py --requests 2000 --threads 1,4,16
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, List, Optional
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+
+from tests.lmstudio_support import StubLLM, load_server  # noqa: E402
+
+MESSAGES = [{"role": "user", "content": "Explain this function. " * 20}]
+
+
+def curl_call(url: str, messages: list) -> str:
+    """The pre-pool transport: fork curl, pass the payload on argv, new TCP connection."""
+    payload = {"model": "local-model", "messages": messages, "temperature": 0.7,
+               "max_tokens": -1, "stream": False}
+    result = subprocess.run(
+        ["curl", "-s", "-X", "POST", url + "/v1/chat/completions",
+         "-H", "Content-Type: application/json", "-d", json.dumps(payload)],
+        capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"curl exited {result.returncode}")
+    return json.loads(result.stdout)["choices"][0]["message"]["content"]
+
+
+def measure(call: Callable[[], str], requests: int, threads: int) -> str:
+    latencies: List[float] = []
+
+    def one(_: int) -> None:
+        start = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(one, range(requests)))
+    elapsed = time.perf_counter() - started
+    cuts = statistics.quantiles(latencies, n=100)
+    return f"{cuts[49] * 1000:>8.2f} ms  {cuts[98] * 1000:>8.2f} ms  {requests / elapsed:>8.0f}"
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the generated MCP server's HTTP client.")
+    parser.add_argument("--requests", type=int, default=1000, help="Calls per run (default: 1000).")
+    parser.add_argument("--threads", default="1,4", help="Comma-separated concurrency (default: 1,4).")
+    parser.add_argument("--delay", type=float, default=0.0,
+                        help="Stub server latency per request in seconds (default: 0).")
+    parser.add_argument("--no-baseline", action="store_true", help="Skip the curl baseline.")
+    args = parser.parse_args(argv)
+
+    with StubLLM(delay=args.delay) as stub:
+        server = load_server({"LMSTUDIO_ENDPOINTS": stub.url, "LMSTUDIO_HEALTH_INTERVAL": "0"})
+        clients = [("pool", lambda: server._call_lmstudio(MESSAGES))]
+        if not args.no_baseline and shutil.which("curl"):
+            clients.append(("curl", lambda: curl_call(stub.url, MESSAGES)))
+
+        print(f"{'client':>6}  {'threads':>7}  {'p50':>11}  {'p99':>11}  {'req/s':>8}")
+        for name, call in clients:
+            # The subprocess baseline is far slower; a tenth of the calls is enough
+            requests = args.requests if name == "pool" else max(100, args.requests // 10)
+            for threads in (int(t) for t in args.threads.split(",")):
+                print(f"{name:>6}  {threads:>7}  {measure(call, requests, threads)}")
+
+        big = [{"role": "user", "content": "x" * 300_000}]
+        for name, call in clients:
+            func = server._call_lmstudio if name == "pool" else lambda m: curl_call(stub.url, m)
+            try:
+                func(big)
+                outcome = "ok"
+            except Exception as exc:
+                outcome = f"failed ({type(exc).__name__}: {exc})"
+            print(f"{name:>6}  300 KB message: {outcome}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""Benchmark handoff log append latency against log size.
+
+Builds logs of increasing size and times single-entry appends through
+write_entries() (tail-seek duplicate check, lock, index update). For
+comparison it also times what the pre-tail-seek append paid before writing:
+reading the whole log and splitting it on the boundary.
+
+Usage:
+  python3 benchmarks/bench_log_append.py
+  python3 benchmarks/bench_log_append.py --sizes 1K,1M,100M,500M --repeat 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import re
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / ".agent" / "tools" / "utilities"))
+
+import update_agent_conversation_log as ucl  # noqa: E402
+
+UNITS = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+
+
+def parse_size(text: str) -> int:
+    text = text.strip().upper()
+    if text[-1] in UNITS:
+        return int(float(text[:-1]) * UNITS[text[-1]])
+    return int(text)
+
+
+def build_log(path: Path, size: int) -> None:
+    """Fill ``path`` with rendered entries up to about ``size`` bytes."""
+    entries = []
+    for i in range(200):
+        entry = ucl.ConversationEntry(
+            summary=f"Seed entry {i}", agent="builder", role="assistant",
+            tasks=["Review the change"], references=["src/module.py"],
+            timestamp=datetime(2026, 1, 1, tzinfo=timezone.utc),
+        )
+        entries.append(f"{ucl.DEFAULT_BOUNDARY}\n{entry.render('bench').rstrip()}\n\n")
+    chunk = "\n".join(entries).encode("utf-8")
+    with path.open("wb") as out:
+        out.write(b"# Handoff log\n\n")
+        written = 0
+        while written < size:
+            piece = chunk[: size - written] if size - written < len(chunk) else chunk
+            out.write(piece)
+            written += len(piece)
+        out.write(b"\n")
+
+
+def time_appends(path: Path, repeat: int) -> List[float]:
+    timings = []
+    # First append also indexes the seeded log; it is not timed
+    for i in range(repeat + 1):
+        entry = ucl.ConversationEntry(summary=f"Bench append {i}", agent="bench", role="assistant")
+        start = time.perf_counter()
+        ucl.write_entries(path, [entry], project="bench")
+        if i:
+            timings.append(time.perf_counter() - start)
+    return timings
+
+
+def time_whole_read(path: Path, repeat: int) -> List[float]:
+    pattern = re.compile(rf"^{re.escape(ucl.DEFAULT_BOUNDARY)}\s*$", re.MULTILINE)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        pattern.split(path.read_text(encoding="utf-8"))
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark log append latency vs log size.")
+    parser.add_argument("--sizes", default="1K,1M,100M,500M",
+                        help="Comma-separated log sizes (default: 1K,1M,100M,500M).")
+    parser.add_argument("--repeat", type=int, default=5, help="Appends per size (default: 5).")
+    parser.add_argument("--dir", type=Path, default=None, help="Scratch directory (default: temp).")
+    parser.add_argument("--no-baseline", action="store_true",
+                        help="Skip timing the whole-file read.")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        print(f"{'log size':>10}  {'append p50':>11}  {'append max':>11}  {'whole read p50':>15}")
+        for label in args.sizes.split(","):
+            size = parse_size(label)
+            log = Path(tmp) / f"log_{label.strip()}.md"
+            build_log(log, size)
+            appends = time_appends(log, args.repeat)
+            baseline = "-" if args.no_baseline else (
+                f"{statistics.median(time_whole_read(log, args.repeat)) * 1000:.2f} ms"
+            )
+            print(
+                f"{label.strip():>10}  {statistics.median(appends) * 1000:>8.2f} ms"
+                f"  {max(appends) * 1000:>8.2f} ms  {baseline:>15}"
+            )
+            for path in Path(tmp).iterdir():
+                path.unlink()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -10,22 +10,57 @@ Usage:
     python3 deploy_agent_kit.py --dest /path/to/repo
     python3 deploy_agent_kit.py --dest /path/to/repo --force
     python3 deploy_agent_kit.py --dest /path/to/repo --dry-run
+    python3 deploy_agent_kit.py --dest /path/to/repo --sync
+    python3 deploy_agent_kit.py --dest-glob '/srv/repos/*' --sync --workers 16
 
 Flags:
-    --dest      Target repository path (required)
+    --dest      Target repository path (repeatable)
+    --dest-file File listing destination paths, one per line ('-' for STDIN)
+    --dest-glob Glob pattern matching destination paths (repeatable)
+    --workers   Destinations deployed in parallel (default: 8)
+    --link-mode copy|reflink|hardlink|auto: share file data with the kit
+                where the filesystem allows, falling back to a plain copy.
+                Only the explicit hardlink mode shares inodes with the kit,
+                and only for kit files that are already read-only
+    --atomic    Build the new tree in .agent.staging and swap it in with one
+                rename, keeping the old tree in .agent.previous. Without
+                renameat2 the swap takes two renames; one interrupted between
+                them is finished by the next --atomic or --rollback run
+    --rollback  Swap .agent.previous back in
     --force     Overwrite existing files
     --dry-run   Preview changes without writing
+    --sync      Copy only changed files, keep local edits, remove files
+                dropped from the kit (tracked in .agent/.cache/deploy_manifest.json)
+
+Every deploy except --dry-run records the files it writes in
+.agent/.cache/deploy_manifest.json (plain deploys did not before --sync
+existed), so a later --sync can tell kit files from local edits.
 """
 
 from __future__ import annotations
 
 import argparse
+import ctypes
+import errno
+import fnmatch
+import glob
+import hashlib
+import json
 import os
 import shutil
+import stat
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX platforms
+    fcntl = None
 
 
 # Files/patterns to add to .gitignore
@@ -33,8 +68,70 @@ GITIGNORE_ENTRIES = [
     "# Agent Collaboration Kit (local-only)",
     "conversation.compact.md",
     ".reports/",
+    "agent_conversation_log*.idx",
+    "agent_conversation_log*.lock",
+    ".agent/.cache/",
+    ".agent.staging/",
+    ".agent.previous/",
+    ".agent.deploy.lock",
+    ".agent.swap.json",
 ]
 
+# Stamp of the last .gitignore found complete, relative to dest/.agent
+GITIGNORE_STAMP = Path(".cache") / "gitignore.json"
+
+# Local-only files and directories that are never deployed
+SKIP_SUFFIXES = (".pyc", ".idx", ".lock")
+SKIP_DIRS = ("__pycache__", ".cache")
+
+# The kit's own handoff state: sealed log segments (plain or gzipped), the
+# segment manifest and the condensed summary. The log template itself ships.
+SKIP_NAMES = (
+    "agent_conversation_log.*.md",
+    "agent_conversation_log.*.md.gz",
+    "agent_conversation_log.segments.json",
+)
+
+# Per-destination record of what --sync deployed, relative to dest/.agent
+DEPLOY_MANIFEST = Path(".cache") / "deploy_manifest.json"
+DEPLOY_MANIFEST_VERSION = 1
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Fleet deploys: parallel destinations, and how much of the kit is held in memory
+DEFAULT_WORKERS = 8
+SOURCE_CACHE_LIMIT = 64 * 1024 * 1024
+
+# How file data reaches the destination (see SourceFile.write_to)
+LINK_MODES = ("copy", "reflink", "hardlink", "auto")
+DEFAULT_LINK_MODE = "copy"
+
+# Kit subtrees that agents only read; the only files ever hardlinked, and only
+# with --link-mode hardlink. Linked files share one inode with the kit source,
+# so an in-place edit would change every repository: only files that are
+# already read-only in the kit are linked (a deploy never changes the kit).
+HARDLINK_DIRS = ("ai/prompts", "ai/rules", "skills")
+
+# ioctl(dest_fd, FICLONE, src_fd) shares extents on btrfs/XFS (linux/fs.h)
+FICLONE = 0x40049409
+
+# Atomic deploys (siblings of dest/.agent)
+STAGING_DIR = ".agent.staging"
+PREVIOUS_DIR = ".agent.previous"
+DEPLOY_LOCK = ".agent.deploy.lock"
+
+# Journal of a multi-rename swap in progress: {"op", "new", "old"}, where
+# "new" holds the tree that becomes .agent and "old" the one for
+# .agent.previous. Present only while the renames run.
+SWAP_JOURNAL = ".agent.swap.json"
+
+# Paths under .agent that agents keep writing to (handoff logs, rotated
+# segments, indexes, caches); re-linked from the live tree right before a swap
+MUTABLE_DIRS = (Path("docs") / "agent_handoffs", Path(".cache"))
+
+# renameat2(2) flag that swaps two paths in one step (Linux 3.15+)
+AT_FDCWD = -100
+RENAME_EXCHANGE = 2
+
 
 @dataclass
 class DeployResult:
@@ -42,8 +139,131 @@ class DeployResult:
     copied: List[Path] = field(default_factory=list)
     skipped: List[Path] = field(default_factory=list)
     overwritten: List[Path] = field(default_factory=list)
+    unchanged: List[Path] = field(default_factory=list)
+    updated: List[Path] = field(default_factory=list)
+    removed: List[Path] = field(default_factory=list)
+    modified: List[Path] = field(default_factory=list)
+    unrecorded: List[Path] = field(default_factory=list)
     gitignore_updated: bool = False
     errors: List[str] = field(default_factory=list)
+    methods: Dict[Path, str] = field(default_factory=dict)
+    swap: Optional[str] = None
+    cutover_ms: float = 0.0
+    recovered: Optional[str] = None
+
+
+def _clone_file(src: Path, dest: Path, size: int) -> Optional[str]:
+    """Copy without userspace buffers: FICLONE, then copy_file_range.
+
+    Returns the method used, or None if the filesystem supports neither.
+    """
+    with src.open("rb") as fsrc, dest.open("wb") as fdst:
+        if fcntl is not None:
+            try:
+                fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+                return "reflink"
+            except OSError:
+                pass
+        if size and hasattr(os, "copy_file_range"):
+            copied = 0
+            try:
+                while copied < size:
+                    count = os.copy_file_range(fsrc.fileno(), fdst.fileno(), size - copied)
+                    if not count:
+                        break
+                    copied += count
+            except OSError:
+                return None
+            if copied == size:
+                return "copy_range"
+    return None
+
+
+def _break_link(dest: Path) -> None:
+    """Unlink a hardlinked destination so writing it cannot alter the kit."""
+    try:
+        if dest.stat().st_nlink > 1:
+            dest.unlink()
+    except FileNotFoundError:
+        pass
+
+
+@dataclass
+class SourceFile:
+    """A kit file scanned once and shared by every destination."""
+    rel_path: Path
+    path: Path
+    stat: os.stat_result
+    data: Optional[bytes] = None
+    _digest: Optional[str] = field(default=None, repr=False)
+    
+    def digest(self) -> str:
+        """BLAKE2b digest of the source file, computed at most once."""
+        if self._digest is None:
+            if self.data is not None:
+                self._digest = hashlib.blake2b(self.data, digest_size=32).hexdigest()
+            else:
+                self._digest = file_digest(self.path)
+        return self._digest
+    
+    @property
+    def linkable(self) -> bool:
+        """True for template files agents only read (prompts, rules, skills)."""
+        rel = self.rel_path.as_posix()
+        return any(rel.startswith(prefix + "/") for prefix in HARDLINK_DIRS)
+    
+    @property
+    def shareable(self) -> bool:
+        """True if --link-mode hardlink may link the file: linkable and read-only."""
+        return self.linkable and not self.stat.st_mode & 0o222
+    
+    def _copy_mode(self) -> int:
+        mode = self.stat.st_mode & 0o7777
+        if self.linkable:
+            # The source may be read-only so that it can be linked; a copy is private
+            mode |= stat.S_IWUSR
+        return mode
+    
+    def _copy_metadata(self, dest: Path) -> None:
+        os.chmod(dest, self._copy_mode())
+        os.utime(dest, ns=(self.stat.st_atime_ns, self.stat.st_mtime_ns))
+    
+    def _hardlink(self, dest: Path) -> bool:
+        """Replace ``dest`` with a hardlink to the source; False if unsupported."""
+        tmp = dest.with_name(f".{dest.name}.link-tmp")
+        try:
+            if os.path.lexists(tmp):
+                tmp.unlink()
+            os.link(self.path, tmp)
+            os.replace(tmp, dest)
+            return True
+        except OSError:
+            if os.path.lexists(tmp):
+                tmp.unlink()
+            return False
+    
+    def write_to(self, dest: Path, link_mode: str = DEFAULT_LINK_MODE) -> str:
+        """Write the file to ``dest`` with the source mode and timestamps.
+
+        Returns the method used: hardlink, reflink, copy_range or copy.
+        """
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        if link_mode == "hardlink" and self.shareable and self._hardlink(dest):
+            return "hardlink"
+        _break_link(dest)
+        if link_mode in ("reflink", "auto"):
+            method = _clone_file(self.path, dest, self.stat.st_size)
+            if method:
+                self._copy_metadata(dest)
+                return method
+        if self.data is None:
+            shutil.copy2(self.path, dest)
+            os.chmod(dest, self._copy_mode())
+        else:
+            with dest.open("wb") as f:
+                f.write(self.data)
+            self._copy_metadata(dest)
+        return "copy"
 
 
 def find_kit_source() -> Path:
@@ -77,41 +297,201 @@ def iter_source_files(source_dir: Path) -> List[Path]:
     files = []
     for path in source_dir.rglob("*"):
         if path.is_file():
-            # Skip __pycache__ and .pyc files
-            if "__pycache__" in path.parts or path.suffix == ".pyc":
+            # Skip caches, .pyc files, local log index/lock files and log state
+            rel_parts = path.relative_to(source_dir).parts
+            if any(part in SKIP_DIRS for part in rel_parts) or path.suffix in SKIP_SUFFIXES:
+                continue
+            if any(fnmatch.fnmatch(path.name, pattern) for pattern in SKIP_NAMES):
                 continue
             files.append(path)
     return sorted(files)
 
 
-def copy_file(src: Path, dest: Path, *, force: bool, dry_run: bool) -> str:
-    """Copy a single file, returning the outcome."""
+def scan_source(source_dir: Path, *, cache_limit: int = SOURCE_CACHE_LIMIT) -> List[SourceFile]:
+    """Stat every kit file once, keeping contents in memory up to ``cache_limit`` bytes."""
+    files = []
+    budget = cache_limit
+    for path in iter_source_files(source_dir):
+        src_stat = path.stat()
+        data = None
+        if src_stat.st_size <= budget:
+            data = path.read_bytes()
+            budget -= len(data)
+        files.append(SourceFile(path.relative_to(source_dir), path, src_stat, data))
+    return files
+
+
+def copy_file(
+    src: SourceFile,
+    dest: Path,
+    *,
+    force: bool,
+    dry_run: bool,
+    link_mode: str = DEFAULT_LINK_MODE,
+) -> Tuple[str, Optional[str]]:
+    """Copy a single file, returning (outcome, write method)."""
     if dest.exists():
         if not force:
-            return "skipped"
+            return "skipped", None
         if dry_run:
-            return "would_overwrite"
-        dest.parent.mkdir(parents=True, exist_ok=True)
-        shutil.copy2(src, dest)
-        return "overwritten"
+            return "would_overwrite", None
+        return "overwritten", src.write_to(dest, link_mode)
     
     if dry_run:
-        return "would_copy"
+        return "would_copy", None
     
-    dest.parent.mkdir(parents=True, exist_ok=True)
-    shutil.copy2(src, dest)
-    return "copied"
+    return "copied", src.write_to(dest, link_mode)
+
+
+def file_digest(path: Path) -> str:
+    """Return the BLAKE2b digest of a file, read in chunks."""
+    digest = hashlib.blake2b(digest_size=32)
+    with path.open("rb") as handle:
+        for chunk in iter(lambda: handle.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_deploy_manifest(dest_agent_dir: Path) -> Dict[str, dict]:
+    """Load the per-destination sync manifest (rel path -> file record)."""
+    try:
+        data = json.loads((dest_agent_dir / DEPLOY_MANIFEST).read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        return {}
+    if data.get("version") != DEPLOY_MANIFEST_VERSION:
+        return {}
+    return dict(data.get("files") or {})
+
+
+def save_deploy_manifest(dest_agent_dir: Path, files: Dict[str, dict]) -> None:
+    """Write the sync manifest atomically."""
+    path = dest_agent_dir / DEPLOY_MANIFEST
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    payload = {"version": DEPLOY_MANIFEST_VERSION, "files": files}
+    tmp_path.write_text(json.dumps(payload, indent=1, sort_keys=True) + "\n", encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+def _manifest_record(
+    src_stat: os.stat_result, dest_stat: os.stat_result, digest: Optional[str]
+) -> dict:
+    return {
+        "src_size": src_stat.st_size,
+        "src_mtime_ns": src_stat.st_mtime_ns,
+        "size": dest_stat.st_size,
+        "mtime_ns": dest_stat.st_mtime_ns,
+        "hash": digest,
+    }
+
+
+def _matches_record(record: dict, stat: os.stat_result, prefix: str = "") -> bool:
+    return (
+        record.get(prefix + "size") == stat.st_size
+        and record.get(prefix + "mtime_ns") == stat.st_mtime_ns
+    )
+
+
+def sync_file(
+    src: SourceFile,
+    dest: Path,
+    previous: Optional[dict],
+    *,
+    force: bool,
+    dry_run: bool,
+    link_mode: str = DEFAULT_LINK_MODE,
+) -> Tuple[str, Optional[dict], Optional[str]]:
+    """Bring one destination file up to date.
+
+    Returns (outcome, manifest record, write method).
+
+    Size and mtime are compared first; file contents are hashed only when
+    those disagree. A destination file that changed since the last deploy is
+    treated as a local edit and kept unless ``force`` is set.
+    """
+    src_stat = src.stat
+    try:
+        dest_stat = dest.stat()
+    except FileNotFoundError:
+        if dry_run:
+            return "would_copy", None, None
+        method = src.write_to(dest, link_mode)
+        return "copied", _manifest_record(src_stat, dest.stat(), None), method
+
+    # Neither side touched since the last sync: no reads at all
+    if previous and _matches_record(previous, src_stat, "src_") and _matches_record(previous, dest_stat):
+        return "unchanged", previous, None
+
+    if src_stat.st_size == dest_stat.st_size:
+        if src_stat.st_mtime_ns == dest_stat.st_mtime_ns:
+            return "unchanged", _manifest_record(src_stat, dest_stat, None), None
+        digest = src.digest()
+        if digest == file_digest(dest):
+            return "unchanged", _manifest_record(src_stat, dest_stat, digest), None
+
+    deployed_untouched = previous is not None and _matches_record(previous, dest_stat)
+    if not (deployed_untouched or force):
+        return "modified", previous, None
+    if dry_run:
+        return "would_update", previous, None
+    method = src.write_to(dest, link_mode)
+    return "updated", _manifest_record(src_stat, dest.stat(), None), method
+
+
+def _remove_dropped(
+    dest_agent_dir: Path,
+    dropped: Dict[str, dict],
+    result: DeployResult,
+    *,
+    dry_run: bool,
+) -> None:
+    """Delete files the kit no longer ships, unless they were edited locally."""
+    for rel, record in sorted(dropped.items()):
+        rel_path = Path(rel)
+        dest_file = dest_agent_dir / rel_path
+        try:
+            dest_stat = dest_file.stat()
+        except FileNotFoundError:
+            continue
+        if not _matches_record(record, dest_stat):
+            result.modified.append(rel_path)
+            continue
+        try:
+            if not dry_run:
+                dest_file.unlink()
+            result.removed.append(rel_path)
+        except OSError as e:
+            result.errors.append(f"Error removing {rel_path}: {e}")
+
+
+def _gitignore_stamp(gitignore: os.stat_result) -> dict:
+    entries = hashlib.blake2b("\n".join(GITIGNORE_ENTRIES).encode("utf-8"), digest_size=16)
+    return {"size": gitignore.st_size, "mtime_ns": gitignore.st_mtime_ns,
+            "entries": entries.hexdigest()}
 
 
 def update_gitignore(dest_repo: Path, *, dry_run: bool) -> bool:
-    """Ensure .gitignore contains required entries."""
+    """Ensure .gitignore contains required entries.
+
+    A .gitignore already found complete is not read again while its size and
+    mtime match the stamp in .agent/.cache. Missing entries are added by
+    writing a new file and renaming it over the old one.
+    """
     gitignore_path = dest_repo / ".gitignore"
+    stamp_path = dest_repo / ".agent" / GITIGNORE_STAMP
     
-    if gitignore_path.exists():
-        existing = gitignore_path.read_text(encoding="utf-8")
-    else:
-        existing = ""
+    try:
+        current = gitignore_path.stat()
+    except FileNotFoundError:
+        current = None
+    if current is not None:
+        try:
+            if json.loads(stamp_path.read_text(encoding="utf-8")) == _gitignore_stamp(current):
+                return False
+        except (OSError, ValueError):
+            pass
     
+    existing = gitignore_path.read_text(encoding="utf-8") if current is not None else ""
     lines = [line.rstrip() for line in existing.splitlines()]
     
     # Check which entries are missing
@@ -123,22 +503,251 @@ def update_gitignore(dest_repo: Path, *, dry_run: bool) -> bool:
         if entry not in lines:
             missing.append(entry)
     
-    if not missing:
-        return False
-    
-    if dry_run:
+    if missing and dry_run:
         return True
+    if dry_run:
+        return False
     
-    # Append missing entries
-    with gitignore_path.open("a", encoding="utf-8") as f:
+    if missing:
+        # Append missing entries
+        text = existing
         if existing and not existing.endswith("\n"):
-            f.write("\n")
-        f.write("\n")
-        for entry in GITIGNORE_ENTRIES:
-            if entry.startswith("#") or entry in missing:
-                f.write(f"{entry}\n")
+            text += "\n"
+        text += "\n" + "".join(
+            f"{entry}\n" for entry in GITIGNORE_ENTRIES
+            if entry.startswith("#") or entry in missing
+        )
+        target = gitignore_path.resolve() if gitignore_path.is_symlink() else gitignore_path
+        tmp_path = target.with_name(".gitignore.deploy-tmp")
+        tmp_path.write_text(text, encoding="utf-8")
+        if current is not None:
+            os.chmod(tmp_path, current.st_mode & 0o7777)
+        os.replace(tmp_path, target)
     
-    return True
+    if (dest_repo / ".agent").is_dir():
+        stamp_path.parent.mkdir(parents=True, exist_ok=True)
+        stamp_path.write_text(json.dumps(_gitignore_stamp(gitignore_path.stat())) + "\n",
+                              encoding="utf-8")
+    return bool(missing)
+
+
+def _rename_exchange(first: Path, second: Path) -> bool:
+    """Atomically swap two paths; False if renameat2 is unavailable."""
+    try:
+        renameat2 = ctypes.CDLL(None, use_errno=True).renameat2
+    except (AttributeError, OSError):
+        return False
+    renameat2.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_int, ctypes.c_char_p, ctypes.c_uint]
+    if renameat2(AT_FDCWD, os.fsencode(first), AT_FDCWD, os.fsencode(second), RENAME_EXCHANGE) == 0:
+        return True
+    err = ctypes.get_errno()
+    if err in (errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP):
+        return False
+    raise OSError(err, os.strerror(err), str(first))
+
+
+@contextmanager
+def _deploy_lock(dest_repo: Path) -> Iterator[None]:
+    """Fail fast if another atomic deploy or rollback holds this destination."""
+    if fcntl is None:
+        yield
+        return
+    lock_path = dest_repo / DEPLOY_LOCK
+    with lock_path.open("a") as handle:
+        try:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise OSError(errno.EBUSY, "another deploy is in progress", str(lock_path))
+        try:
+            yield
+        finally:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+
+def _remove_tree(path: Path) -> None:
+    if os.path.lexists(path):
+        shutil.rmtree(path)
+
+
+def _link_tree(src: Path, dst: Path) -> None:
+    """Mirror ``src`` into ``dst`` with hardlinks, copying where links fail."""
+    dst.mkdir()
+    for root, dirs, names in os.walk(src):
+        target = dst / os.path.relpath(root, src)
+        for name in list(dirs):
+            if os.path.islink(os.path.join(root, name)):
+                dirs.remove(name)
+                names.append(name)
+            else:
+                (target / name).mkdir()
+        for name in names:
+            path = os.path.join(root, name)
+            if os.path.islink(path):
+                os.symlink(os.readlink(path), target / name)
+                continue
+            try:
+                os.link(path, target / name)
+            except OSError:
+                shutil.copy2(path, target / name)
+
+
+def _resync_mutable(live: Path, staged: Path, keep: Set[Path]) -> None:
+    """Point ``staged``'s MUTABLE_DIRS at the files currently in ``live``.
+
+    Files created or replaced in the live tree since ``staged`` was built
+    (rotated log segments, rewritten indexes) are hardlinked in, and files
+    since removed from it are dropped. Paths in ``keep`` (relative to .agent)
+    are left as staged.
+    """
+    for sub in MUTABLE_DIRS:
+        present = set()
+        for root, _dirs, names in os.walk(live / sub):
+            for name in names:
+                rel = Path(os.path.relpath(os.path.join(root, name), live))
+                present.add(rel)
+                if rel in keep:
+                    continue
+                src, dst = live / rel, staged / rel
+                try:
+                    src_stat = os.lstat(src)
+                    if os.path.lexists(dst) and os.path.samestat(src_stat, os.lstat(dst)):
+                        continue
+                    dst.parent.mkdir(parents=True, exist_ok=True)
+                    tmp = dst.with_name(dst.name + ".resync")
+                    if os.path.lexists(tmp):
+                        os.unlink(tmp)
+                    try:
+                        os.link(src, tmp, follow_symlinks=False)
+                    except OSError:
+                        shutil.copy2(src, tmp, follow_symlinks=False)
+                    os.replace(tmp, dst)
+                except FileNotFoundError:
+                    # Removed from the live tree while we looked
+                    present.discard(rel)
+        for root, _dirs, names in os.walk(staged / sub):
+            for name in names:
+                rel = Path(os.path.relpath(os.path.join(root, name), staged))
+                if rel not in present and rel not in keep:
+                    os.unlink(staged / rel)
+
+
+def _journaled_renames(dest_repo: Path, op: str, new: Path, old: Path,
+                       renames: List[Tuple[Path, Path]]) -> None:
+    """Run ``renames`` with a journal so an interruption can be finished later."""
+    journal = dest_repo / SWAP_JOURNAL
+    tmp_path = journal.with_name(journal.name + ".tmp")
+    tmp_path.write_text(json.dumps({"op": op, "new": new.name, "old": old.name}) + "\n",
+                        encoding="utf-8")
+    os.replace(tmp_path, journal)
+    for src, dst in renames:
+        os.rename(src, dst)
+    journal.unlink()
+
+
+def recover_swap(dest_repo: Path) -> Optional[str]:
+    """Finish a multi-rename swap that was interrupted; returns its op or None.
+
+    Call with the deploy lock held. The tree recorded as "new" becomes .agent
+    if .agent is missing, and the one recorded as "old" becomes
+    .agent.previous if it is still elsewhere.
+    """
+    journal = dest_repo / SWAP_JOURNAL
+    try:
+        data = json.loads(journal.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
+    except ValueError:
+        data = {}
+    live = dest_repo / ".agent"
+    previous = dest_repo / PREVIOUS_DIR
+    new = dest_repo / data.get("new", STAGING_DIR)
+    old = dest_repo / data.get("old", PREVIOUS_DIR)
+    if not os.path.lexists(live) and os.path.lexists(new):
+        os.rename(new, live)
+    if old != previous and os.path.lexists(old) and not os.path.lexists(previous):
+        os.rename(old, previous)
+    journal.unlink()
+    return data.get("op", "swap")
+
+
+def _swap_in(staging: Path, live: Path, previous: Path) -> str:
+    """Make ``staging`` the live tree, keeping the old one at ``previous``."""
+    if not os.path.lexists(live):
+        os.rename(staging, live)
+        return "rename"
+    if _rename_exchange(staging, live):
+        os.rename(staging, previous)
+        return "exchange"
+    # .agent is missing between these renames; the journal lets the next run finish
+    _journaled_renames(live.parent, "deploy", staging, previous,
+                       [(live, previous), (staging, live)])
+    return "two renames"
+
+
+def rollback(dest_repo: Path) -> str:
+    """Swap .agent.previous back in (running it again rolls forward)."""
+    live = dest_repo / ".agent"
+    previous = dest_repo / PREVIOUS_DIR
+    with _deploy_lock(dest_repo):
+        if recover_swap(dest_repo) == "rollback":
+            # The rollback that was interrupted is now complete
+            return "recovered"
+        if not previous.is_dir():
+            raise OSError(errno.ENOENT, "no previous deploy to roll back to", str(previous))
+        if not os.path.lexists(live):
+            os.rename(previous, live)
+            return "rename"
+        # Handoff logs and caches carry on from the live tree, not the old one
+        _resync_mutable(live, previous, {DEPLOY_MANIFEST})
+        if _rename_exchange(previous, live):
+            return "exchange"
+        staging = dest_repo / STAGING_DIR
+        _remove_tree(staging)
+        _journaled_renames(dest_repo, "rollback", previous, staging,
+                           [(live, staging), (previous, live), (staging, previous)])
+        return "three renames"
+
+
+def _deploy_staged(
+    files: List[SourceFile],
+    dest_repo: Path,
+    result: DeployResult,
+    *,
+    force: bool,
+    sync: bool,
+    link_mode: str,
+) -> None:
+    """Deploy into a hardlinked copy of .agent, then swap it in.
+
+    Unchanged and local-only files are shared with the live tree by hardlink
+    (so handoff log appends made meanwhile are kept); changed files are
+    written as new inodes. Files agents create or replace under MUTABLE_DIRS
+    while the tree is staged are re-linked just before the swap; only writes
+    landing between that re-link and the rename itself can be missed. On any
+    error the staged tree is dropped and the live tree is left untouched.
+    """
+    live = dest_repo / ".agent"
+    staging = dest_repo / STAGING_DIR
+    with _deploy_lock(dest_repo):
+        result.recovered = recover_swap(dest_repo)
+        _remove_tree(staging)
+        if live.is_dir():
+            _link_tree(live, staging)
+        else:
+            staging.mkdir()
+        _deploy_files(files, staging, result, force=force, dry_run=False, sync=sync, link_mode=link_mode)
+        if result.errors:
+            shutil.rmtree(staging, ignore_errors=True)
+            result.errors.append("Staged tree discarded; .agent was not changed")
+            return
+        if live.is_dir():
+            written = result.copied + result.overwritten + result.updated + result.removed
+            _resync_mutable(live, staging, set(written) | {DEPLOY_MANIFEST})
+        previous = dest_repo / PREVIOUS_DIR
+        _remove_tree(previous)
+        started = time.perf_counter()
+        result.swap = _swap_in(staging, live, previous)
+        result.cutover_ms = (time.perf_counter() - started) * 1000
 
 
 def deploy(
@@ -147,38 +756,255 @@ def deploy(
     *,
     force: bool = False,
     dry_run: bool = False,
+    sync: bool = False,
+    files: Optional[List[SourceFile]] = None,
+    link_mode: str = DEFAULT_LINK_MODE,
+    atomic: bool = False,
 ) -> DeployResult:
-    """Deploy the kit to the destination repository."""
+    """Deploy the kit to the destination repository.
+
+    ``files`` is a scan from scan_source() shared across destinations; when
+    omitted the source is scanned without caching contents. With ``atomic``
+    the new tree is staged next to .agent and swapped in with one rename.
+    """
     result = DeployResult()
+    if files is None:
+        files = scan_source(source_dir, cache_limit=0)
     
-    # Determine destination .agent folder
-    dest_agent_dir = dest_repo / ".agent"
+    if atomic and not dry_run:
+        try:
+            _deploy_staged(files, dest_repo, result, force=force, sync=sync, link_mode=link_mode)
+        except OSError as e:
+            result.errors.append(f"Error in atomic deploy: {e}")
+        if result.errors:
+            return result
+    else:
+        _deploy_files(
+            files, dest_repo / ".agent", result,
+            force=force, dry_run=dry_run, sync=sync, link_mode=link_mode,
+        )
+    
+    # Update .gitignore
+    try:
+        result.gitignore_updated = update_gitignore(dest_repo, dry_run=dry_run)
+    except OSError as e:
+        result.errors.append(f"Error updating .gitignore: {e}")
+    
+    return result
+
+
+def _deploy_files(
+    files: List[SourceFile],
+    dest_agent_dir: Path,
+    result: DeployResult,
+    *,
+    force: bool,
+    dry_run: bool,
+    sync: bool,
+    link_mode: str,
+) -> None:
+    """Write kit files into ``dest_agent_dir``, recording outcomes in ``result``.
+
+    Every deploy records what it wrote in the sync manifest, so a later
+    --sync can tell kit files from local edits.
+    """
+    previous = load_deploy_manifest(dest_agent_dir) if sync else {}
+    # A destination deployed before without --sync has no records yet
+    first_sync = sync and not (dest_agent_dir / DEPLOY_MANIFEST).exists()
+    manifest: Dict[str, dict] = {}
     
     # Copy all files
-    for src_file in iter_source_files(source_dir):
-        rel_path = src_file.relative_to(source_dir)
+    for src_file in files:
+        rel_path = src_file.rel_path
         dest_file = dest_agent_dir / rel_path
         
         try:
-            outcome = copy_file(src_file, dest_file, force=force, dry_run=dry_run)
+            if sync:
+                rel_key = rel_path.as_posix()
+                outcome, record, method = sync_file(
+                    src_file, dest_file, previous.get(rel_key),
+                    force=force, dry_run=dry_run, link_mode=link_mode,
+                )
+                if record is not None:
+                    manifest[rel_key] = record
+            else:
+                outcome, method = copy_file(
+                    src_file, dest_file, force=force, dry_run=dry_run, link_mode=link_mode
+                )
+                if outcome in ("copied", "overwritten"):
+                    manifest[rel_path.as_posix()] = _manifest_record(
+                        src_file.stat, dest_file.stat(), None
+                    )
+            if method:
+                result.methods[rel_path] = method
             
             if outcome in ("copied", "would_copy"):
                 result.copied.append(rel_path)
             elif outcome in ("overwritten", "would_overwrite"):
                 result.overwritten.append(rel_path)
+            elif outcome in ("updated", "would_update"):
+                result.updated.append(rel_path)
+            elif outcome == "unchanged":
+                result.unchanged.append(rel_path)
+            elif outcome == "modified":
+                result.modified.append(rel_path)
+                if first_sync:
+                    result.unrecorded.append(rel_path)
             else:
                 result.skipped.append(rel_path)
                 
         except OSError as e:
             result.errors.append(f"Error copying {rel_path}: {e}")
     
-    # Update .gitignore
-    try:
-        result.gitignore_updated = update_gitignore(dest_repo, dry_run=dry_run)
-    except OSError as e:
-        result.errors.append(f"Error updating .gitignore: {e}")
+    if sync:
+        dropped = {rel: rec for rel, rec in previous.items() if rel not in manifest}
+        _remove_dropped(dest_agent_dir, dropped, result, dry_run=dry_run)
+        if not dry_run and manifest != previous:
+            try:
+                save_deploy_manifest(dest_agent_dir, manifest)
+            except OSError as e:
+                result.errors.append(f"Error writing deploy manifest: {e}")
+    elif manifest and not dry_run:
+        try:
+            save_deploy_manifest(dest_agent_dir, {**load_deploy_manifest(dest_agent_dir), **manifest})
+        except OSError as e:
+            result.errors.append(f"Error writing deploy manifest: {e}")
+
+
+def check_destination(dest: Path) -> Optional[str]:
+    """Return an error message if ``dest`` cannot be deployed to."""
+    if not dest.exists():
+        return f"Destination does not exist: {dest}"
+    if not dest.is_dir():
+        return f"Destination is not a directory: {dest}"
+    return None
+
+
+def collect_destinations(
+    dests: List[Path], dest_file: Optional[str], dest_globs: List[str]
+) -> List[Path]:
+    """Resolve --dest, --dest-file and --dest-glob into a de-duplicated list."""
+    candidates = list(dests)
+    if dest_file:
+        text = sys.stdin.read() if dest_file == "-" else Path(dest_file).read_text(encoding="utf-8")
+        for line in text.splitlines():
+            line = line.strip()
+            if line and not line.startswith("#"):
+                candidates.append(Path(line).expanduser())
+    for pattern in dest_globs:
+        matches = sorted(glob.glob(os.path.expanduser(pattern)))
+        candidates.extend(Path(match) for match in matches if os.path.isdir(match))
     
-    return result
+    seen = set()
+    resolved = []
+    for candidate in candidates:
+        dest = candidate.resolve()
+        if dest not in seen:
+            seen.add(dest)
+            resolved.append(dest)
+    return resolved
+
+
+def deploy_fleet(
+    source_dir: Path,
+    dests: List[Path],
+    *,
+    workers: int = DEFAULT_WORKERS,
+    force: bool = False,
+    dry_run: bool = False,
+    sync: bool = False,
+    link_mode: str = DEFAULT_LINK_MODE,
+    atomic: bool = False,
+) -> List[Tuple[Path, DeployResult]]:
+    """Deploy to many repositories, scanning the source once and copying in parallel."""
+    files = scan_source(source_dir)
+    
+    def run(dest: Path) -> DeployResult:
+        error = check_destination(dest)
+        if error:
+            return DeployResult(errors=[error])
+        try:
+            return deploy(
+                source_dir, dest,
+                force=force, dry_run=dry_run, sync=sync,
+                files=files, link_mode=link_mode, atomic=atomic,
+            )
+        except OSError as e:
+            return DeployResult(errors=[f"Error deploying: {e}"])
+    
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        return list(zip(dests, pool.map(run, dests)))
+
+
+def _result_counts(result: DeployResult, dry_run: bool) -> str:
+    """One-line summary of a DeployResult, listing non-zero counts only."""
+    labels = [
+        ("would copy" if dry_run else "copied", result.copied),
+        ("would overwrite" if dry_run else "overwritten", result.overwritten),
+        ("would update" if dry_run else "updated", result.updated),
+        ("would remove" if dry_run else "removed", result.removed),
+        ("kept", result.modified),
+        ("skipped", result.skipped),
+        ("unchanged", result.unchanged),
+        ("errors", result.errors),
+    ]
+    parts = [f"{label} {len(items)}" for label, items in labels if items]
+    return ", ".join(parts) if parts else "nothing to deploy"
+
+
+def _method_counts(methods: Dict[Path, str]) -> str:
+    """Summarize write methods, e.g. 'hardlink 12, copy_range 31'."""
+    counts: Dict[str, int] = {}
+    for method in methods.values():
+        counts[method] = counts.get(method, 0) + 1
+    return ", ".join(f"{method} {count}" for method, count in sorted(counts.items()))
+
+
+def print_fleet_result(
+    results: List[Tuple[Path, DeployResult]], dry_run: bool, elapsed: float, workers: int
+) -> None:
+    """Print one line per destination and the aggregate totals."""
+    prefix = "[DRY RUN] " if dry_run else ""
+    
+    print(f"\n{prefix}Agent Collaboration Kit Fleet Deployment")
+    print(f"{'=' * 40}")
+    print(f"Destinations: {len(results)} (workers: {workers})\n")
+    
+    total = DeployResult()
+    gitignores = 0
+    failed = 0
+    swaps = []
+    unrecorded = 0
+    for dest, result in results:
+        print(f"  {dest}: {_result_counts(result, dry_run)}")
+        for err in result.errors:
+            print(f"    ! {err}")
+        for name in ("copied", "skipped", "overwritten", "unchanged", "updated", "removed", "modified", "errors"):
+            getattr(total, name).extend(getattr(result, name))
+        total.methods.update({dest / rel: method for rel, method in result.methods.items()})
+        gitignores += result.gitignore_updated
+        if result.swap:
+            swaps.append(result.cutover_ms)
+        failed += bool(result.errors)
+        unrecorded += bool(result.unrecorded)
+    
+    print(f"\nTotal: {_result_counts(total, dry_run)}")
+    if total.methods:
+        print(f"Written by: {_method_counts(total.methods)}")
+    if gitignores:
+        action = "Would update" if dry_run else "Updated"
+        print(f"{action} .gitignore in {gitignores} repositor{'y' if gitignores == 1 else 'ies'}")
+    if swaps:
+        print(f"Atomic swaps: {len(swaps)} (max cutover {max(swaps):.2f} ms)")
+    if unrecorded:
+        print(
+            f"First sync in {unrecorded} destination(s) deployed without --sync: files that "
+            "differ from the kit were kept.\nIf they were not edited locally, run --sync "
+            "--force once for those destinations."
+        )
+    if failed:
+        print(f"Failed: {failed} destination(s)")
+    print(f"Finished in {elapsed:.2f}s")
 
 
 def print_result(result: DeployResult, dest: Path, dry_run: bool) -> None:
@@ -212,6 +1038,50 @@ def print_result(result: DeployResult, dest: Path, dry_run: bool) -> None:
         if len(result.skipped) > 3:
             print(f"  ... and {len(result.skipped) - 3} more")
     
+    if result.updated:
+        print(f"\n{'Would update' if dry_run else 'Updated'}: {len(result.updated)} file(s)")
+        for f in result.updated[:5]:
+            print(f"  ~ {f}")
+        if len(result.updated) > 5:
+            print(f"  ... and {len(result.updated) - 5} more")
+    
+    if result.removed:
+        print(f"\n{'Would remove' if dry_run else 'Removed'}: {len(result.removed)} file(s)")
+        for f in result.removed[:5]:
+            print(f"  x {f}")
+        if len(result.removed) > 5:
+            print(f"  ... and {len(result.removed) - 5} more")
+    
+    if result.modified:
+        print(f"\nKept (changed in destination): {len(result.modified)} file(s)")
+        for f in result.modified[:3]:
+            print(f"  - {f}")
+        if len(result.modified) > 3:
+            print(f"  ... and {len(result.modified) - 3} more")
+        print("  Use --force to replace them with the kit version.")
+        if result.unrecorded:
+            print(
+                f"  {len(result.unrecorded)} of them have no sync record: this destination was "
+                "deployed without --sync, so\n"
+                "  older kit versions cannot be told apart from local edits. If nothing was "
+                "edited here,\n"
+                "  run --sync --force once; later syncs then update kit files automatically."
+            )
+    
+    if result.unchanged:
+        print(f"\nUnchanged: {len(result.unchanged)} file(s)")
+    
+    if result.methods:
+        print(f"\nWritten by: {_method_counts(result.methods)}")
+    
+    if result.recovered:
+        print(f"\nFinished an interrupted {result.recovered} swap first")
+    
+    if result.swap:
+        print(f"\nSwapped in staged tree by {result.swap} (cutover {result.cutover_ms:.2f} ms)")
+        if result.swap != "rename":
+            print(f"  Previous tree kept in {PREVIOUS_DIR}/; undo with --rollback")
+    
     if result.gitignore_updated:
         action = "Would update" if dry_run else "Updated"
         print(f"\n{action} .gitignore with local-only entries")
@@ -221,7 +1091,7 @@ def print_result(result: DeployResult, dest: Path, dry_run: bool) -> None:
         for err in result.errors:
             print(f"  ! {err}")
     
-    if not dry_run and (result.copied or result.overwritten):
+    if not dry_run and (result.copied or result.overwritten or result.updated):
         print("\n[OK] Deployment complete!")
         print("\nNext steps:")
         print("  1. Review and customize .agent/AGENTS.md")
@@ -233,7 +1103,12 @@ def print_result(result: DeployResult, dest: Path, dry_run: bool) -> None:
 def build_parser() -> argparse.ArgumentParser:
     """Build the argument parser."""
     parser = argparse.ArgumentParser(
-        description="Deploy the Portable Agent Collaboration Kit to a repository.",
+        description=(
+            "Deploy the Portable Agent Collaboration Kit to a repository.\n\n"
+            "Every deploy except --dry-run records the files it writes in\n"
+            f".agent/{DEPLOY_MANIFEST.as_posix()}, so a later --sync can tell kit files\n"
+            "from local edits."
+        ),
         formatter_class=argparse.RawDescriptionHelpFormatter,
         epilog="""
 Examples:
@@ -245,14 +1120,40 @@ Examples:
 
   # Preview what would be copied
   python3 deploy_agent_kit.py --dest /path/to/my-project --dry-run
+
+  # Re-deploy only what changed since the last sync
+  python3 deploy_agent_kit.py --dest /path/to/my-project --sync
+
+  # Roll out to a fleet of repositories, 16 at a time
+  python3 deploy_agent_kit.py --dest ~/src/api --dest ~/src/web --sync
+  python3 deploy_agent_kit.py --dest-file repos.txt --sync --workers 16
+  python3 deploy_agent_kit.py --dest-glob '/srv/repos/*' --dry-run
         """,
     )
     
     parser.add_argument(
         "--dest",
         type=Path,
-        required=True,
-        help="Destination repository path.",
+        action="append",
+        default=[],
+        help="Destination repository path (repeatable).",
+    )
+    parser.add_argument(
+        "--dest-file",
+        default=None,
+        help="File listing destination paths, one per line ('-' for STDIN, '#' comments).",
+    )
+    parser.add_argument(
+        "--dest-glob",
+        action="append",
+        default=[],
+        help="Glob pattern matching destination directories (repeatable).",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help=f"Destinations deployed in parallel (default: {DEFAULT_WORKERS}).",
     )
     parser.add_argument(
         "--source",
@@ -265,6 +1166,44 @@ Examples:
         action="store_true",
         help="Overwrite existing files in the destination.",
     )
+    parser.add_argument(
+        "--sync",
+        action="store_true",
+        help=(
+            "Copy only new or changed files (size+mtime, then BLAKE2 hash), keep "
+            "files edited in the destination, and remove files dropped from the kit."
+        ),
+    )
+    parser.add_argument(
+        "--link-mode",
+        choices=LINK_MODES,
+        default=DEFAULT_LINK_MODE,
+        help=(
+            "How files are written: copy (default); reflink (FICLONE, then "
+            "copy_file_range); hardlink (prompts, rules and skills that are "
+            "read-only in the kit share its inode, so every linked repository sees "
+            "the same file; make them read-only first, e.g. chmod -R a-w "
+            ".agent/skills; other files are copied); auto (reflink where "
+            "supported, never hardlink). "
+            "Unsupported methods fall back to a plain copy."
+        ),
+    )
+    parser.add_argument(
+        "--atomic",
+        action="store_true",
+        help=(
+            f"Build the new tree in {STAGING_DIR}/ (hardlinking unchanged files) and "
+            f"swap it in with one rename, keeping the old tree in {PREVIOUS_DIR}/. "
+            "Where renameat2(RENAME_EXCHANGE) is unavailable the swap takes two "
+            "renames and .agent/ is briefly missing; a swap interrupted there is "
+            f"finished (from {SWAP_JOURNAL}) by the next --atomic or --rollback run."
+        ),
+    )
+    parser.add_argument(
+        "--rollback",
+        action="store_true",
+        help=f"Swap {PREVIOUS_DIR}/ back in as .agent/ and exit.",
+    )
     parser.add_argument(
         "--dry-run",
         action="store_true",
@@ -276,17 +1215,37 @@ Examples:
 
 def main() -> None:
     """Main entry point."""
-    args = build_parser().parse_args()
+    parser = build_parser()
+    args = parser.parse_args()
     
-    dest: Path = args.dest.resolve()
+    try:
+        dests = collect_destinations(args.dest, args.dest_file, args.dest_glob)
+    except OSError as e:
+        parser.error(f"cannot read --dest-file: {e}")
+    if not dests:
+        parser.error("no destinations given (use --dest, --dest-file or --dest-glob)")
+    fleet = len(dests) > 1 or bool(args.dest_file or args.dest_glob)
     
     # Validate destination
-    if not dest.exists():
-        print(f"Error: Destination does not exist: {dest}", file=sys.stderr)
-        sys.exit(1)
-    if not dest.is_dir():
-        print(f"Error: Destination is not a directory: {dest}", file=sys.stderr)
-        sys.exit(1)
+    if not fleet:
+        error = check_destination(dests[0])
+        if error:
+            print(f"Error: {error}", file=sys.stderr)
+            sys.exit(1)
+    
+    if args.rollback:
+        failed = False
+        for dest in dests:
+            if args.dry_run:
+                found = (dest / PREVIOUS_DIR).is_dir()
+                print(f"[DRY RUN] {dest}: {'would roll back' if found else 'no previous deploy'}")
+                continue
+            try:
+                print(f"Rolled back {dest} ({rollback(dest)})")
+            except OSError as e:
+                print(f"Error: {dest}: {e}", file=sys.stderr)
+                failed = True
+        sys.exit(1 if failed else 0)
     
     # Find or use specified source
     if args.source:
@@ -297,12 +1256,33 @@ def main() -> None:
     else:
         source = find_kit_source()
     
+    if fleet:
+        started = time.perf_counter()
+        results = deploy_fleet(
+            source,
+            dests,
+            workers=args.workers,
+            force=args.force,
+            dry_run=args.dry_run,
+            sync=args.sync,
+            link_mode=args.link_mode,
+            atomic=args.atomic,
+        )
+        print_fleet_result(results, args.dry_run, time.perf_counter() - started, args.workers)
+        if any(result.errors for _, result in results):
+            sys.exit(1)
+        return
+    
     # Deploy
+    dest = dests[0]
     result = deploy(
         source_dir=source,
         dest_repo=dest,
         force=args.force,
         dry_run=args.dry_run,
+        sync=args.sync,
+        link_mode=args.link_mode,
+        atomic=args.atomic,
     )
     
     # Print results
@@ -7,7 +7,7 @@ It performs the following:
 1. Checks for necessary dependencies (mcp package).
 2. Generates the `lmstudio_mcp.py` server script.
 3. Generates or advises on `mcp-config.json`.
-4. Verifies connection to LM Studio (localhost:1234).
+4. Verifies connection to LM Studio (localhost:1234, or each URL in LMSTUDIO_ENDPOINTS).
 
 Usage:
     python3 setup_offline_ai.py
@@ -25,10 +25,16 @@ LMSTUDIO_HOST = "http://127.0.0.1"
 LMSTUDIO_PORT = 1234
 MCP_SERVER_SCRIPT_NAME = "lmstudio_mcp.py"
 MCP_CONFIG_NAME = "mcp-config.json"
+# Several OpenAI-compatible backends, comma-separated (defaults to the one above)
+LMSTUDIO_ENDPOINTS = [
+    url.strip().rstrip("/")
+    for url in os.environ.get("LMSTUDIO_ENDPOINTS", f"{LMSTUDIO_HOST}:{LMSTUDIO_PORT}").split(",")
+    if url.strip()
+]
 
 # Content for the MCP server script
 MCP_SERVER_CONTENT = r'''# lmstudio_mcp.py
-import json, subprocess, os, sys
+import json, os, sys
 # Try to import mcp, if not found, we might need to rely on the environment
 try:
     from mcp.server.fastmcp import FastMCP
@@ -46,7 +52,15 @@ except ImportError:
     pass
 
 # --- PASTE OF USER'S PROVIDED WRAPPER LOGIC ---
-import json, subprocess, os
+import asyncio, contextlib, functools, gzip, hashlib, inspect, json, os, queue, re, shutil, socket
+import tempfile, threading, time
+import http.client, urllib.request
+from collections import OrderedDict, deque
+from urllib.parse import urlsplit
+try:
+    import sqlite3
+except ImportError:      # some minimal Python builds ship without it
+    sqlite3 = None
 from mcp import MCP, Tool, errors   # <-- the MCP SDK (pip install mcp)
 
 # -------------------------------------------------
@@ -55,39 +69,408 @@ from mcp import MCP, Tool, errors   # <-- the MCP SDK (pip install mcp)
 LMSTUDIO_HOST = "http://127.0.0.1"          # LMStudio runs locally
 LMSTUDIO_PORT = 1234                       # default port for the local API
 # We try to detect the model or use a generic alias
-MODEL_ALIAS   = "local-model"   
+MODEL_ALIAS   = os.environ.get("LMSTUDIO_MODEL", "local-model")
 
 API_URL = f"{LMSTUDIO_HOST}:{LMSTUDIO_PORT}/v1/chat/completions"
+API_PATH = urlsplit(API_URL).path
 
-def _call_lmstudio(messages, temperature=0.7, max_tokens=-1, stream=False):
-    # Prepare payload
-    payload = {
-        "model": MODEL_ALIAS,
-        "messages": messages,
-        "temperature": temperature,
-        "max_tokens": max_tokens,
-        "stream": stream
-    }
-    
-    curl_cmd = [
-        "curl", "-s", "-X", "POST", API_URL,
-        "-H", "Content-Type: application/json",
-        "-d", json.dumps(payload)
-    ]
-    
-    # Run curl
-    result = subprocess.run(curl_cmd, capture_output=True, text=True)
-    if result.returncode != 0:
-        raise errors.ServerError("curl failed", data=result.stderr)
+# OpenAI-compatible backends, comma-separated (LM Studio, llama.cpp server, ...)
+ENDPOINTS = [url.strip().rstrip("/") for url in
+             os.environ.get("LMSTUDIO_ENDPOINTS", f"{LMSTUDIO_HOST}:{LMSTUDIO_PORT}").split(",")
+             if url.strip()]
+BREAKER_FAILURES = int(os.environ.get("LMSTUDIO_BREAKER_FAILURES", "3"))     # consecutive, to open
+BREAKER_COOLDOWN = float(os.environ.get("LMSTUDIO_BREAKER_COOLDOWN", "30"))  # seconds open
+HEALTH_INTERVAL  = float(os.environ.get("LMSTUDIO_HEALTH_INTERVAL", "15"))   # /v1/models probe; 0 = off
+
+# Connection pool - override via the "env" block in mcp-config.json
+POOL_SIZE       = int(os.environ.get("LMSTUDIO_POOL_SIZE", "4"))
+CONNECT_TIMEOUT = float(os.environ.get("LMSTUDIO_CONNECT_TIMEOUT", "5"))
+REQUEST_TIMEOUT = float(os.environ.get("LMSTUDIO_TIMEOUT", "300"))   # generation can be slow
+POOL_TIMEOUT    = float(os.environ.get("LMSTUDIO_POOL_TIMEOUT", "5"))  # wait for a free connection
+
+# Async mode: tool calls run concurrently; at most MAX_INFLIGHT reach LM Studio at once
+ASYNC_MODE   = os.environ.get("LMSTUDIO_MCP_ASYNC", "0") == "1"
+MAX_INFLIGHT = int(os.environ.get("LMSTUDIO_MAX_INFLIGHT", str(len(ENDPOINTS))))   # each generates one reply at a time
+
+# Response cache: LMSTUDIO_CACHE=1 caches temperature-0 calls; cache=true on a call always does
+CACHE_ENABLED   = os.environ.get("LMSTUDIO_CACHE", "0") == "1"
+CACHE_PATH      = os.environ.get("LMSTUDIO_CACHE_PATH", ".agent/.cache/lmstudio_responses.sqlite3")
+CACHE_ENTRIES   = int(os.environ.get("LMSTUDIO_CACHE_ENTRIES", "256"))              # in-memory LRU
+CACHE_MAX_BYTES = int(os.environ.get("LMSTUDIO_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))  # on disk
+CACHE_TTL       = float(os.environ.get("LMSTUDIO_CACHE_TTL", str(7 * 24 * 3600)))   # seconds
+
+# Prompt compaction: a prompt over the model's context budget is deduplicated, then trimmed
+# (nothing happens until a window is set for the model; a prompt that fits is sent as written)
+COMPACT_ENABLED = os.environ.get("LMSTUDIO_COMPACT", "1") != "0"
+CONTEXT_TOKENS  = int(os.environ.get("LMSTUDIO_CONTEXT_TOKENS", "0"))      # model context window; 0 = unknown
+MODEL_BUDGETS   = json.loads(os.environ.get("LMSTUDIO_MODEL_BUDGETS", "{}"))  # {"model": tokens}
+RESERVE_TOKENS  = int(os.environ.get("LMSTUDIO_RESERVE_TOKENS", "512"))    # reply room if max_tokens=-1
+
+class RequestNotSent(ConnectionError):
+    """The request never reached the server (connect or send failed); safe to retry elsewhere."""
+
+class PoolExhausted(TimeoutError):
+    """No pooled connection came free in time; the endpoint is busy, not broken."""
+
+class ConnectionPool:
+    """Keep-alive HTTP connections to one endpoint, reused across calls."""
+
+    def __init__(self, base_url, size=POOL_SIZE, connect_timeout=CONNECT_TIMEOUT,
+                 timeout=REQUEST_TIMEOUT, acquire_timeout=POOL_TIMEOUT):
+        parts = urlsplit(base_url)
+        self.https = parts.scheme == "https"
+        self.host = parts.hostname
+        self.port = parts.port
+        self.connect_timeout = connect_timeout
+        self.timeout = timeout
+        self.acquire_timeout = acquire_timeout
+        self.size = max(1, size)
+        self._idle = queue.LifoQueue()                 # most recently used first
+        self._slots = threading.BoundedSemaphore(self.size)
+
+    def _connect(self):
+        cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+        conn = cls(self.host, self.port, timeout=self.connect_timeout)
+        conn.connect()
+        conn.sock.settimeout(self.timeout)
+        # http.client sends headers and body separately; don't let Nagle hold the body
+        conn.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return conn
+
+    def _acquire(self):
+        # Short on purpose: a busy backend is skipped for the next one, not waited on
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            raise PoolExhausted(
+                f"no free connection after {self.acquire_timeout}s (pool size {self.size})")
+
+    def _send(self, method, path, body, headers):
+        """Send a request and read the status line; returns (conn, response).
+
+        Failures to connect or to write the request raise RequestNotSent.
+        Anything after that (read timeouts, resets mid-reply) is raised as is:
+        the server may already be generating.
+        """
+        for attempt in range(2):
+            try:
+                conn, reused = self._idle.get_nowait(), True
+            except queue.Empty:
+                try:
+                    conn, reused = self._connect(), False
+                except OSError as exc:
+                    raise RequestNotSent(f"cannot connect to {self.host}:{self.port}: {exc}") from exc
+            try:
+                conn.request(method, path, body=body, headers=headers or {})
+            except OSError as exc:
+                conn.close()
+                if reused and attempt == 0:
+                    continue    # the server dropped an idle keep-alive connection
+                raise RequestNotSent(f"cannot send to {self.host}:{self.port}: {exc}") from exc
+            except BaseException:
+                conn.close()
+                raise
+            try:
+                return conn, conn.getresponse()
+            except ConnectionError:
+                conn.close()
+                if reused and attempt == 0:
+                    continue    # closed before reading the request: same as above
+                raise
+            except BaseException:
+                conn.close()
+                raise
+
+    def _release(self, conn, resp):
+        # Only a fully read response leaves the connection reusable
+        if resp.will_close or not resp.isclosed():
+            conn.close()
+        else:
+            self._idle.put(conn)
+
+    def request(self, method, path, body=None, headers=None):
+        """Send one request; returns (status, body bytes)."""
+        self._acquire()
+        try:
+            conn, resp = self._send(method, path, body, headers)
+            try:
+                data = resp.read()
+            except BaseException:
+                conn.close()
+                raise
+            self._release(conn, resp)
+            return resp.status, data
+        finally:
+            self._slots.release()
+
+    @contextlib.contextmanager
+    def stream(self, method, path, body=None, headers=None):
+        """Send one request and yield the response unread, for incremental parsing."""
+        self._acquire()
+        try:
+            conn, resp = self._send(method, path, body, headers)
+            try:
+                yield resp
+            except BaseException:
+                conn.close()
+                raise
+            self._release(conn, resp)
+        finally:
+            self._slots.release()
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+class Backend:
+    """One endpoint: its connection pool, load and circuit-breaker state."""
+
+    def __init__(self, url):
+        self.url = url
+        self.pool = ConnectionPool(url)
+        self.outstanding = 0
+        self.requests = 0
+        self.failures = 0          # consecutive
+        self.open_until = 0.0      # circuit open while time.monotonic() < open_until
+        self.trial = False         # a half-open trial request is in flight
+        self.last_error = None
+
+    def state(self, now):
+        if self.failures < BREAKER_FAILURES:
+            return "closed"
+        return "open" if now < self.open_until else "half-open"
+
+class Router:
+    """Least-outstanding-requests routing with failover and circuit breaking."""
+
+    def __init__(self, urls):
+        self.backends = [Backend(url) for url in urls]
+        self._lock = threading.Lock()
+        self._health = None
+        self._local = threading.local()
+
+    def _pick(self, tried):
+        """Claim the least-loaded usable backend not yet tried, or None."""
+        now = time.monotonic()
+        with self._lock:
+            usable = [b for b in self.backends if b not in tried and (
+                b.state(now) == "closed" or (b.state(now) == "half-open" and not b.trial))]
+            if not usable and not tried:
+                # Every circuit is open: try them anyway rather than fail without asking
+                usable = sorted(self.backends, key=lambda b: b.open_until)[:1]
+            if not usable:
+                return None
+            backend = min(usable, key=lambda b: b.outstanding)
+            backend.trial = backend.state(now) == "half-open"
+            backend.outstanding += 1
+            backend.requests += 1
+            return backend
 
+    def _release(self, backend):
+        """Give back a claimed backend without judging its health (its pool was full)."""
+        with self._lock:
+            backend.outstanding -= 1
+            backend.trial = False
+
+    def _done(self, backend, error=None):
+        with self._lock:
+            backend.outstanding -= 1
+            backend.trial = False
+            if error is None:
+                backend.failures = 0
+                return
+            backend.failures += 1
+            backend.last_error = str(error)
+            if backend.failures >= BREAKER_FAILURES:
+                backend.open_until = time.monotonic() + BREAKER_COOLDOWN
+
+    def request(self, method, path, body=None, headers=None):
+        """Send to the best backend, failing over on 5xx and on requests never sent.
+
+        Once a request is on the wire its errors (read timeouts, resets) are
+        raised: retrying elsewhere would start the generation over.
+        """
+        tried, error, reply = set(), None, None
+        while True:
+            backend = self._pick(tried)
+            if backend is None:
+                if reply is not None:
+                    return reply       # every backend answered 5xx: report the last one
+                raise error or ConnectionError("no LM Studio endpoint available")
+            tried.add(backend)
+            try:
+                reply = backend.pool.request(method, path, body, headers)
+            except PoolExhausted as exc:
+                self._release(backend)
+                error = exc
+                continue
+            except RequestNotSent as exc:
+                self._done(backend, exc)
+                error = exc
+                continue
+            except (OSError, http.client.HTTPException) as exc:
+                self._done(backend, exc)
+                raise
+            if reply[0] >= 500:
+                self._done(backend, f"HTTP {reply[0]}")
+                continue
+            self._done(backend)
+            self._local.failed_over = len(tried) > 1
+            return reply
+
+    @contextlib.contextmanager
+    def stream(self, method, path, body=None, headers=None):
+        """Like ConnectionPool.stream; fails over as request() does, never once data is read."""
+        tried, error = set(), None
+        while True:
+            backend = self._pick(tried)
+            if backend is None:
+                raise error or ConnectionError("no LM Studio endpoint available")
+            tried.add(backend)
+            with contextlib.ExitStack() as stack:
+                try:
+                    resp = stack.enter_context(backend.pool.stream(method, path, body, headers))
+                except PoolExhausted as exc:
+                    self._release(backend)
+                    error = exc
+                    continue
+                except RequestNotSent as exc:
+                    self._done(backend, exc)
+                    error = exc
+                    continue
+                except (OSError, http.client.HTTPException) as exc:
+                    self._done(backend, exc)
+                    raise
+                if resp.status >= 500 and len(tried) < len(self.backends):
+                    resp.read()
+                    self._done(backend, f"HTTP {resp.status}")
+                    continue
+                self._local.failed_over = len(tried) > 1
+                try:
+                    yield resp
+                except (OSError, http.client.HTTPException) as exc:
+                    self._done(backend, exc)
+                    raise
+                except BaseException:
+                    self._done(backend)
+                    raise
+                self._done(backend, f"HTTP {resp.status}" if resp.status >= 500 else None)
+                return
+
+    def failed_over(self):
+        """True if this thread's last request was answered by a backend other than the first tried."""
+        return getattr(self._local, "failed_over", False)
+
+    def probe(self, backend, timeout=2):
+        """Health check via GET /v1/models; closes or opens the circuit."""
+        try:
+            with urllib.request.urlopen(backend.url + "/v1/models", timeout=timeout) as response:
+                ok = response.status == 200
+                error = None if ok else f"HTTP {response.status}"
+        except (OSError, http.client.HTTPException) as exc:
+            ok, error = False, exc
+        with self._lock:
+            if ok:
+                backend.failures = 0
+            else:
+                backend.failures = max(backend.failures, BREAKER_FAILURES)
+                backend.open_until = time.monotonic() + BREAKER_COOLDOWN
+                backend.last_error = str(error)
+        return ok
+
+    def start_health_checks(self, interval=HEALTH_INTERVAL):
+        if interval <= 0 or self._health is not None:
+            return
+        def loop():
+            while True:
+                for backend in self.backends:
+                    try:
+                        self.probe(backend)
+                    except Exception as exc:    # a bad reply must not end the checks
+                        with self._lock:
+                            backend.last_error = f"health check failed: {exc}"
+                time.sleep(interval)
+        self._health = threading.Thread(target=loop, name="lmstudio-health", daemon=True)
+        self._health.start()
+
+    def snapshot(self):
+        now = time.monotonic()
+        with self._lock:
+            return [{"url": b.url, "state": b.state(now), "outstanding": b.outstanding,
+                     "requests": b.requests, "consecutive_failures": b.failures,
+                     "last_error": b.last_error} for b in self.backends]
+
+_router = Router(ENDPOINTS)
+_server = None   # the running MCP instance, set in __main__
+_loop = None     # its event loop in async mode
+
+def _send_progress(token, progress, message):
+    """Forward partial output as an MCP progress notification, if the client asked for one."""
+    send = getattr(_server, "send_notification", None)
+    if token is None or send is None:
+        return
+    result = send("notifications/progress", {"progressToken": token, "progress": progress, "message": message})
+    if not inspect.isawaitable(result):
+        return
+    if _loop is not None:
+        # Called from a worker thread in async mode: hand the coroutine to the loop
+        asyncio.run_coroutine_threadsafe(result, _loop)
+        return
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        if inspect.iscoroutine(result):
+            # Sync mode, no loop in this thread: deliver the notification here
+            try:
+                asyncio.run(result)
+            except Exception as exc:
+                _progress_dropped(f"sending failed: {exc}")
+            return
+    # On a running loop this call cannot wait for it; drop it rather than leave it unawaited
+    if hasattr(result, "close"):
+        result.close()
+    _progress_dropped("no event loop to send them on")
+
+_progress_warned = False
+
+def _progress_dropped(reason):
+    global _progress_warned
+    if not _progress_warned:
+        _progress_warned = True
+        print(f"lmstudio_mcp: progress notifications dropped ({reason})", file=sys.stderr)
+
+def _iter_sse(resp):
+    """Yield the data field of each server-sent event as it arrives."""
+    data = []
+    for raw in resp:    # HTTPResponse yields lines as chunks arrive
+        line = raw.decode("utf-8").rstrip("\r\n")
+        if not line:
+            if data:
+                yield "\n".join(data)
+                data = []
+            continue
+        if line.startswith(":"):
+            continue    # SSE comment / keep-alive
+        field, _, value = line.partition(":")
+        if field == "data":
+            data.append(value[1:] if value.startswith(" ") else value)
+    if data:
+        yield "\n".join(data)
+
+def _parse_json(data):
     try:
-        resp = json.loads(result.stdout)
-    except json.JSONDecodeError:
-        raise errors.ServerError("Invalid JSON from LM Studio", data=result.stdout)
+        return json.loads(data)
+    except ValueError:
+        raise errors.ServerError("Invalid JSON from LM Studio", data=data.decode("utf-8", "replace"))
 
+def _check_response(status, resp):
     if "error" in resp:
          raise errors.ServerError("LM Studio Error", data=str(resp["error"]))
+    if status >= 400:
+        raise errors.ServerError(f"LM Studio returned HTTP {status}", data=str(resp))
 
+def _message_content(resp):
     # The API returns: {"choices":[{"message":{"role":"assistant","content":"..."}}]}
     try:
         return resp["choices"][0]["message"]["content"]
@@ -95,60 +478,620 @@ def _call_lmstudio(messages, temperature=0.7, max_tokens=-1, stream=False):
         # It might be in a different format if something went wrong
         raise errors.ServerError("Unexpected LMStudio response structure", data=str(resp))
 
+def _stream_lmstudio(body, progress_token=None):
+    """POST with stream=True and assemble the reply from SSE deltas."""
+    headers = {"Content-Type": "application/json", "Accept": "text/event-stream"}
+    with _router.stream("POST", API_PATH, body=body, headers=headers) as resp:
+        if resp.status >= 400 or "text/event-stream" not in (resp.getheader("Content-Type") or ""):
+            # Error, or a server that ignores "stream": a plain JSON completion
+            data = _parse_json(resp.read())
+            _check_response(resp.status, data)
+            return _message_content(data)
+        parts = []
+        for event in _iter_sse(resp):
+            if event.strip() == "[DONE]":
+                resp.read()     # drain the chunked trailer so the connection can be reused
+                break
+            chunk = _parse_json(event.encode("utf-8"))
+            _check_response(200, chunk)
+            try:
+                delta = chunk["choices"][0].get("delta", {}).get("content") or ""
+            except (KeyError, IndexError, AttributeError):
+                raise errors.ServerError("Unexpected LMStudio stream chunk", data=event)
+            if delta:
+                parts.append(delta)
+                _send_progress(progress_token, len(parts), delta)
+        return "".join(parts)
+
+def _call_lmstudio(messages, temperature=0.7, max_tokens=-1, stream=False, progress_token=None):
+    # Prepare payload
+    payload = {
+        "model": MODEL_ALIAS,
+        "messages": messages,
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+        "stream": stream
+    }
+    body = json.dumps(payload).encode("utf-8")
+
+    # POST over a pooled keep-alive connection (no subprocess, no argv size limit)
+    try:
+        if stream:
+            return _stream_lmstudio(body, progress_token)
+        status, data = _router.request(
+            "POST", API_PATH, body=body,
+            headers={"Content-Type": "application/json"},
+        )
+    except (OSError, http.client.HTTPException) as exc:
+        raise errors.ServerError("LM Studio request failed", data=str(exc))
+
+    resp = _parse_json(data)
+    _check_response(status, resp)
+    return _message_content(resp)
+
+# -------------------------------------------------
+# Response cache (memory LRU in front of SQLite)
+# -------------------------------------------------
+_CACHE_ERRORS = (OSError,) if sqlite3 is None else (sqlite3.Error, OSError)
+
+class ResponseCache:
+    """Replies keyed by a hash of the request, with TTL and size-bounded eviction."""
+
+    def __init__(self, path, entries=CACHE_ENTRIES, max_bytes=CACHE_MAX_BYTES, ttl=CACHE_TTL):
+        self.path = path
+        self.entries = max(0, entries)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._memory = OrderedDict()     # key -> (text, created)
+        self._db = None
+        self._lock = threading.Lock()
+        self.counts = dict.fromkeys(
+            ("hits_memory", "hits_disk", "misses", "stores", "evictions", "bypassed",
+             "skipped_fallback", "errors"), 0)
+
+    @staticmethod
+    def key(model, messages, temperature, max_tokens):
+        canonical = json.dumps(
+            {"model": model, "messages": messages,
+             "temperature": float(temperature), "max_tokens": int(max_tokens)},
+            sort_keys=True, separators=(",", ":"), ensure_ascii=False,
+        )
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def count(self, name):
+        with self._lock:
+            self.counts[name] += 1
+
+    def _open(self):
+        # Opened lazily so the server never creates .agent/.cache/ unless it stores something
+        if self._db is None and sqlite3 is not None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, response TEXT NOT NULL,"
+                " bytes INTEGER NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)")
+            db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+            self._db = db
+        return self._db
+
+    def _remember(self, key, text, created):
+        if not self.entries:
+            return
+        self._memory[key] = (text, created)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            item = self._memory.get(key)
+            if item is not None and now - item[1] < self.ttl:
+                self._memory.move_to_end(key)
+                self.counts["hits_memory"] += 1
+                return item[0]
+            self._memory.pop(key, None)
+            try:
+                db = self._open() if os.path.exists(self.path) else None
+                row = db and db.execute(
+                    "SELECT response, created FROM responses WHERE key = ?", (key,)).fetchone()
+                if row and now - row[1] < self.ttl:
+                    db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+                    self._remember(key, row[0], row[1])
+                    self.counts["hits_disk"] += 1
+                    return row[0]
+                if row:
+                    db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            except _CACHE_ERRORS:
+                self.counts["errors"] += 1
+            self.counts["misses"] += 1
+            return None
+
+    def put(self, key, text):
+        now = time.time()
+        with self._lock:
+            self._remember(key, text, now)
+            self.counts["stores"] += 1
+            try:
+                db = self._open()
+                if db is None:
+                    return
+                size = len(text.encode("utf-8"))
+                db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                           (key, text, size, now, now))
+                self._evict(db, now)
+            except _CACHE_ERRORS:
+                self.counts["errors"] += 1
+
+    def _evict(self, db, now):
+        expired = db.execute("DELETE FROM responses WHERE created <= ?", (now - self.ttl,)).rowcount
+        total = db.execute("SELECT COALESCE(SUM(bytes), 0) FROM responses").fetchone()[0]
+        victims = []
+        if total > self.max_bytes:
+            for key, size in db.execute("SELECT key, bytes FROM responses ORDER BY accessed"):
+                if total <= self.max_bytes:
+                    break
+                victims.append((key,))
+                total -= size
+            db.executemany("DELETE FROM responses WHERE key = ?", victims)
+        for (key,) in victims:
+            self._memory.pop(key, None)
+        self.counts["evictions"] += max(expired, 0) + len(victims)
+
+    def stats(self):
+        with self._lock:
+            disk = {"path": self.path, "entries": 0, "bytes": 0,
+                    "max_bytes": self.max_bytes, "ttl_seconds": self.ttl}
+            try:
+                if sqlite3 is not None and os.path.exists(self.path):
+                    disk["entries"], disk["bytes"] = self._open().execute(
+                        "SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM responses").fetchone()
+            except _CACHE_ERRORS:
+                self.counts["errors"] += 1
+            lookups = self.counts["hits_memory"] + self.counts["hits_disk"] + self.counts["misses"]
+            hits = lookups - self.counts["misses"]
+            return dict(self.counts,
+                        enabled_for_temperature_0=CACHE_ENABLED,
+                        hit_rate=round(hits / lookups, 3) if lookups else 0.0,
+                        memory={"entries": len(self._memory), "capacity": self.entries},
+                        disk=disk if sqlite3 is not None else None)
+
+_cache = ResponseCache(CACHE_PATH)
+
+def _cache_key(messages, temperature, max_tokens, cache):
+    """The cache key when this call may be answered from cache, else None."""
+    if cache is False or (cache is None and not (CACHE_ENABLED and temperature == 0)):
+        _cache.count("bypassed")
+        return None
+    return ResponseCache.key(MODEL_ALIAS, messages, temperature, max_tokens)
+
+def _cached_reply(key, stream=False, progress_token=None):
+    hit = _cache.get(key) if key else None
+    if hit is not None and stream:
+        _send_progress(progress_token, 1, hit)
+    return hit
+
+# -------------------------------------------------
+# Prompt compaction
+# -------------------------------------------------
+CHARS_PER_TOKEN = 4          # rough estimate, as BYTES_PER_TOKEN for the PACK context
+MESSAGE_OVERHEAD = 4         # role and template tokens per message
+DEDUPE_MIN_CHARS = 200       # shorter repeats ("ok", "continue") are left alone
+TRUNCATE_MIN_CHARS = 512     # messages this short are never truncated
+MESSAGE_SHARE = 4            # over budget, no earlier message keeps more than 1/4 of it
+TRUNCATE_KEEP_CHARS = 256    # head + tail a truncated message keeps at least
+TRUNCATE_MARKER = "\n[... truncated to fit the context budget ...]\n"
+_PACK_RE = re.compile(r'\{\n  "task": .*?\n\}', re.DOTALL)   # get_pack_context() output
+
+def _text(message):
+    content = message.get("content")
+    return content if isinstance(content, str) else json.dumps(content or "")
+
+def estimate_tokens(messages):
+    """Rough prompt size: about 4 characters per token plus per-message overhead."""
+    return sum(MESSAGE_OVERHEAD + len(_text(m)) // CHARS_PER_TOKEN for m in messages)
+
+def context_budget(max_tokens=-1):
+    """Prompt tokens allowed for this model, leaving room for the reply; None if unknown."""
+    window = int(MODEL_BUDGETS.get(MODEL_ALIAS, CONTEXT_TOKENS))
+    if window <= 0:
+        return None
+    reply = max_tokens if max_tokens and max_tokens > 0 else RESERVE_TOKENS
+    return max(window - reply, 256)
+
+def _dedupe(messages, stats):
+    """Drop repeated system prompts; stub out older PACK contexts and repeated blocks."""
+    seen_system, out = set(), []
+    for m in messages:
+        if m.get("role") == "system":
+            if _text(m) in seen_system:
+                stats["deduplicated"] += 1
+                continue
+            seen_system.add(_text(m))
+        out.append(dict(m))
+    last_index = {}
+    packs = []
+    for i, m in enumerate(out):
+        if m.get("role") != "system" and isinstance(m.get("content"), str):
+            if len(m["content"]) >= DEDUPE_MIN_CHARS:
+                last_index[m["content"]] = i
+            packs += [(i, match.span()) for match in _PACK_RE.finditer(m["content"])]
+    for i, m in enumerate(out):
+        content = m.get("content")
+        if m.get("role") != "system" and isinstance(content, str) and last_index.get(content, i) != i:
+            m["content"] = "[repeated content omitted; it appears again below]"
+            stats["deduplicated"] += 1
+    for i, (start, end) in reversed(packs[:-1]):       # newest PACK context stays
+        content = out[i]["content"]
+        if content.startswith("[repeated content omitted"):
+            continue
+        out[i]["content"] = content[:start] + "[older PACK context omitted; the latest is below]" + content[end:]
+        stats["deduplicated"] += 1
+    return out
+
+def _truncate(message, excess_tokens):
+    """Cut the middle of a message so it shrinks by about excess_tokens.
+
+    At least TRUNCATE_KEEP_CHARS of its head and tail survive, so the model
+    still sees what the message was about.
+    """
+    text = message["content"]
+    keep = max(TRUNCATE_KEEP_CHARS, len(text) - excess_tokens * CHARS_PER_TOKEN - len(TRUNCATE_MARKER))
+    message["content"] = text[:keep - keep // 2] + TRUNCATE_MARKER + text[len(text) - keep // 2:]
+
+def compact_messages(messages, max_tokens=-1):
+    """Fit a prompt over budget: dedupe, truncate oversized messages, drop the oldest turns.
+
+    Only a prompt larger than the model's context window (LMSTUDIO_CONTEXT_TOKENS
+    or LMSTUDIO_MODEL_BUDGETS) is changed; with no window set, or a prompt
+    that fits, messages are returned as written. System prompts and the last
+    message are never truncated or dropped. Returns (messages, stats).
+    """
+    budget = context_budget(max_tokens)
+    stats = {"tokens_before": estimate_tokens(messages), "budget": budget,
+             "deduplicated": 0, "dropped": 0, "truncated": 0}
+    if budget is None or stats["tokens_before"] <= budget:
+        stats["tokens_after"], stats["saved"] = stats["tokens_before"], 0
+        return list(messages), stats
+    out = _dedupe(messages, stats)
+    # An earlier message over its share of the budget (a pasted file, a tool
+    # dump) is cut down first, so recent turns survive
+    share = max(TRUNCATE_MIN_CHARS, budget // MESSAGE_SHARE * CHARS_PER_TOKEN)
+    earlier = [m for m in out[:-1] if m.get("role") != "system" and isinstance(m.get("content"), str)]
+    for m in sorted(earlier, key=lambda m: len(m["content"]), reverse=True):
+        excess = estimate_tokens(out) - budget
+        if excess <= 0 or len(m["content"]) <= share:
+            break
+        _truncate(m, min(excess, (len(m["content"]) - share) // CHARS_PER_TOKEN))
+        stats["truncated"] += 1
+    while estimate_tokens(out) > budget:
+        turns = [i for i, m in enumerate(out[:-1]) if m.get("role") != "system"]
+        if not turns:
+            break
+        del out[turns[0]]
+        stats["dropped"] += 1
+        # keep the history starting on a user turn, as chat templates expect
+        while turns[0] < len(out) - 1 and out[turns[0]].get("role") in ("assistant", "tool"):
+            del out[turns[0]]
+            stats["dropped"] += 1
+    stats["tokens_after"] = estimate_tokens(out)
+    stats["saved"] = stats["tokens_before"] - stats["tokens_after"]
+    return out, stats
+
+class CompactionStats:
+    """Totals and the last few per-call results for get_server_metrics."""
+
+    def __init__(self, recent=20):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.tokens_before = 0
+        self.tokens_after = 0
+        self.recent = deque(maxlen=recent)
+
+    def record(self, stats):
+        with self._lock:
+            self.calls += 1
+            self.tokens_before += stats["tokens_before"]
+            self.tokens_after += stats["tokens_after"]
+            self.recent.append(dict(stats, at=time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())))
+
+    def snapshot(self):
+        with self._lock:
+            return {"enabled": COMPACT_ENABLED, "budget": context_budget(), "calls": self.calls,
+                    "tokens_before": self.tokens_before, "tokens_after": self.tokens_after,
+                    "tokens_saved": self.tokens_before - self.tokens_after,
+                    "recent": list(self.recent)}
+
+_compaction = CompactionStats()
+
+def _compact(messages, max_tokens):
+    if not COMPACT_ENABLED:
+        return messages
+    messages, stats = compact_messages(messages, max_tokens)
+    _compaction.record(stats)
+    return messages
+
 # -------------------------------------------------
 # MCP tool definition
 # -------------------------------------------------
-def chat(messages: list[dict], temperature: float = 0.7, max_tokens: int = -1):
+def chat(messages: list[dict], temperature: float = 0.7, max_tokens: int = -1,
+         stream: bool = False, progress_token=None, cache=None):
     """
     Chat with the locally running LMStudio model.
     messages: list of {"role": "...", "content": "..."}
+    stream: receive tokens as they are generated; with a progress_token each
+            chunk is also sent to the client as a progress notification
+    cache: true/false to force or skip the response cache (default: cache
+           temperature-0 calls when LMSTUDIO_CACHE=1)
+    A prompt over the model's context window (when one is configured) has
+    repeated system prompts and PACK contexts deduplicated first, then is
+    trimmed to fit (LMSTUDIO_COMPACT=0 disables both).
     """
+    messages = _compact(messages, max_tokens)
+    key = _cache_key(messages, temperature, max_tokens, cache)
+    hit = _cached_reply(key, stream, progress_token)
+    if hit is not None:
+        return hit
+    return _chat_llm(key, messages, temperature, max_tokens, stream, progress_token)
+
+def _chat_llm(key, messages, temperature, max_tokens, stream, progress_token):
     try:
-        return _call_lmstudio(messages, temperature, max_tokens)
+        text = _call_lmstudio(messages, temperature, max_tokens, stream, progress_token)
     except Exception as exc:        # re‑raise as MCP‑compatible error
         raise errors.ServerError("LMStudio request failed", data=str(exc))
+    if key and _router.failed_over():
+        # Another backend may serve another model under the same alias: don't cache it
+        _cache.count("skipped_fallback")
+    elif key:
+        _cache.put(key, text)
+    return text
 
 # Register the tool
 chat_tool = Tool(
     name="lmstudio_chat",
-    description="Chat with a locally-running LMStudio model. Best for general reasoning and code explanation.",
+    description="Chat with a locally-running LMStudio model. Best for general reasoning and code explanation. Set stream=true (with a progress_token) to receive partial output as progress notifications.",
     func=chat
 )
 
-def get_pack_context():
-    """Reads the current PACK context (task, plan, and last handoff) from the .agent folder."""
+# -------------------------------------------------
+# PACK context: cached task/plan, whole log entries read back from EOF
+# -------------------------------------------------
+TASK_PATH  = ".agent/task.md"
+PLAN_PATH  = ".agent/implementation_plan.md"
+LOG_PATH   = ".agent/docs/agent_handoffs/agent_conversation_log.md"
+BOUNDARY   = "=== MESSAGE BOUNDARY ==="
+TAIL_BLOCK = 64 * 1024
+CONTEXT_BYTES = int(os.environ.get("LMSTUDIO_CONTEXT_BYTES", "4000"))   # handoff budget
+BYTES_PER_TOKEN = 4                                                      # rough estimate
+
+_BOUNDARY_RE = re.compile(rb"^" + re.escape(BOUNDARY.encode("utf-8")) + rb"\s*$", re.MULTILINE)
+_file_cache = {}     # path -> ((mtime_ns, size), text)
+_tail_cache = {}     # (segment signatures, budget) -> result
+
+def _signature(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (path, st.st_mtime_ns, st.st_size)
+
+def _read_cached(path):
+    """File text, re-read only when mtime or size changes."""
+    sig = _signature(path)
+    if sig is None:
+        return None
+    hit = _file_cache.get(path)
+    if hit and hit[0] == sig:
+        return hit[1]
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        text = f.read()
+    _file_cache[path] = (sig, text)
+    return text
+
+def _log_segments(log_path):
+    """Active log first, then sealed segments newest-first (see the log's segments.json)."""
+    stem = os.path.splitext(log_path)[0]
+    try:
+        with open(stem + ".segments.json", "r", encoding="utf-8") as f:
+            sealed = [item["name"] for item in json.load(f).get("segments") or []]
+    except (OSError, ValueError, KeyError, TypeError):
+        sealed = []
+    folder = os.path.dirname(log_path)
+    return [log_path] + [os.path.join(folder, name) for name in reversed(sealed)]
+
+def _entries_from_end(handle):
+    """Yield raw entries newest-first, reading blocks backwards from EOF."""
+    handle.seek(0, os.SEEK_END)
+    pos = handle.tell()
+    buffer = b""
+    while True:
+        # A match at buffer start is only a line start once the file start is reached
+        starts = [m.start() for m in _BOUNDARY_RE.finditer(buffer) if m.start() > 0 or pos == 0]
+        end = len(buffer)
+        for start in reversed(starts):
+            yield buffer[start:end]
+            end = start
+        buffer = buffer[:end]
+        if pos == 0:
+            return      # what is left is the log header
+        step = min(TAIL_BLOCK, pos)
+        pos -= step
+        handle.seek(pos)
+        buffer = handle.read(step) + buffer
+
+@contextlib.contextmanager
+def _open_segment(path):
+    if not path.endswith(".gz"):
+        with open(path, "rb") as f:
+            yield f
+        return
+    with gzip.open(path, "rb") as packed, tempfile.TemporaryFile() as f:
+        shutil.copyfileobj(packed, f)     # sealed segments are small; seeking needs a real file
+        yield f
+
+def _tail_handoffs(budget):
+    """Newest whole entries (across segments) that fit in ``budget`` bytes, oldest first."""
+    segments = [seg for seg in _log_segments(LOG_PATH) if os.path.exists(seg)]
+    key = (tuple(_signature(seg) for seg in segments), budget)
+    if key in _tail_cache:
+        return _tail_cache[key]
+    picked, used = [], 0
+    for seg in segments:
+        with _open_segment(seg) as handle:
+            for raw in _entries_from_end(handle):
+                entry = raw.decode("utf-8", "replace").strip()
+                size = len(entry.encode("utf-8"))
+                if picked and used + size > budget:
+                    break
+                if not picked and size > budget:
+                    # The newest entry alone is over budget: keep its head (fields, summary)
+                    entry = entry.encode("utf-8")[:budget].decode("utf-8", "ignore") + "\n[... truncated]"
+                picked.append(entry)
+                used += size
+            else:
+                continue    # segment exhausted (or empty after rotation): go to the older one
+            break
+    result = ("\n\n".join(reversed(picked)), len(picked))
+    _tail_cache.clear()
+    _tail_cache[key] = result
+    return result
+
+def get_pack_context(max_bytes: int = None, max_tokens: int = None):
+    """Reads the current PACK context (task, plan, and recent handoffs) from the .agent folder.
+
+    max_bytes / max_tokens: budget for the handoff entries (default LMSTUDIO_CONTEXT_BYTES).
+    """
+    budget = CONTEXT_BYTES
+    if max_tokens:
+        budget = int(max_tokens) * BYTES_PER_TOKEN
+    if max_bytes:
+        budget = int(max_bytes)
     context = {}
-    paths = {
-        "task": ".agent/task.md",
-        "plan": ".agent/implementation_plan.md",
-        "last_handoff": ".agent/docs/agent_handoffs/agent_conversation_log.md"
-    }
-    
-    for key, rel_path in paths.items():
-        if os.path.exists(rel_path):
-            with open(rel_path, "r") as f:
-                content = f.read()
-                if key == "last_handoff":
-                    # Just get the last 2000 chars of the log
-                    context[key] = content[-2000:]
-                else:
-                    context[key] = content
-        else:
-            context[key] = "[Not found]"
-            
+    for key, path in (("task", TASK_PATH), ("plan", PLAN_PATH)):
+        text = _read_cached(path)
+        context[key] = "[Not found]" if text is None else text
+    if os.path.exists(LOG_PATH):
+        context["last_handoff"], context["handoff_entries"] = _tail_handoffs(max(1, budget))
+    else:
+        context["last_handoff"] = "[Not found]"
     return json.dumps(context, indent=2)
 
 pack_context_tool = Tool(
     name="get_pack_context",
-    description="Reads the current PACK context (.agent/task.md, plan, and last handoff). Use this to ground the model in the current project state.",
+    description="Reads the current PACK context (.agent/task.md, plan, and the most recent handoff entries within max_bytes or max_tokens). Use this to ground the model in the current project state.",
     func=get_pack_context
 )
 
+# -------------------------------------------------
+# Async mode (LMSTUDIO_MCP_ASYNC=1)
+# -------------------------------------------------
+class LLMGate:
+    """Bounds in-flight LLM requests and records queue depth and wait time."""
+
+    def __init__(self, limit):
+        self.limit = max(1, limit)
+        self._sem = None            # created on first use, inside the running loop
+        self.in_flight = 0
+        self.queued = 0
+        self.max_queued = 0
+        self.completed = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    @contextlib.asynccontextmanager
+    async def slot(self):
+        if self._sem is None:
+            self._sem = asyncio.Semaphore(self.limit)
+        self.queued += 1
+        self.max_queued = max(self.max_queued, self.queued)
+        start = time.perf_counter()
+        try:
+            await self._sem.acquire()
+        finally:
+            self.queued -= 1
+        waited = time.perf_counter() - start
+        self.wait_total += waited
+        self.wait_max = max(self.wait_max, waited)
+        self.in_flight += 1
+        try:
+            yield waited
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+            self._sem.release()
+
+    def snapshot(self):
+        started = self.completed + self.in_flight
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queued,
+            "max_queue_depth": self.max_queued,
+            "completed": self.completed,
+            "wait_ms_avg": round(self.wait_total / started * 1000, 2) if started else 0.0,
+            "wait_ms_max": round(self.wait_max * 1000, 2),
+        }
+
+_llm_gate = LLMGate(MAX_INFLIGHT)
+
+async def _in_thread(func, *args):
+    global _loop
+    _loop = asyncio.get_running_loop()
+    return await _loop.run_in_executor(None, functools.partial(func, *args))
+
+async def chat_async(messages: list[dict], temperature: float = 0.7, max_tokens: int = -1,
+                     stream: bool = False, progress_token=None, cache=None):
+    """chat() behind the LLM gate, off the event loop; cache hits skip the gate."""
+    messages = _compact(messages, max_tokens)
+    key = _cache_key(messages, temperature, max_tokens, cache)
+    if key:
+        hit = await _in_thread(_cached_reply, key, stream, progress_token)
+        if hit is not None:
+            return hit
+    async with _llm_gate.slot():
+        return await _in_thread(_chat_llm, key, messages, temperature, max_tokens, stream, progress_token)
+
+async def get_pack_context_async(max_bytes: int = None, max_tokens: int = None):
+    """Local file reads skip the LLM queue."""
+    return await _in_thread(get_pack_context, max_bytes, max_tokens)
+
+def get_server_metrics():
+    """Reports LLM queue depth, wait times, backend health and prompt compaction."""
+    return json.dumps({"mode": "async" if ASYNC_MODE else "sync", "llm": _llm_gate.snapshot(),
+                       "backends": _router.snapshot(), "compaction": _compaction.snapshot()},
+                      indent=2)
+
+metrics_tool = Tool(
+    name="get_server_metrics",
+    description="Reports the bridge's LLM queue depth, in-flight requests, wait times, backend health and tokens saved by prompt compaction.",
+    func=get_server_metrics
+)
+
+def get_cache_stats():
+    """Reports response cache hits, misses, evictions and size."""
+    return json.dumps(_cache.stats(), indent=2)
+
+cache_stats_tool = Tool(
+    name="get_cache_stats",
+    description="Reports lmstudio_chat response cache hits, misses, evictions and size.",
+    func=get_cache_stats
+)
+
 if __name__ == "__main__":
     # When VS Code starts the server it expects an MCP instance.
     mcp = MCP("lmstudio-chat")
-    mcp.add_tool(chat_tool)
-    mcp.add_tool(pack_context_tool)
+    _server = mcp
+    _router.start_health_checks()
+    if ASYNC_MODE:
+        mcp.add_tool(Tool(name=chat_tool.name, description=chat_tool.description, func=chat_async))
+        mcp.add_tool(Tool(name=pack_context_tool.name, description=pack_context_tool.description,
+                          func=get_pack_context_async))
+    else:
+        mcp.add_tool(chat_tool)
+        mcp.add_tool(pack_context_tool)
+    mcp.add_tool(metrics_tool)
+    mcp.add_tool(cache_stats_tool)
     mcp.run()
 '''
 
@@ -172,8 +1115,15 @@ def create_server_script():
     print(f"[*] Created {MCP_SERVER_SCRIPT_NAME}")
 
 def check_lmstudio_connection():
-    print(f"[-] Checking connection to LM Studio at {LMSTUDIO_HOST}:{LMSTUDIO_PORT}...")
-    url = f"{LMSTUDIO_HOST}:{LMSTUDIO_PORT}/v1/models"
+    """Probe every endpoint; True if at least one answers."""
+    results = [check_endpoint(endpoint) for endpoint in LMSTUDIO_ENDPOINTS]
+    if len(results) > 1:
+        print(f"[*] {sum(results)} of {len(results)} endpoints reachable.")
+    return any(results)
+
+def check_endpoint(endpoint):
+    print(f"[-] Checking connection to LM Studio at {endpoint}...")
+    url = f"{endpoint}/v1/models"
     try:
         with urllib.request.urlopen(url, timeout=2) as response:
             if response.status == 200:
@@ -183,7 +1133,7 @@ def check_lmstudio_connection():
                 return True
     except urllib.error.URLError as e:
         print(f"[!] Connection FAILED: {e}")
-        print("[!] Please ensure LM Studio is running and the server is started on port 1234.")
+        print(f"[!] Please ensure LM Studio is running and the server is started at {endpoint}.")
         return False
     except Exception as e:
         print(f"[!] Unexpected error checking connection: {e}")
@@ -204,6 +1154,8 @@ def setup_config():
             }
         }
     }
+    if "LMSTUDIO_ENDPOINTS" in os.environ:
+        config_entry["mcpServers"]["lmstudio-chat"]["env"]["LMSTUDIO_ENDPOINTS"] = ",".join(LMSTUDIO_ENDPOINTS)
     
     # Check if mcp-config.json exists in current folder
     if os.path.exists(MCP_CONFIG_NAME):
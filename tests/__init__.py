@@ -0,0 +1,16 @@
+"""Tests for the Portable Agent Collaboration Kit (stdlib unittest).
+
+Run from the repository root:
+  python3 -m unittest discover -s tests -t .
+"""
+
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+UTILITIES = REPO_ROOT / ".agent" / "tools" / "utilities"
+
+# The kit utilities are scripts, not a package: import them by directory
+for path in (str(UTILITIES), str(REPO_ROOT)):
+    if path not in sys.path:
+        sys.path.insert(0, path)
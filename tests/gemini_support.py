@@ -0,0 +1,129 @@
+"""A stand-in Gemini CLI and project layout for exercising gemini_audit.py.
+
+make_fake_cli() writes ``gemini`` and ``node`` executables that behave like
+the real ones as far as gemini_audit.py can tell: ``--version`` answers, an
+audit reads the prompt on STDIN and prints a Decision/Rationale/Next action
+block. Behaviour is set through the environment:
+
+  FAKE_GEMINI_STARTUP  seconds to sleep before anything (Node.js start-up)
+  FAKE_GEMINI_DELAY    seconds to "think" after reading the prompt
+  FAKE_GEMINI_TRAILER  lines of chatter printed after the decision
+  FAKE_GEMINI_PACE     seconds between trailer lines
+  FAKE_GEMINI_CALLS    file to append one line per invocation to
+  FAKE_GEMINI_SHOW     comma-separated variables to print, with the working directory
+  FAKE_GEMINI_PROMPTS  file to append each prompt to (see prompts())
+  FAKE_GEMINI_EXIT     exit status after printing the decision
+
+A prompt containing REJECTME is rejected; anything else is approved.
+"""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from tests import UTILITIES
+
+GEMINI_AUDIT = UTILITIES / "gemini_audit.py"
+
+# Interpreter arguments (run_audit's python_args) that run gemini_audit.py with
+# the logger import failing, as when it is copied without
+# update_agent_conversation_log.py next to it
+NO_LOGGER = [
+    "-c",
+    "import runpy, sys; sys.modules['update_agent_conversation_log'] = None; "
+    "sys.argv = sys.argv[1:]; runpy.run_path(sys.argv[0], run_name='__main__')",
+]
+
+FAKE_GEMINI = """#!{python}
+import os, sys, time
+time.sleep(float(os.environ.get("FAKE_GEMINI_STARTUP", "0")))
+calls = os.environ.get("FAKE_GEMINI_CALLS")
+if calls:
+    with open(calls, "a") as out:
+        out.write(" ".join(sys.argv[1:]) + "\\n")
+if "--version" in sys.argv:
+    print("0.24.0")
+    sys.exit(0)
+prompt = sys.stdin.read()
+if os.environ.get("FAKE_GEMINI_PROMPTS"):
+    with open(os.environ["FAKE_GEMINI_PROMPTS"], "a") as out:
+        out.write(prompt + "\\0")
+time.sleep(float(os.environ.get("FAKE_GEMINI_DELAY", "0")))
+decision = "REJECT" if "REJECTME" in prompt else "APPROVE"
+print("Reviewed %d characters." % len(prompt))
+if os.environ.get("FAKE_GEMINI_SHOW"):
+    print("cwd=%s" % os.getcwd())
+    for name in os.environ["FAKE_GEMINI_SHOW"].split(","):
+        print("%s=%s" % (name, os.environ.get(name, "")))
+print("**Decision**: %s\\n**Rationale**: stand-in.\\n**Next action**: proceed." % decision, flush=True)
+for i in range(int(os.environ.get("FAKE_GEMINI_TRAILER", "0"))):
+    print("Further notes on the plan, line %d." % i, flush=True)
+    time.sleep(float(os.environ.get("FAKE_GEMINI_PACE", "0")))
+sys.exit(int(os.environ.get("FAKE_GEMINI_EXIT", "0")))
+"""
+
+FAKE_NODE = """#!{python}
+import os, time
+time.sleep(float(os.environ.get("FAKE_GEMINI_STARTUP", "0")))
+print("v22.11.0")
+"""
+
+
+def make_fake_cli(bin_dir: Path) -> Path:
+    """Write fake ``gemini`` and ``node`` executables into ``bin_dir``."""
+    bin_dir.mkdir(parents=True, exist_ok=True)
+    for name, source in (("gemini", FAKE_GEMINI), ("node", FAKE_NODE)):
+        path = bin_dir / name
+        path.write_text(source.format(python=sys.executable), encoding="utf-8")
+        path.chmod(0o755)
+    return bin_dir
+
+
+def make_project(root: Path, task: str = "Add a login page.", plan: str = "1. Build the form.") -> Path:
+    """A repository with a task, a plan and an auditor persona in the default places."""
+    (root / ".agent").mkdir(parents=True, exist_ok=True)
+    (root / ".agent/task.md").write_text(task + "\n", encoding="utf-8")
+    (root / ".agent/implementation_plan.md").write_text(plan + "\n", encoding="utf-8")
+    persona = root / ".gemini/personas/auditor.md"
+    persona.parent.mkdir(parents=True, exist_ok=True)
+    persona.write_text("You are the PACK auditor.\n", encoding="utf-8")
+    return root
+
+
+def run_audit(
+    args: Sequence[str],
+    cwd: Path,
+    path: Sequence[Path],
+    env: Optional[Dict[str, str]] = None,
+    timeout: float = 60,
+    python_args: Sequence[str] = (),
+) -> subprocess.CompletedProcess:
+    """Run gemini_audit.py in ``cwd`` with only ``path`` on PATH.
+
+    ``python_args`` go to the interpreter before the script path.
+    """
+    full_env = {k: v for k, v in os.environ.items() if not k.startswith("FAKE_GEMINI_")}
+    full_env["PATH"] = os.pathsep.join(str(p) for p in path)
+    full_env.update(env or {})
+    return subprocess.run(
+        [sys.executable, *python_args, str(GEMINI_AUDIT), *args],
+        cwd=cwd, env=full_env, capture_output=True, text=True, timeout=timeout,
+    )
+
+
+def calls(path: Path) -> List[str]:
+    """Invocations recorded through FAKE_GEMINI_CALLS."""
+    try:
+        return path.read_text(encoding="utf-8").splitlines()
+    except FileNotFoundError:
+        return []
+
+
+def prompts(path: Path) -> List[str]:
+    """Prompts recorded through FAKE_GEMINI_PROMPTS, oldest first."""
+    try:
+        return path.read_text(encoding="utf-8").split("\0")[:-1]
+    except FileNotFoundError:
+        return []
@@ -0,0 +1,191 @@
+"""Stand-ins for exercising the lmstudio_mcp.py server that setup_offline_ai.py writes.
+
+StubLLM is a local OpenAI-compatible HTTP server (/v1/chat/completions and
+/v1/models) with injectable latency and failures; given ``tokens`` it answers
+"stream": true requests with server-sent events, one token per
+``token_interval`` seconds. load_server() writes
+MCP_SERVER_CONTENT to a temporary file and imports it with the given
+environment. The generated script imports a handful of names from the MCP
+SDK (MCP, Tool, errors) that it only uses when run as a server, so they are
+provided in-memory here and the real HTTP, routing and compaction code runs
+unchanged.
+"""
+
+import importlib.util
+import json
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+import types
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional
+from unittest import mock
+
+import setup_offline_ai
+
+
+class ServerError(Exception):
+    def __init__(self, message: str, data: object = None) -> None:
+        super().__init__(message)
+        self.data = data
+
+
+class _Placeholder:
+    def __init__(self, *args: object, **kwargs: object) -> None:
+        self.__dict__.update(kwargs)
+
+
+def _mcp_modules() -> Dict[str, types.ModuleType]:
+    modules = {}
+    for name in ("mcp", "mcp.server", "mcp.server.fastmcp", "mcp.server.stdio", "mcp.types"):
+        module = types.ModuleType(name)
+        module.__getattr__ = lambda attr: _Placeholder  # type: ignore[attr-defined]
+        modules[name] = module
+    modules["mcp"].errors = types.SimpleNamespace(ServerError=ServerError)  # type: ignore[attr-defined]
+    modules["mcp"].Tool = _Placeholder  # type: ignore[attr-defined]
+    return modules
+
+
+_loaded = 0
+
+
+def load_server(env: Optional[Dict[str, str]] = None, content: Optional[str] = None) -> types.ModuleType:
+    """Import a fresh copy of the generated server; ``env`` is seen at import time only."""
+    global _loaded
+    _loaded += 1
+    name = f"lmstudio_mcp_{_loaded}"
+    tmp = tempfile.mkdtemp(prefix="lmstudio_mcp_")
+    path = Path(tmp) / f"{name}.py"
+    path.write_text(content or setup_offline_ai.MCP_SERVER_CONTENT, encoding="utf-8")
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    with mock.patch.dict(sys.modules, _mcp_modules()), mock.patch.dict(os.environ, env or {}):
+        spec.loader.exec_module(module)  # type: ignore[union-attr]
+    return module
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True   # headers and body go out in separate writes
+    server: "_Server"
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+    def _reply(self, status: int, payload: object) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _chunk(self, data: bytes) -> None:
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+
+    def _stream(self, stub: "StubLLM") -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        self._chunk(b": keep-alive\n\n")
+        for token in stub.tokens:
+            time.sleep(stub.token_interval)
+            event = {"choices": [{"index": 0, "delta": {"content": token}}]}
+            self._chunk(b"data: %s\n\n" % json.dumps(event).encode("utf-8"))
+        self._chunk(b"data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def do_GET(self) -> None:
+        stub = self.server.stub
+        stub.probes += 1
+        if stub.status >= 500:
+            self._reply(stub.status, {"error": "injected failure"})
+        else:
+            self._reply(200, {"data": [{"id": "stub-model"}]})
+
+    def do_POST(self) -> None:
+        stub = self.server.stub
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        with stub.lock:
+            stub.requests += 1
+            stub.outstanding += 1
+            stub.max_outstanding = max(stub.max_outstanding, stub.outstanding)
+        try:
+            if stub.delay:
+                time.sleep(stub.delay)
+            if stub.status >= 500:
+                self._reply(stub.status, {"error": "injected failure"})
+                return
+            stub.last_request = request
+            if request.get("stream") and stub.tokens is not None:
+                self._stream(stub)
+                return
+            text = f"echo:{stub.port}:{len(request['messages'][-1]['content'])}"
+            self._reply(200, {"choices": [{"message": {"role": "assistant", "content": text}}]})
+        finally:
+            with stub.lock:
+                stub.outstanding -= 1
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    stub: "StubLLM"
+
+    def process_request(self, request: socket.socket, client_address: object) -> None:
+        self.stub.connections.append(request)
+        super().process_request(request, client_address)
+
+
+class StubLLM:
+    """A local OpenAI-compatible endpoint; change ``delay``/``status`` at any time."""
+
+    def __init__(self, delay: float = 0.0, status: int = 200, port: int = 0,
+                 tokens: Optional[List[str]] = None, token_interval: float = 0.05) -> None:
+        self.delay = delay
+        self.status = status
+        self.tokens = tokens
+        self.token_interval = token_interval
+        self.port = port
+        self.requests = 0
+        self.probes = 0
+        self.outstanding = 0
+        self.max_outstanding = 0
+        self.last_request: Optional[dict] = None
+        self.connections: List[socket.socket] = []
+        self.lock = threading.Lock()
+        self._server: Optional[_Server] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self) -> "StubLLM":
+        self._server = _Server(("127.0.0.1", self.port), _Handler)
+        self._server.stub = self
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        """Stop listening and drop open connections; start() again to come back."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        for conn in self.connections:
+            try:
+                conn.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        self.connections = []
+
+    def __enter__(self) -> "StubLLM":
+        return self.start()
+
+    def __exit__(self, *exc: object) -> None:
+        self.stop()
@@ -0,0 +1,147 @@
+"""Tests for condense_conversation_log.py."""
+
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import List
+from unittest import mock
+
+import condense_conversation_log as ccl
+import update_agent_conversation_log as ucl
+
+BOUNDARY = ucl.DEFAULT_BOUNDARY
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+class CondenseTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        root = Path(self.tmp.name)
+        self.log = root / "agent_conversation_log.md"
+        self.state = root / "cache" / "condense.json"
+        self.count = 0
+
+    def append(self, *summaries: str, agent: str = "builder") -> None:
+        entries = [
+            ucl.ConversationEntry(
+                summary=summary, agent=agent, role="assistant",
+                timestamp=START + timedelta(minutes=self.count + i),
+            )
+            for i, summary in enumerate(summaries)
+        ]
+        self.count += len(entries)
+        ucl.write_entries(self.log, entries, lock=False)
+
+    def run_condense(self, **kwargs: object) -> "tuple":
+        """Run condense() and save the checkpoint, counting parse_entry calls."""
+        calls: List[str] = []
+
+        def counting_parse(text: str) -> object:
+            calls.append(text)
+            return ucl.parse_entry(text)
+
+        with mock.patch.object(ccl, "parse_entry", counting_parse):
+            state, result = ccl.condense(self.log, self.state, **kwargs)
+        self.state.parent.mkdir(parents=True, exist_ok=True)
+        self.state.write_text(ccl.json.dumps(ccl.asdict(state)), encoding="utf-8")
+        return state, result, len(calls)
+
+    def full_state(self, **kwargs: object) -> ccl.CondenseState:
+        state, _ = ccl.condense(self.log, Path(self.tmp.name) / "scratch.json", full=True, **kwargs)
+        return state
+
+    def assertSameSummary(self, state: ccl.CondenseState, **kwargs: object) -> None:
+        self.assertEqual(ccl.render_summary(state), ccl.render_summary(self.full_state(**kwargs)))
+
+    def test_unchanged_log_parses_nothing(self) -> None:
+        self.append("one", "two", "three")
+        _, first, parsed = self.run_condense()
+        self.assertEqual((parsed, first.rebuilt), (3, True))
+
+        _, second, parsed = self.run_condense()
+        self.assertTrue(second.unchanged)
+        self.assertEqual((parsed, second.bytes_read), (0, 0))
+
+        self.append("four")
+        state, third, parsed = self.run_condense()
+        self.assertEqual((parsed, third.rebuilt), (1, False))
+        self.assertEqual(state.entries, 4)
+        self.assertSameSummary(state)
+
+    def _seal_and_check(self, compress: bool) -> None:
+        ucl.configure_rotation(self.log, compress=compress)
+        self.append("one", "two")
+        self.run_condense()
+        self.append("three")
+        sealed = ucl.seal_active_segment(self.log, BOUNDARY)
+        self.assertEqual(sealed.name.endswith(".gz"), compress)
+        self.append("four", "five")
+
+        # Resumes inside the sealed segment, then reads the new active log
+        state, result, parsed = self.run_condense()
+        self.assertEqual((parsed, result.rebuilt), (3, False))
+        self.assertEqual(state.entries, 5)
+        self.assertSameSummary(state)
+
+        _, result, parsed = self.run_condense()
+        self.assertTrue(result.unchanged)
+        self.assertEqual(parsed, 0)
+
+    def test_sealed_segment(self) -> None:
+        self._seal_and_check(compress=False)
+
+    def test_gzip_segment(self) -> None:
+        self._seal_and_check(compress=True)
+
+    def test_replaced_active_log_rebuilds(self) -> None:
+        self.append("one", "two", "three")
+        self.run_condense()
+        self.log.unlink()
+        self.append("other one", "other two", "other three", "other four", agent="reviewer")
+        state, result, parsed = self.run_condense()
+        self.assertEqual((parsed, result.rebuilt), (4, True))
+        self.assertEqual(state.agents, {"reviewer": 4})
+        self.assertSameSummary(state)
+
+        _, result, parsed = self.run_condense()
+        self.assertTrue(result.unchanged)
+        self.assertEqual(parsed, 0)
+
+    def test_header_only_log_is_unchanged(self) -> None:
+        self.log.write_text("# Handoffs\nno trailing newline", encoding="utf-8")
+        state, _, _ = self.run_condense()
+        self.assertEqual((state.entries, state.active_offset), (0, self.log.stat().st_size))
+
+        with mock.patch.object(ccl, "_consume") as consume:
+            _, second, _ = self.run_condense()
+        self.assertTrue(second.unchanged)
+        consume.assert_not_called()
+
+        self.append("one")
+        state, third, parsed = self.run_condense()
+        self.assertEqual((parsed, third.rebuilt), (1, False))
+        self.assertSameSummary(state)
+
+    def test_fresh_segment_after_a_rotation_is_unchanged(self) -> None:
+        self.log.write_text("# Handoffs\n", encoding="utf-8")
+        self.append("one", "two")
+        ucl.seal_active_segment(self.log, BOUNDARY)
+        self.run_condense()
+        with mock.patch.object(ccl, "_consume") as consume:
+            _, result, _ = self.run_condense()
+        self.assertTrue(result.unchanged)
+        consume.assert_not_called()
+
+    def test_recent_change_regenerates(self) -> None:
+        self.append(*[f"entry {i}" for i in range(8)])
+        self.run_condense(recent=3)
+        state, result, _ = self.run_condense(recent=6)
+        self.assertFalse(result.unchanged)
+        self.assertEqual(len(state.recent), 6)
+        self.assertSameSummary(state, recent=6)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,269 @@
+"""Tests for deploy_agent_kit.py."""
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from pathlib import Path
+
+import deploy_agent_kit as dak
+
+KIT_FILES = {
+    "AGENTS.md": "# Agents\n",
+    "ai/prompts/system.md": "prompt v1\n",
+    "skills/demo/SKILL.md": "---\nname: demo\n---\n",
+    "tools/utilities/tool.py": "print('v1')\n",
+}
+
+
+class DeployTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        root = Path(self.tmp.name)
+        self.kit = root / "kit" / ".agent"
+        for rel, text in KIT_FILES.items():
+            self.write(self.kit / rel, text)
+        self.repo = root / "repo"
+        self.repo.mkdir()
+
+    @staticmethod
+    def write(path: Path, text: str) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text, encoding="utf-8")
+        # Distinct mtimes even on coarse filesystem clocks
+        stamp = path.stat().st_mtime_ns + 2_000_000_000
+        os.utime(path, ns=(stamp, stamp))
+
+    def deploy(self, **kwargs: object) -> dak.DeployResult:
+        return dak.deploy(self.kit, self.repo, **kwargs)
+
+
+class SyncManifestTest(DeployTestCase):
+    def test_first_sync_after_plain_copy_reports_unrecorded_once(self) -> None:
+        # A destination set up by hand (or by an old kit) has no sync manifest
+        shutil.copytree(self.kit, self.repo / ".agent")
+        self.write(self.kit / "tools/utilities/tool.py", "print('v2')\n")
+
+        first = self.deploy(sync=True)
+        self.assertEqual(first.modified, [Path("tools/utilities/tool.py")])
+        self.assertEqual(first.unrecorded, first.modified)
+
+        second = self.deploy(sync=True)
+        self.assertEqual(second.modified, [Path("tools/utilities/tool.py")])
+        self.assertEqual(second.unrecorded, [])
+
+        adopted = self.deploy(sync=True, force=True)
+        self.assertEqual(adopted.updated, [Path("tools/utilities/tool.py")])
+
+        self.write(self.kit / "tools/utilities/tool.py", "print('v3')\n")
+        later = self.deploy(sync=True)
+        self.assertEqual(later.updated, [Path("tools/utilities/tool.py")])
+
+    def test_plain_deploy_records_manifest_for_later_sync(self) -> None:
+        self.deploy()
+        self.write(self.kit / "ai/prompts/system.md", "prompt v2\n")
+        result = self.deploy(sync=True)
+        self.assertEqual(result.updated, [Path("ai/prompts/system.md")])
+        self.assertEqual((result.modified, result.unrecorded), ([], []))
+
+    def test_dry_run_writes_nothing(self) -> None:
+        self.deploy(dry_run=True)
+        self.assertFalse((self.repo / ".agent").exists())
+
+    def test_kit_handoff_state_is_not_deployed(self) -> None:
+        handoffs = self.kit / "docs/agent_handoffs"
+        for name in ("agent_conversation_log.md", "agent_conversation_log.2026-08.md",
+                     "agent_conversation_log.2026-08_2026-10-2.md.gz",
+                     "agent_conversation_log.segments.json", "agent_conversation_log.summary.md",
+                     "agent_conversation_log.md.idx", "agent_conversation_log.md.lock"):
+            self.write(handoffs / name, "state\n")
+        self.deploy()
+        deployed = sorted(p.name for p in (self.repo / ".agent/docs/agent_handoffs").iterdir())
+        self.assertEqual(deployed, ["agent_conversation_log.md"])
+
+    def test_local_edit_is_kept(self) -> None:
+        self.deploy(sync=True)
+        self.write(self.repo / ".agent/AGENTS.md", "# Our agents\n")
+        self.write(self.kit / "AGENTS.md", "# Agents v2\n")
+        result = self.deploy(sync=True)
+        self.assertEqual(result.modified, [Path("AGENTS.md")])
+        self.assertEqual(result.unrecorded, [])
+        self.assertEqual((self.repo / ".agent/AGENTS.md").read_text(), "# Our agents\n")
+
+
+class LinkModeTest(DeployTestCase):
+    def test_auto_never_hardlinks(self) -> None:
+        result = self.deploy(link_mode="auto")
+        self.assertNotIn("hardlink", result.methods.values())
+        for rel in KIT_FILES:
+            self.assertNotEqual(
+                (self.repo / ".agent" / rel).stat().st_ino, (self.kit / rel).stat().st_ino
+            )
+
+    def make_read_only(self, rel: str) -> None:
+        path = self.kit / rel
+        path.chmod(path.stat().st_mode & ~0o222)
+
+    def test_hardlink_never_changes_the_kit(self) -> None:
+        modes = {rel: (self.kit / rel).stat().st_mode for rel in KIT_FILES}
+        result = self.deploy(link_mode="hardlink")
+        # Writable kit files are copied, not linked and not made read-only
+        self.assertNotIn("hardlink", result.methods.values())
+        self.assertEqual({rel: (self.kit / rel).stat().st_mode for rel in KIT_FILES}, modes)
+        prompt = self.repo / ".agent/ai/prompts/system.md"
+        self.assertNotEqual(prompt.stat().st_ino, (self.kit / "ai/prompts/system.md").stat().st_ino)
+
+    def test_read_only_kit_files_are_linked(self) -> None:
+        self.make_read_only("ai/prompts/system.md")
+        self.make_read_only("tools/utilities/tool.py")
+        kit_mode = (self.kit / "ai/prompts/system.md").stat().st_mode
+        result = self.deploy(link_mode="hardlink")
+        prompt = self.repo / ".agent/ai/prompts/system.md"
+        self.assertEqual(result.methods[Path("ai/prompts/system.md")], "hardlink")
+        self.assertEqual(result.methods[Path("skills/demo/SKILL.md")], "copy")
+        self.assertEqual(result.methods[Path("tools/utilities/tool.py")], "copy")
+        self.assertEqual(prompt.stat().st_ino, (self.kit / "ai/prompts/system.md").stat().st_ino)
+        self.assertEqual((self.kit / "ai/prompts/system.md").stat().st_mode, kit_mode)
+
+        # A plain copy of the read-only kit file is private and writable
+        other = Path(self.tmp.name) / "other"
+        other.mkdir()
+        dak.deploy(self.kit, other)
+        copy = other / ".agent/ai/prompts/system.md"
+        self.assertNotEqual(copy.stat().st_ino, prompt.stat().st_ino)
+        self.assertTrue(copy.stat().st_mode & 0o200)
+
+    def test_forced_copy_breaks_the_link(self) -> None:
+        self.make_read_only("ai/prompts/system.md")
+        self.deploy(link_mode="hardlink")
+        self.deploy(force=True)
+        prompt = self.repo / ".agent/ai/prompts/system.md"
+        self.assertNotEqual(prompt.stat().st_ino, (self.kit / "ai/prompts/system.md").stat().st_ino)
+        prompt.write_text("edited\n", encoding="utf-8")
+        self.assertEqual((self.kit / "ai/prompts/system.md").read_text(), "prompt v1\n")
+
+
+class GitignoreTest(DeployTestCase):
+    def test_complete_gitignore_is_not_reread(self) -> None:
+        gitignore = self.repo / ".gitignore"
+        gitignore.write_text("node_modules/", encoding="utf-8")
+        self.assertTrue(self.deploy().gitignore_updated)
+        text = gitignore.read_text(encoding="utf-8")
+        self.assertTrue(text.startswith("node_modules/\n\n# Agent Collaboration Kit"))
+        for entry in dak.GITIGNORE_ENTRIES:
+            self.assertIn(entry, text.splitlines())
+        self.assertEqual([p.name for p in self.repo.iterdir() if "tmp" in p.name], [])
+
+        real_read = Path.read_text
+
+        def tracking_read(path: Path, *args: object, **kwargs: object) -> str:
+            self.assertNotEqual(path.name, ".gitignore")
+            return real_read(path, *args, **kwargs)
+
+        with mock.patch.object(Path, "read_text", tracking_read):
+            self.assertFalse(self.deploy().gitignore_updated)
+
+        # An edit that drops an entry is noticed and repaired
+        gitignore.write_text(text.replace(".agent.previous/\n", ""), encoding="utf-8")
+        self.assertTrue(self.deploy().gitignore_updated)
+        self.assertIn(".agent.previous/", gitignore.read_text(encoding="utf-8").splitlines())
+
+    def test_dry_run_leaves_gitignore_alone(self) -> None:
+        self.assertTrue(self.deploy(dry_run=True).gitignore_updated)
+        self.assertFalse((self.repo / ".gitignore").exists())
+
+
+class AtomicDeployTest(DeployTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.write(self.kit / "docs/agent_handoffs/README.md", "handoffs v1\n")
+        self.deploy(atomic=True)
+        self.handoffs = self.repo / ".agent/docs/agent_handoffs"
+        self.write(self.handoffs / "agent_conversation_log.md", "entry 1\n")
+        self.write(self.repo / ".agent/.cache/index.json", "{}\n")
+
+    def test_writes_made_while_staged_survive_swap_and_rollback(self) -> None:
+        real = dak._deploy_files
+
+        def deploy_files_then_agents_write(*args: object, **kwargs: object) -> None:
+            real(*args, **kwargs)
+            # An agent rotates the log and rewrites a cache while the tree is staged
+            os.rename(self.handoffs / "agent_conversation_log.md", self.handoffs / "segment.md")
+            self.write(self.handoffs / "agent_conversation_log.md", "entry 2\n")
+            tmp = self.repo / ".agent/.cache/index.json.tmp"
+            tmp.write_text('{"v": 2}\n', encoding="utf-8")
+            os.replace(tmp, self.repo / ".agent/.cache/index.json")
+
+        self.write(self.kit / "AGENTS.md", "# Agents v2\n")
+        with mock.patch.object(dak, "_deploy_files", deploy_files_then_agents_write):
+            result = self.deploy(atomic=True, force=True)
+        self.assertIn(result.swap, ("exchange", "two renames"))
+        self.assertEqual((self.repo / ".agent/AGENTS.md").read_text(), "# Agents v2\n")
+        self.assertEqual((self.handoffs / "segment.md").read_text(), "entry 1\n")
+        self.assertEqual((self.handoffs / "agent_conversation_log.md").read_text(), "entry 2\n")
+        self.assertEqual((self.repo / ".agent/.cache/index.json").read_text(), '{"v": 2}\n')
+        self.assertTrue((self.repo / ".agent" / dak.DEPLOY_MANIFEST).exists())
+
+        with (self.handoffs / "agent_conversation_log.md").open("a") as log:
+            log.write("entry 3\n")
+        (self.handoffs / "segment.md").unlink()
+        dak.rollback(self.repo)
+        self.assertEqual((self.repo / ".agent/AGENTS.md").read_text(), "# Agents\n")
+        self.assertEqual((self.handoffs / "agent_conversation_log.md").read_text(), "entry 2\nentry 3\n")
+        self.assertFalse((self.handoffs / "segment.md").exists())
+        self.assertEqual((self.repo / ".agent/.cache/index.json").read_text(), '{"v": 2}\n')
+
+    def interrupt(self, src: str, dst: str):
+        """Patch os.rename to fail once when renaming ``src`` to ``dst`` (no renameat2)."""
+        real_rename = os.rename
+        state = {"failed": False}
+
+        def rename(a: object, b: object) -> None:
+            if not state["failed"] and Path(a).name == src and Path(b).name == dst:
+                state["failed"] = True
+                raise OSError("interrupted")
+            real_rename(a, b)
+
+        return mock.patch.multiple(
+            dak, _rename_exchange=mock.Mock(return_value=False),
+            os=mock.Mock(wraps=os, rename=rename),
+        )
+
+    def test_interrupted_two_rename_swap_is_finished_next_run(self) -> None:
+        self.write(self.kit / "AGENTS.md", "# Agents v2\n")
+        with self.interrupt(dak.STAGING_DIR, ".agent"):
+            failed = self.deploy(atomic=True, force=True)
+        self.assertTrue(failed.errors)
+        self.assertFalse((self.repo / ".agent").exists())
+        self.assertTrue((self.repo / dak.SWAP_JOURNAL).exists())
+
+        result = self.deploy(atomic=True, sync=True)
+        self.assertEqual(result.recovered, "deploy")
+        self.assertEqual((self.repo / ".agent/AGENTS.md").read_text(), "# Agents v2\n")
+        self.assertEqual((self.handoffs / "agent_conversation_log.md").read_text(), "entry 1\n")
+        self.assertFalse((self.repo / dak.SWAP_JOURNAL).exists())
+
+    def test_interrupted_rollback_is_finished_not_repeated(self) -> None:
+        self.write(self.kit / "AGENTS.md", "# Agents v2\n")
+        self.deploy(atomic=True, force=True)
+        with self.interrupt(dak.PREVIOUS_DIR, ".agent"):
+            with self.assertRaises(OSError):
+                dak.rollback(self.repo)
+        self.assertFalse((self.repo / ".agent").exists())
+
+        self.assertEqual(dak.rollback(self.repo), "recovered")
+        self.assertEqual((self.repo / ".agent/AGENTS.md").read_text(), "# Agents\n")
+        self.assertEqual((self.repo / dak.PREVIOUS_DIR / "AGENTS.md").read_text(), "# Agents v2\n")
+        self.assertFalse((self.repo / dak.STAGING_DIR).exists())
+
+    def test_kit_update_to_mutable_dir_wins(self) -> None:
+        self.write(self.kit / "docs/agent_handoffs/README.md", "handoffs v2\n")
+        self.deploy(atomic=True, force=True)
+        self.assertEqual((self.handoffs / "README.md").read_text(), "handoffs v2\n")
+        self.assertEqual((self.handoffs / "agent_conversation_log.md").read_text(), "entry 1\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,357 @@
+"""Tests for gemini_audit.py, run against a stand-in Gemini CLI."""
+
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from tests.gemini_support import (
+    GEMINI_AUDIT, NO_LOGGER, calls, make_fake_cli, make_project, prompts, run_audit,
+)
+
+
+class AuditTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        root = Path(self.tmp.name)
+        self.bin = make_fake_cli(root / "bin")
+        self.no_cli = root / "empty-bin"
+        self.no_cli.mkdir()
+        self.repo = make_project(root / "repo")
+        self.calls = root / "calls.txt"
+
+    def audit(self, *args: str, cli: bool = True, worker: bool = False, python_args=(), **env: str):
+        env.setdefault("FAKE_GEMINI_CALLS", str(self.calls))
+        args = args if worker else ("--no-worker", *args)
+        return run_audit(args, self.repo, [self.bin if cli else self.no_cli], env, python_args=python_args)
+
+    def version_checks(self) -> int:
+        return sum(1 for c in calls(self.calls) if "--version" in c)
+
+    def audits(self) -> int:
+        return sum(1 for c in calls(self.calls) if "--version" not in c)
+
+
+class BatchTest(AuditTestCase):
+    def write_manifest(self) -> Path:
+        (self.repo / "plan_b.md").write_text("REJECTME: skip the tests.\n", encoding="utf-8")
+        manifest = self.repo / "audits.jsonl"
+        manifest.write_text(
+            json.dumps({"id": "a", "task": ".agent/task.md", "plan": ".agent/implementation_plan.md"}) + "\n"
+            + json.dumps({"id": "b", "task": ".agent/task.md", "plan": "plan_b.md"}) + "\n",
+            encoding="utf-8",
+        )
+        return manifest
+
+    def report(self) -> dict:
+        lines = (self.repo / ".reports/gemini_audits.jsonl").read_text(encoding="utf-8").splitlines()
+        return {r["id"]: r for r in map(json.loads, lines)}
+
+    def test_cached_batch_runs_without_the_cli(self) -> None:
+        manifest = self.write_manifest()
+        first = self.audit("--batch", str(manifest), "--no-log")
+        self.assertEqual(first.returncode, 1, first.stderr)      # b was rejected
+        self.assertEqual(sum(1 for c in calls(self.calls) if "--version" not in c), 2)
+
+        again = self.audit("--batch", str(manifest), "--no-log", cli=False)
+        self.assertEqual(again.returncode, 1, again.stderr)
+        self.assertNotIn("Gemini CLI not found", again.stderr)
+        report = self.report()
+        self.assertEqual({k: (r["decision"], r["cached"]) for k, r in report.items()},
+                         {"a": ("APPROVE", True), "b": ("REJECT", True)})
+
+    def test_uncached_batch_without_the_cli_reports_each_job_as_an_error(self) -> None:
+        manifest = self.write_manifest()
+        result = self.audit("--batch", str(manifest), "--no-log", "--workers", "2", cli=False)
+        self.assertEqual(result.returncode, 2, result.stderr)
+        self.assertEqual(result.stderr.count("Gemini CLI not found"), 1, result.stderr)
+        self.assertNotIn("Traceback", result.stderr)
+        self.assertIn("Audited 2 plans", result.stdout)
+        report = self.report()
+        self.assertEqual({k: (r["decision"], r["exit_code"]) for k, r in report.items()},
+                         {"a": ("ERROR", 2), "b": ("ERROR", 2)})
+        self.assertTrue(report["a"]["output"].startswith("ERROR: "))
+
+    def test_jobs_the_cli_could_run_still_count_next_to_errors(self) -> None:
+        manifest = self.write_manifest()
+        self.audit("--batch", str(manifest), "--no-log")            # caches a and b
+        (self.repo / "plan_c.md").write_text("1. Something new.\n", encoding="utf-8")
+        with manifest.open("a", encoding="utf-8") as out:
+            out.write(json.dumps({"id": "c", "task": ".agent/task.md", "plan": "plan_c.md"}) + "\n")
+        result = self.audit("--batch", str(manifest), "--no-log", cli=False)
+        self.assertEqual(result.returncode, 1, result.stderr)          # b is still rejected
+        self.assertEqual({k: r["decision"] for k, r in self.report().items()},
+                         {"a": "APPROVE", "b": "REJECT", "c": "ERROR"})
+
+    def test_agent_directory_without_a_task_is_an_error(self) -> None:
+        repos = Path(self.tmp.name) / "repos"
+        make_project(repos / "ready")
+        make_project(repos / "empty")
+        (repos / "empty/.agent/task.md").unlink()
+        result = self.audit("--agent-glob", str(repos / "*/.agent"), "--no-log")
+        self.assertEqual(result.returncode, 2, result.stderr)
+        report = {Path(k).parent.name: r for k, r in self.report().items()}
+        self.assertEqual({k: r["decision"] for k, r in report.items()},
+                         {"ready": "APPROVE", "empty": "ERROR"})
+        self.assertIn("Task file not found", report["empty"]["output"])
+        self.assertEqual(self.audits(), 1)
+
+    def test_cli_is_checked_once_per_batch(self) -> None:
+        manifest = self.write_manifest()
+        result = self.audit("--batch", str(manifest), "--no-log", "--workers", "2", "--no-cache",
+                            GEMINI_ENV_TTL="0")
+        self.assertEqual(result.returncode, 1, result.stderr)
+        self.assertEqual(self.version_checks(), 1)
+
+
+class AuditCacheTest(AuditTestCase):
+    def test_identical_audit_is_answered_from_the_cache(self) -> None:
+        first = self.audit("--no-log")
+        self.assertEqual(first.returncode, 0, first.stderr)
+        again = self.audit("--no-log")
+        self.assertEqual(again.returncode, 0, again.stderr)
+        self.assertIn("Cached result", again.stdout)
+        self.assertIn("**Decision**: APPROVE", again.stdout)
+        self.assertEqual(self.audits(), 1)
+
+    def test_changing_the_prompt_persona_or_model_misses(self) -> None:
+        self.audit("--no-log")
+        changes = [
+            (".agent/task.md", "Add a logout page.\n"),
+            (".agent/implementation_plan.md", "1. Build the form.\n2. Test it.\n"),
+            (".gemini/personas/auditor.md", "You are a stricter PACK auditor.\n"),
+        ]
+        for n, (name, text) in enumerate(changes, start=2):
+            (self.repo / name).write_text(text, encoding="utf-8")
+            with self.subTest(changed=name):
+                result = self.audit("--no-log")
+                self.assertEqual(result.returncode, 0, result.stderr)
+                self.assertNotIn("Cached result", result.stdout)
+                self.assertEqual(self.audits(), n)
+        model = self.audit("--no-log", "--model", "gemini-2.5-flash")
+        self.assertNotIn("Cached result", model.stdout)
+        self.assertEqual(self.audits(), 5)
+        self.assertIn("Cached result", self.audit("--no-log", "--model", "gemini-2.5-flash").stdout)
+        self.assertEqual(self.audits(), 5)
+
+    def test_refresh_reruns_and_updates_the_cache(self) -> None:
+        self.audit("--no-log")
+        refreshed = self.audit("--no-log", "--refresh")
+        self.assertNotIn("Cached result", refreshed.stdout)
+        self.assertEqual(self.audits(), 2)
+        self.assertIn("Cached result", self.audit("--no-log").stdout)
+        self.assertEqual(self.audits(), 2)
+
+    def test_no_cache_neither_reads_nor_writes(self) -> None:
+        self.audit("--no-log", "--no-cache")
+        self.assertFalse((self.repo / ".agent/.cache/audits").exists())
+        self.audit("--no-log")
+        uncached = self.audit("--no-log", "--no-cache")
+        self.assertNotIn("Cached result", uncached.stdout)
+        self.assertEqual(self.audits(), 3)
+
+
+class DeltaAuditTest(AuditTestCase):
+    FULL = "# PACK HANDOFF: AUDIT REQUEST"
+    DELTA = "# PACK HANDOFF: RE-AUDIT REQUEST (REVISION)"
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.prompts = Path(self.tmp.name) / "prompts.txt"
+        self.plan = self.repo / ".agent/implementation_plan.md"
+        steps = [f"## Step {i}\n" + f"Build part {i} of the login page and test it.\n" * 5 for i in range(30)]
+        self.plan.write_text("".join(steps), encoding="utf-8")
+
+    def audit(self, *args: str, **env: str):
+        env.setdefault("FAKE_GEMINI_PROMPTS", str(self.prompts))
+        return super().audit("--no-log", *args, **env)
+
+    def revise(self) -> None:
+        self.plan.write_text(self.plan.read_text(encoding="utf-8") + "## Step 30\nAdd rate limiting.\n",
+                             encoding="utf-8")
+
+    def sent(self) -> list:
+        return [prompt.splitlines()[0] for prompt in prompts(self.prompts)]
+
+    def test_revised_plan_sends_only_the_changes(self) -> None:
+        self.assertEqual(self.audit().returncode, 0)
+        self.revise()
+        result = self.audit()
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertIn("Delta audit: sent", result.stdout)
+        self.assertEqual(self.sent(), [self.FULL, self.DELTA])
+        delta = prompts(self.prompts)[1]
+        self.assertIn("+## Step 30", delta)
+        self.assertIn("Decision: APPROVE", delta)               # the previous decision
+        self.assertIn("- Plan: ## Step 29 (5 lines)", delta)    # an unchanged section
+        self.assertLess(len(delta), len(prompts(self.prompts)[0]) / 2)
+
+    def test_unchanged_task_and_plan_send_the_full_prompt(self) -> None:
+        for _ in range(2):
+            self.assertEqual(self.audit("--no-cache").returncode, 0)
+        self.assertEqual(self.sent(), [self.FULL, self.FULL])
+
+    def test_full_flag_bypasses_the_delta(self) -> None:
+        self.audit()
+        self.revise()
+        result = self.audit("--full")
+        self.assertNotIn("Delta audit", result.stdout)
+        self.assertEqual(self.sent(), [self.FULL, self.FULL])
+
+    def test_failed_run_does_not_become_the_baseline(self) -> None:
+        failed = self.audit(FAKE_GEMINI_EXIT="1")
+        self.assertIn("**Decision**: APPROVE", failed.stdout)
+        self.assertFalse(list((self.repo / ".agent/.cache/audit_baselines").glob("*.json")))
+        self.revise()
+        self.audit()
+        self.revise()
+        self.audit()
+        self.assertEqual(self.sent(), [self.FULL, self.FULL, self.DELTA])
+
+
+class EnvironmentCacheTest(AuditTestCase):
+    def test_checks_are_cached_until_the_cli_changes(self) -> None:
+        for _ in range(3):
+            self.assertEqual(self.audit("--no-cache", "--no-log").returncode, 0)
+        self.assertEqual(self.version_checks(), 1)
+        cached = json.loads((self.repo / ".agent/.cache/gemini_env.json").read_text())
+        self.assertEqual((cached["node_version"], cached["gemini_ok"]), ("22.11.0", True))
+
+        # Upgrading the CLI (a new mtime) re-runs the checks
+        stamp = (self.bin / "gemini").stat().st_mtime + 5
+        os.utime(self.bin / "gemini", (stamp, stamp))
+        self.audit("--no-cache", "--no-log")
+        self.assertEqual(self.version_checks(), 2)
+
+    def test_zero_ttl_checks_every_run(self) -> None:
+        for _ in range(2):
+            self.audit("--no-cache", "--no-log", GEMINI_ENV_TTL="0")
+        self.assertEqual(self.version_checks(), 2)
+        self.assertFalse((self.repo / ".agent/.cache/gemini_env.json").exists())
+
+
+class LoggingTest(AuditTestCase):
+    def log_text(self) -> str:
+        return (self.repo / ".agent/docs/agent_handoffs/agent_conversation_log.md").read_text(encoding="utf-8")
+
+    def check_logged(self, python_args=()) -> None:
+        (self.repo / "plan_b.md").write_text("REJECTME: skip the tests.\n", encoding="utf-8")
+        self.assertEqual(self.audit("--no-cache", python_args=python_args).returncode, 0)
+        rejected = self.audit("--no-cache", "--plan", "plan_b.md", python_args=python_args)
+        self.assertEqual(rejected.returncode, 1, rejected.stderr)
+        log = self.log_text()
+        self.assertIn("APPROVE", log)
+        self.assertIn("REJECT", log)
+
+    def test_result_is_logged_in_process(self) -> None:
+        self.check_logged()
+
+    def test_result_is_logged_through_the_script_without_the_module(self) -> None:
+        self.check_logged(NO_LOGGER)
+
+
+class StopEarlyCacheTest(AuditTestCase):
+    CHATTY = {"FAKE_GEMINI_TRAILER": "5", "FAKE_GEMINI_PACE": "0.1"}
+
+    def cache_records(self) -> list:
+        return [json.loads(p.read_text()) for p in (self.repo / ".agent/.cache/audits").glob("*.json")]
+
+    def test_stopped_output_is_not_served_to_a_full_audit(self) -> None:
+        stopped = self.audit("--no-log", "--stop-early", **self.CHATTY)
+        self.assertEqual(stopped.returncode, 0, stopped.stderr)
+        self.assertIn("[stopped after the decision block]", stopped.stdout)
+        self.assertEqual([r.get("partial") for r in self.cache_records()], [True])
+
+        # The same stopped audit is answered from the partial entry
+        again = self.audit("--no-log", "--stop-early", **self.CHATTY)
+        self.assertIn("Cached result", again.stdout)
+        self.assertEqual(self.audits(), 1)
+
+        full = self.audit("--no-log", **self.CHATTY)
+        self.assertEqual(self.audits(), 2)
+        self.assertNotIn("Cached result", full.stdout)
+        self.assertIn("Further notes on the plan, line 4.", full.stdout)
+
+        # Once a full result exists, stopped runs are served the full output
+        last = self.audit("--no-log", "--stop-early", **self.CHATTY)
+        self.assertEqual(self.audits(), 2)
+        self.assertIn("Further notes on the plan, line 4.", last.stdout)
+
+    def test_complete_streamed_output_is_cached_as_a_full_audit(self) -> None:
+        self.audit("--no-log", "--stream", **self.CHATTY)
+        self.assertEqual([r.get("partial") for r in self.cache_records()], [None])
+        full = self.audit("--no-log")
+        self.assertIn("Cached result", full.stdout)
+        self.assertEqual(self.audits(), 1)
+
+
+class WorkerTest(AuditTestCase):
+    def start_worker(self, **env: str) -> Path:
+        worker_calls = Path(self.tmp.name) / "worker_calls.txt"
+        proc = subprocess.Popen(
+            [sys.executable, str(GEMINI_AUDIT), "--serve", "--quiet"],
+            cwd=self.repo, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+            env=dict(os.environ, PATH=str(self.bin), FAKE_GEMINI_CALLS=str(worker_calls), **env),
+        )
+
+        def stop() -> None:
+            proc.send_signal(signal.SIGINT)
+            proc.communicate(timeout=30)
+        self.addCleanup(stop)
+        socket_path = self.repo / ".agent/.cache/gemini_audit.sock"
+        deadline = time.monotonic() + 30
+        while not socket_path.exists():
+            self.assertIsNone(proc.poll(), "worker exited")
+            self.assertLess(time.monotonic(), deadline, "worker did not start")
+            time.sleep(0.05)
+        return worker_calls
+
+    def test_audits_run_on_the_worker_with_a_warm_cli(self) -> None:
+        worker_calls = self.start_worker(FAKE_GEMINI_STARTUP="1.0")
+        first = self.audit("--no-cache", "--no-log", worker=True)
+        self.assertEqual(first.returncode, 0, first.stderr)
+        self.assertIn("**Decision**: APPROVE", first.stdout)
+
+        time.sleep(1.5)     # the spare the worker started is now past its start-up
+        started = time.perf_counter()
+        second = self.audit("--no-cache", "--no-log", worker=True)
+        self.assertEqual(second.returncode, 0, second.stderr)
+        self.assertLess(time.perf_counter() - started, 0.9)
+
+        # The client neither checked nor ran the CLI itself (a third, spare
+        # CLI may still be starting on the worker)
+        self.assertEqual(calls(self.calls), [])
+        self.assertGreaterEqual(sum(1 for c in calls(worker_calls) if "--version" not in c), 2)
+
+    def test_worker_runs_the_cli_in_the_clients_directory_and_environment(self) -> None:
+        self.start_worker(FAKE_GEMINI_SHOW="GEMINI_API_KEY,GOOGLE_CLOUD_PROJECT",
+                          GEMINI_API_KEY="worker-key", GOOGLE_CLOUD_PROJECT="worker-project")
+        other = make_project(Path(self.tmp.name) / "other", task="Add a search page.")
+        socket_path = self.repo / ".agent/.cache/gemini_audit.sock"
+        for key, project in (("client-key", "client-project"), (None, None)):
+            env = {"FAKE_GEMINI_CALLS": str(self.calls)}
+            if key:
+                env.update(GEMINI_API_KEY=key, GOOGLE_CLOUD_PROJECT=project)
+            result = run_audit(["--no-cache", "--no-log", "--worker-socket", str(socket_path)],
+                               other, [self.bin], env)
+            with self.subTest(key=key):
+                self.assertEqual(result.returncode, 0, result.stderr)
+                self.assertIn(f"cwd={os.path.realpath(other)}\n", result.stdout)
+                self.assertIn(f"GEMINI_API_KEY={key or ''}\n", result.stdout)
+                self.assertIn(f"GOOGLE_CLOUD_PROJECT={project or ''}\n", result.stdout)
+        self.assertEqual(calls(self.calls), [])        # both ran on the worker
+
+    def test_falls_back_to_a_local_run_without_a_worker(self) -> None:
+        result = self.audit("--no-cache", "--no-log", worker=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(sum(1 for c in calls(self.calls) if "--version" not in c), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
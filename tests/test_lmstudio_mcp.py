@@ -0,0 +1,594 @@
+"""Tests for the lmstudio_mcp.py server generated by setup_offline_ai.py."""
+
+import asyncio
+import contextlib
+import gc
+import io
+import json
+import os
+import random
+import re
+import tempfile
+import time
+import types
+import unittest
+import warnings
+from typing import List, Tuple
+from unittest import mock
+
+from tests.lmstudio_support import StubLLM, load_server
+
+MESSAGES = [{"role": "user", "content": "hello"}]
+HELD = json.dumps({"messages": MESSAGES}).encode("utf-8")   # a request left unread
+
+
+class ServerTestCase(unittest.TestCase):
+    def stub(self, **kwargs: object) -> StubLLM:
+        stub = StubLLM(**kwargs).start()
+        self.addCleanup(stub.stop)
+        return stub
+
+    def server(self, *stubs: StubLLM, **env: str) -> object:
+        env = {"LMSTUDIO_ENDPOINTS": ",".join(s.url for s in stubs),
+               "LMSTUDIO_HEALTH_INTERVAL": "0", **env}
+        return load_server(env)
+
+
+class ConnectionPoolTest(ServerTestCase):
+    def test_calls_reuse_one_keep_alive_connection(self) -> None:
+        stub = self.stub()
+        server = self.server(stub)
+        for _ in range(5):
+            self.assertEqual(server._call_lmstudio(MESSAGES), f"echo:{stub.port}:5")
+        self.assertEqual((stub.requests, len(stub.connections)), (5, 1))
+
+    def test_large_history_is_sent_in_the_body(self) -> None:
+        stub = self.stub()
+        server = self.server(stub)
+        big = [{"role": "user", "content": "x" * 300_000}]
+        self.assertEqual(server._call_lmstudio(big), f"echo:{stub.port}:300000")
+
+    def test_reconnects_after_server_drops_idle_connection(self) -> None:
+        stub = self.stub()
+        server = self.server(stub)
+        server._call_lmstudio(MESSAGES)
+        stub.stop()
+        stub.start()
+        self.assertEqual(server._call_lmstudio(MESSAGES), f"echo:{stub.port}:5")
+
+
+class StreamingTest(ServerTestCase):
+    TOKENS = ["The ", "answer ", "is ", "forty", "-two", "."]
+
+    def attach_client(self, server: object) -> List[Tuple[float, dict]]:
+        """Record the progress notifications the server sends, with arrival times."""
+        sent: List[Tuple[float, dict]] = []
+        server._server = types.SimpleNamespace(
+            send_notification=lambda method, params: sent.append((time.perf_counter(), params)))
+        return sent
+
+    def test_tokens_are_forwarded_as_they_arrive(self) -> None:
+        stub = self.stub(tokens=self.TOKENS, token_interval=0.1)
+        server = self.server(stub)
+        sent = self.attach_client(server)
+
+        started = time.perf_counter()
+        text = server.chat(MESSAGES, stream=True, progress_token="t1")
+        total = time.perf_counter() - started
+
+        self.assertEqual(text, "".join(self.TOKENS))
+        self.assertTrue(stub.last_request["stream"])
+        self.assertEqual([params["message"] for _, params in sent], self.TOKENS)
+        self.assertEqual([params["progress"] for _, params in sent], list(range(1, 7)))
+        self.assertEqual({params["progressToken"] for _, params in sent}, {"t1"})
+        # The first token reaches the client long before generation finishes
+        first = sent[0][0] - started
+        self.assertGreater(total, 0.5)
+        self.assertLess(first, total / 2)
+
+    def test_async_notifier_is_awaited_in_sync_mode(self) -> None:
+        stub = self.stub(tokens=self.TOKENS, token_interval=0.0)
+        server = self.server(stub)
+        sent: List[dict] = []
+
+        async def send_notification(method: str, params: dict) -> None:
+            await asyncio.sleep(0)
+            sent.append(params)
+
+        server._server = types.SimpleNamespace(send_notification=send_notification)
+        self.assertEqual(server.chat(MESSAGES, stream=True, progress_token="t1"), "".join(self.TOKENS))
+        self.assertEqual([params["message"] for params in sent], self.TOKENS)
+
+    def test_notifier_on_a_running_loop_is_closed_and_warned_once(self) -> None:
+        server = self.server(self.stub())
+        started: List[dict] = []
+
+        async def send_notification(method: str, params: dict) -> None:
+            started.append(params)
+
+        server._server = types.SimpleNamespace(send_notification=send_notification)
+
+        async def caller() -> None:
+            for i in range(3):
+                server._send_progress("t1", i, "chunk")
+
+        stderr = io.StringIO()
+        with warnings.catch_warnings(record=True) as caught, contextlib.redirect_stderr(stderr):
+            warnings.simplefilter("always")
+            asyncio.run(caller())
+            gc.collect()
+        self.assertEqual(started, [])
+        self.assertEqual([w for w in caught if "never awaited" in str(w.message)], [])
+        self.assertEqual(stderr.getvalue().count("progress notifications dropped"), 1)
+
+    def test_stream_without_progress_token_returns_the_text(self) -> None:
+        stub = self.stub(tokens=self.TOKENS, token_interval=0.0)
+        server = self.server(stub)
+        sent = self.attach_client(server)
+        self.assertEqual(server.chat(MESSAGES, stream=True), "".join(self.TOKENS))
+        self.assertEqual(sent, [])
+
+    def test_drained_stream_leaves_the_connection_reusable(self) -> None:
+        stub = self.stub(tokens=self.TOKENS, token_interval=0.0)
+        server = self.server(stub)
+        for _ in range(3):
+            server.chat(MESSAGES, stream=True)
+        server.chat(MESSAGES)
+        self.assertEqual((stub.requests, len(stub.connections)), (4, 1))
+
+    def test_server_that_ignores_stream_falls_back_to_json(self) -> None:
+        stub = self.stub()
+        server = self.server(stub)
+        sent = self.attach_client(server)
+        self.assertEqual(server.chat(MESSAGES, stream=True, progress_token="t1"), f"echo:{stub.port}:5")
+        self.assertEqual(sent, [])
+
+    def test_non_streaming_call_is_unchanged(self) -> None:
+        stub = self.stub(tokens=self.TOKENS)
+        server = self.server(stub)
+        self.assertEqual(server.chat(MESSAGES), f"echo:{stub.port}:5")
+        self.assertFalse(stub.last_request["stream"])
+
+
+class RouterTest(ServerTestCase):
+    def states(self, server: object) -> List[Tuple[str, int]]:
+        return [(b["state"], b["consecutive_failures"]) for b in server._router.snapshot()]
+
+    def test_least_outstanding_backend_is_picked(self) -> None:
+        a, b = self.stub(), self.stub()
+        server = self.server(a, b)
+        with server._router.stream("POST", server.API_PATH, HELD, {}):
+            # a holds one request open, so the next one goes to b
+            self.assertEqual(server.chat(MESSAGES), f"echo:{b.port}:5")
+        self.assertEqual(server.chat(MESSAGES), f"echo:{a.port}:5")
+
+    def test_fails_over_on_refused_connection_and_5xx(self) -> None:
+        down, failing, up = self.stub(), self.stub(status=503), self.stub()
+        down.stop()
+        server = self.server(down, failing, up)
+        self.assertEqual(server.chat(MESSAGES), f"echo:{up.port}:5")
+        self.assertEqual((failing.requests, up.requests), (1, 1))
+        self.assertEqual(self.states(server), [("closed", 1), ("closed", 1), ("closed", 0)])
+
+    def test_read_timeout_is_raised_without_retrying(self) -> None:
+        slow, fast = self.stub(delay=1.0), self.stub()
+        server = self.server(slow, fast, LMSTUDIO_TIMEOUT="0.3")
+        with self.assertRaises(Exception) as ctx:
+            server._call_lmstudio(MESSAGES)
+        self.assertIn("timed out", str(ctx.exception.data))
+        self.assertEqual((slow.requests, fast.requests), (1, 0))
+        self.assertEqual(self.states(server)[0], ("closed", 1))
+
+    def test_full_pool_is_not_a_backend_failure(self) -> None:
+        stub = self.stub()
+        server = self.server(stub, LMSTUDIO_POOL_SIZE="1", LMSTUDIO_POOL_TIMEOUT="0.3")
+        with server._router.stream("POST", server.API_PATH, HELD, {}):
+            started = time.monotonic()
+            with self.assertRaises(Exception) as ctx:
+                server._call_lmstudio(MESSAGES)
+            self.assertLess(time.monotonic() - started, 5)
+            self.assertIn("no free connection", str(ctx.exception.data))
+            self.assertEqual(self.states(server), [("closed", 0)])
+        self.assertEqual(server.chat(MESSAGES), f"echo:{stub.port}:5")
+
+    def test_pool_timeout_reports_its_own_size(self) -> None:
+        server = self.server(self.stub())
+        pool = server.ConnectionPool(self.stub().url, size=2, acquire_timeout=0.1)
+        pool._slots.acquire()
+        pool._slots.acquire()
+        with self.assertRaisesRegex(server.PoolExhausted, r"pool size 2\)"):
+            pool.request("GET", "/v1/models")
+
+    def test_pool_wait_is_short_and_separate_from_the_read_timeout(self) -> None:
+        server = self.server(self.stub())
+        pool = server._router.backends[0].pool
+        self.assertEqual((pool.acquire_timeout, pool.timeout),
+                         (server.POOL_TIMEOUT, server.REQUEST_TIMEOUT))
+        self.assertLess(server.POOL_TIMEOUT, server.REQUEST_TIMEOUT)
+
+    def test_breaker_opens_then_recovers_half_open(self) -> None:
+        flaky, steady = self.stub(), self.stub()
+        flaky.stop()
+        server = self.server(flaky, steady, LMSTUDIO_BREAKER_FAILURES="2",
+                             LMSTUDIO_BREAKER_COOLDOWN="0.3")
+        for _ in range(2):
+            self.assertEqual(server.chat(MESSAGES), f"echo:{steady.port}:5")
+        self.assertEqual(self.states(server)[0], ("open", 2))
+
+        # While open, the backend is not tried even though it is back
+        flaky.start()
+        self.assertEqual(server.chat(MESSAGES), f"echo:{steady.port}:5")
+        self.assertEqual(flaky.requests, 0)
+
+        # After the cooldown one trial request is let through; success closes it
+        time.sleep(0.35)
+        self.assertEqual(self.states(server)[0], ("half-open", 2))
+        self.assertEqual(server.chat(MESSAGES), f"echo:{flaky.port}:5")
+        self.assertEqual(self.states(server)[0], ("closed", 0))
+
+    def test_failed_half_open_trial_reopens(self) -> None:
+        flaky, steady = self.stub(), self.stub()
+        flaky.stop()
+        server = self.server(flaky, steady, LMSTUDIO_BREAKER_FAILURES="1",
+                             LMSTUDIO_BREAKER_COOLDOWN="0.3")
+        server.chat(MESSAGES)
+        time.sleep(0.35)
+        self.assertEqual(self.states(server)[0], ("half-open", 1))
+        self.assertEqual(server.chat(MESSAGES), f"echo:{steady.port}:5")
+        self.assertEqual(self.states(server)[0], ("open", 2))
+
+    def test_health_probe_opens_and_closes_the_circuit(self) -> None:
+        stub = self.stub(status=500)
+        server = self.server(stub)
+        backend = server._router.backends[0]
+        self.assertFalse(server._router.probe(backend))
+        self.assertEqual(self.states(server), [("open", server.BREAKER_FAILURES)])
+        stub.status = 200
+        self.assertTrue(server._router.probe(backend))
+        self.assertEqual(self.states(server), [("closed", 0)])
+
+    def test_health_checks_survive_an_unexpected_error(self) -> None:
+        stub = self.stub()
+        server = self.server(stub)
+        router = server._router
+        probe, calls = router.probe, []
+
+        def flaky_probe(backend: object) -> bool:
+            calls.append(backend)
+            if len(calls) == 1:
+                raise ValueError("malformed reply")
+            return probe(backend)
+
+        router.probe = flaky_probe
+        router.start_health_checks(interval=0.05)
+        deadline = time.monotonic() + 5
+        while stub.probes < 2 and time.monotonic() < deadline:
+            time.sleep(0.02)
+        self.assertGreaterEqual(stub.probes, 2)
+        self.assertTrue(router._health.is_alive())
+        self.assertEqual(router.snapshot()[0]["last_error"], "health check failed: malformed reply")
+
+
+class AsyncModeTest(ServerTestCase):
+    def gather(self, *calls: object) -> list:
+        async def run() -> list:
+            return await asyncio.gather(*calls, return_exceptions=True)
+        return asyncio.run(run())
+
+    def test_in_flight_chats_never_exceed_the_limit(self) -> None:
+        stub = self.stub(delay=0.2)
+        server = self.server(stub, LMSTUDIO_MCP_ASYNC="1", LMSTUDIO_MAX_INFLIGHT="2")
+        replies = self.gather(*(server.chat_async(MESSAGES) for _ in range(6)))
+        self.assertEqual(replies, [f"echo:{stub.port}:5"] * 6)
+        self.assertEqual((stub.requests, stub.max_outstanding), (6, 2))
+        gate = server._llm_gate.snapshot()
+        self.assertEqual((gate["limit"], gate["in_flight"], gate["completed"]), (2, 0, 6))
+
+    def test_excess_calls_queue_behind_the_gate(self) -> None:
+        stub = self.stub(delay=0.2)
+        server = self.server(stub, LMSTUDIO_MCP_ASYNC="1", LMSTUDIO_MAX_INFLIGHT="1")
+        started = time.perf_counter()
+        self.gather(*(server.chat_async(MESSAGES) for _ in range(3)))
+        self.assertGreaterEqual(time.perf_counter() - started, 0.6)
+        gate = server._llm_gate.snapshot()
+        # The first call takes the free slot at once; the other two wait for it
+        self.assertEqual((gate["queue_depth"], gate["max_queue_depth"]), (0, 2))
+        # The last caller waited for both earlier replies
+        self.assertGreaterEqual(gate["wait_ms_max"], 350)
+
+    def test_pack_context_skips_the_queue(self) -> None:
+        stub = self.stub(delay=0.5)
+        server = self.server(stub, LMSTUDIO_MCP_ASYNC="1", LMSTUDIO_MAX_INFLIGHT="1")
+
+        async def run() -> float:
+            chats = [asyncio.ensure_future(server.chat_async(MESSAGES)) for _ in range(2)]
+            await asyncio.sleep(0.05)
+            started = time.perf_counter()
+            await server.get_pack_context_async()
+            elapsed = time.perf_counter() - started
+            await asyncio.gather(*chats)
+            return elapsed
+
+        self.assertLess(asyncio.run(run()), 0.3)
+
+    def test_worker_errors_reach_the_caller_and_free_the_slot(self) -> None:
+        stub = self.stub(status=500)
+        server = self.server(stub, LMSTUDIO_MCP_ASYNC="1", LMSTUDIO_MAX_INFLIGHT="1")
+        results = self.gather(*(server.chat_async(MESSAGES) for _ in range(2)))
+        for result in results:
+            self.assertIsInstance(result, Exception)
+            self.assertIn("LMStudio request failed", str(result))
+        gate = server._llm_gate.snapshot()
+        self.assertEqual((gate["in_flight"], gate["queue_depth"], gate["completed"]), (0, 0, 2))
+        stub.status = 200
+        self.assertEqual(self.gather(server.chat_async(MESSAGES)), [f"echo:{stub.port}:5"])
+
+
+class ResponseCacheTest(ServerTestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "cache", "responses.sqlite3")
+
+    def cache(self, server: object, **kwargs: object) -> object:
+        return server.ResponseCache(self.path, **kwargs)
+
+    def test_entries_expire_after_the_ttl(self) -> None:
+        server = load_server({"LMSTUDIO_HEALTH_INTERVAL": "0"})
+        cache = self.cache(server, ttl=0.2)
+        cache.put("k", "reply")
+        self.assertEqual(cache.get("k"), "reply")
+        self.assertEqual(self.cache(server, ttl=0.2).get("k"), "reply")
+        time.sleep(0.25)
+        self.assertIsNone(cache.get("k"))
+        reopened = self.cache(server, ttl=0.2)
+        self.assertIsNone(reopened.get("k"))
+        self.assertEqual(reopened.stats()["disk"]["entries"], 0)
+
+    def test_memory_lru_falls_back_to_disk(self) -> None:
+        server = load_server({"LMSTUDIO_HEALTH_INTERVAL": "0"})
+        cache = self.cache(server, entries=2)
+        for key in "abc":
+            cache.put(key, key * 3)
+        self.assertEqual(list(cache._memory), ["b", "c"])
+        self.assertEqual(cache.get("a"), "aaa")
+        self.assertEqual(list(cache._memory), ["c", "a"])
+        self.assertEqual((cache.counts["hits_memory"], cache.counts["hits_disk"]), (0, 1))
+
+    def test_disk_evicts_least_recently_used_past_the_size_limit(self) -> None:
+        server = load_server({"LMSTUDIO_HEALTH_INTERVAL": "0"})
+        cache = self.cache(server, entries=0, max_bytes=12)
+        cache.put("a", "a" * 6)
+        cache.put("b", "b" * 6)
+        time.sleep(0.01)
+        self.assertEqual(cache.get("a"), "a" * 6)      # a is now more recent than b
+        cache.put("c", "c" * 6)
+        self.assertEqual(cache.counts["evictions"], 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual((cache.get("a"), cache.get("c")), ("a" * 6, "c" * 6))
+        self.assertEqual(cache.stats()["disk"]["bytes"], 12)
+
+    def test_only_temperature_zero_is_cached_by_default(self) -> None:
+        stub = self.stub()
+        server = self.server(stub, LMSTUDIO_CACHE="1", LMSTUDIO_CACHE_PATH=self.path)
+        for _ in range(2):
+            server.chat(MESSAGES, temperature=0.7)
+            server.chat(MESSAGES, temperature=0)
+        self.assertEqual(stub.requests, 3)
+        counts = server._cache.counts
+        self.assertEqual((counts["bypassed"], counts["stores"], counts["hits_memory"]), (2, 1, 1))
+
+    def test_per_call_cache_flag_overrides_the_default(self) -> None:
+        stub = self.stub()
+        server = self.server(stub, LMSTUDIO_CACHE="1", LMSTUDIO_CACHE_PATH=self.path)
+        for _ in range(2):
+            server.chat(MESSAGES, temperature=0, cache=False)
+        self.assertEqual((stub.requests, server._cache.counts["stores"]), (2, 0))
+        for _ in range(2):
+            server.chat(MESSAGES, temperature=0.7, cache=True)
+        self.assertEqual((stub.requests, server._cache.counts["hits_memory"]), (3, 1))
+
+    def test_unusable_cache_directory_still_returns_the_reply(self) -> None:
+        stub = self.stub()
+        blocker = os.path.dirname(self.path)
+        os.makedirs(os.path.dirname(blocker), exist_ok=True)
+        with open(blocker, "w", encoding="utf-8"):
+            pass                  # a file where the cache directory should be
+        server = self.server(stub, LMSTUDIO_CACHE="1", LMSTUDIO_CACHE_PATH=self.path)
+        for _ in range(2):
+            self.assertEqual(server.chat(MESSAGES, temperature=0), f"echo:{stub.port}:5")
+        self.assertEqual(stub.requests, 1)           # still answered from memory
+        self.assertEqual(server._cache.counts["errors"], 1)
+
+    def test_reply_from_a_fallback_backend_is_not_cached(self) -> None:
+        down, up = self.stub(), self.stub()
+        down.stop()
+        server = self.server(down, up, LMSTUDIO_CACHE="1", LMSTUDIO_CACHE_PATH=self.path)
+        for _ in range(2):
+            self.assertEqual(server.chat(MESSAGES, temperature=0), f"echo:{up.port}:5")
+        self.assertEqual(up.requests, 2)
+        counts = server._cache.counts
+        self.assertEqual((counts["skipped_fallback"], counts["stores"]), (2, 0))
+
+
+def _entries_by_split(raw: str, boundary: str) -> List[str]:
+    """Every entry of a whole log read at once, oldest first: the reference for the tail read."""
+    starts = [m.start() for m in re.finditer(rf"^{re.escape(boundary)}\s*$", raw, flags=re.MULTILINE)]
+    return [raw[start:end].strip() for start, end in zip(starts, starts[1:] + [len(raw)])]
+
+
+class PackContextTest(unittest.TestCase):
+    PIECES = [
+        "# Header\n",
+        "=== MESSAGE BOUNDARY ===\n",
+        "=== MESSAGE BOUNDARY ===   \n",
+        "Summary: caf\u00e9 \u2713\n",
+        "text mentioning === MESSAGE BOUNDARY === inline\n",
+        "quoted: === MESSAGE BOUNDARY ===\n",
+        "\n",
+        "x" * 90 + "\n",
+    ]
+
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.server = load_server({"LMSTUDIO_HEALTH_INTERVAL": "0"})
+        self.log = os.path.join(tmp.name, "agent_conversation_log.md")
+        self.server.LOG_PATH = self.log
+
+    def tail(self, raw: str, budget: int, block: int = None) -> Tuple[str, int]:
+        with open(self.log, "wb") as f:
+            f.write(raw.encode("utf-8"))
+        self.server._tail_cache.clear()      # rewrites can keep the same mtime and size
+        with mock.patch.object(self.server, "TAIL_BLOCK", block or self.server.TAIL_BLOCK):
+            context = json.loads(self.server.get_pack_context(max_bytes=budget))
+        return context["last_handoff"], context["handoff_entries"]
+
+    def expected(self, raw: str, budget: int) -> Tuple[str, int]:
+        """The newest whole entries of the reference split that fit in ``budget``."""
+        entries = _entries_by_split(raw, self.server.BOUNDARY)
+        picked, used = [], 0
+        for entry in reversed(entries):
+            size = len(entry.encode("utf-8"))
+            if picked and used + size > budget:
+                break
+            if not picked and size > budget:
+                entry = entry.encode("utf-8")[:budget].decode("utf-8", "ignore") + "\n[... truncated]"
+            picked.append(entry)
+            used += size
+        return "\n\n".join(reversed(picked)), len(picked)
+
+    def check_random_logs(self, newline: str, seed: int) -> None:
+        rng = random.Random(seed)
+        for case in range(200):
+            raw = "".join(rng.choice(self.PIECES) for _ in range(rng.randint(0, 14)))
+            raw = raw.replace("\n", newline)
+            block = rng.randint(1, 64)
+            budget = rng.choice([1, 50, 200, 100_000])
+            with self.subTest(case=case, block=block, budget=budget):
+                self.assertEqual(self.tail(raw, budget, block), self.expected(raw, budget))
+
+    def test_entries_match_the_whole_file_split_at_any_block_size(self) -> None:
+        self.check_random_logs("\n", seed=11)
+
+    def test_crlf_logs_match_the_whole_file_split(self) -> None:
+        self.check_random_logs("\r\n", seed=12)
+
+    def test_entry_spanning_a_block_boundary_is_returned_whole(self) -> None:
+        entries = [f"=== MESSAGE BOUNDARY ===\nSummary: entry {i}\n" + "y" * 40 for i in range(6)]
+        raw = "# Header\n\n" + "\n\n".join(entries) + "\n"
+        for block in range(1, len(raw) + 2):
+            with self.subTest(block=block):
+                text, count = self.tail(raw, 10_000, block)
+                self.assertEqual(count, 6)
+                self.assertEqual(text.split("\n\n"), [e.strip() for e in entries])
+
+    def test_log_shorter_than_one_block(self) -> None:
+        raw = "# Header\n\n=== MESSAGE BOUNDARY ===\nSummary: only\n"
+        self.assertLess(len(raw), self.server.TAIL_BLOCK)
+        self.assertEqual(self.tail(raw, 10_000), ("=== MESSAGE BOUNDARY ===\nSummary: only", 1))
+        self.assertEqual(self.tail("# Header only\n", 10_000), ("", 0))
+
+
+class CompactionTest(ServerTestCase):
+    SYSTEM = {"role": "system", "content": "You are a careful reviewer. " * 40}
+
+    def history(self, turns: int, size: int) -> List[dict]:
+        messages = []
+        for i in range(turns):
+            messages.append({"role": "user", "content": f"question {i} " + "q" * size})
+            messages.append({"role": "assistant", "content": f"answer {i} " + "a" * size})
+        return messages
+
+    def test_without_a_window_the_prompt_is_unchanged(self) -> None:
+        server = load_server({"LMSTUDIO_HEALTH_INTERVAL": "0"})
+        last = {"role": "user", "content": "x" * 100_000}
+        messages = [self.SYSTEM] + self.history(20, 2000) + [self.SYSTEM, last]
+        out, stats = server.compact_messages(messages)
+        self.assertIsNone(stats["budget"])
+        self.assertEqual((stats["deduplicated"], stats["dropped"], stats["truncated"]), (0, 0, 0))
+        self.assertEqual(out, messages)
+
+    def test_prompt_within_the_budget_is_not_deduplicated(self) -> None:
+        server = load_server({"LMSTUDIO_HEALTH_INTERVAL": "0", "LMSTUDIO_CONTEXT_TOKENS": "8192"})
+        repeat = {"role": "user", "content": "r" * 400}
+        messages = [self.SYSTEM, repeat, {"role": "assistant", "content": "ok"}, self.SYSTEM, repeat]
+        out, stats = server.compact_messages(messages)
+        self.assertLessEqual(stats["tokens_before"], stats["budget"])
+        self.assertEqual((out, stats["deduplicated"], stats["saved"]), (messages, 0, 0))
+
+    def test_over_budget_repeats_are_removed_before_anything_is_cut(self) -> None:
+        server = load_server({"LMSTUDIO_HEALTH_INTERVAL": "0", "LMSTUDIO_CONTEXT_TOKENS": "2048"})
+        history = self.history(3, 400)
+        messages = [self.SYSTEM] + history + [self.SYSTEM] + history + [{"role": "user", "content": "?"}]
+        out, stats = server.compact_messages(messages, max_tokens=512)
+        self.assertGreater(stats["tokens_before"], stats["budget"])
+        self.assertLessEqual(stats["tokens_after"], stats["budget"])
+        self.assertEqual((stats["deduplicated"], stats["dropped"], stats["truncated"]), (7, 0, 0))
+        self.assertEqual(out[0], self.SYSTEM)
+        self.assertEqual(out[7:], history + [messages[-1]])
+
+    def test_window_drops_oldest_turns_but_keeps_system_and_last(self) -> None:
+        server = load_server({"LMSTUDIO_HEALTH_INTERVAL": "0", "LMSTUDIO_CONTEXT_TOKENS": "2048"})
+        messages = [self.SYSTEM] + self.history(20, 400) + [{"role": "user", "content": "and now?"}]
+        out, stats = server.compact_messages(messages, max_tokens=512)
+        self.assertEqual(stats["budget"], 1536)
+        self.assertLessEqual(stats["tokens_after"], 1536)
+        self.assertGreater(stats["dropped"], 0)
+        self.assertEqual(stats["saved"], stats["tokens_before"] - stats["tokens_after"])
+        self.assertEqual(out[0], self.SYSTEM)
+        self.assertEqual(out[1]["role"], "user")
+        self.assertEqual(out[-1], messages[-1])
+        self.assertEqual(out[1:-1], messages[-1 - (len(out) - 2):-1])
+
+    def test_oversized_earlier_message_is_truncated_before_turns_are_dropped(self) -> None:
+        server = load_server({"LMSTUDIO_HEALTH_INTERVAL": "0", "LMSTUDIO_MODEL": "small",
+                              "LMSTUDIO_MODEL_BUDGETS": '{"small": 4096}'})
+        pasted = {"role": "user", "content": "HEAD" + "c" * 40_000 + "TAIL"}
+        messages = [self.SYSTEM] + self.history(2, 200) + [pasted] + self.history(2, 200)
+        messages.append({"role": "user", "content": "what changed?"})
+        out, stats = server.compact_messages(messages)
+        self.assertEqual((stats["truncated"], stats["dropped"]), (1, 0))
+        self.assertLessEqual(stats["tokens_after"], stats["budget"])
+        self.assertEqual(len(out), len(messages))
+        kept = out[5]["content"]
+        self.assertTrue(kept.startswith("HEAD") and kept.endswith("TAIL"))
+        self.assertIn("truncated to fit the context budget", kept)
+        self.assertEqual(pasted["content"][-4:], "TAIL")     # the caller's list is untouched
+        self.assertEqual(len(pasted["content"]), 40_008)
+
+    def test_system_prompt_and_last_message_are_never_truncated(self) -> None:
+        server = load_server({"LMSTUDIO_HEALTH_INTERVAL": "0", "LMSTUDIO_CONTEXT_TOKENS": "1024"})
+        system = {"role": "system", "content": "s" * 8000}
+        last = {"role": "user", "content": "l" * 8000}
+        messages = [system] + self.history(3, 2000) + [last]
+        out, stats = server.compact_messages(messages)
+        self.assertEqual(out, [system, last])
+        self.assertEqual(stats["dropped"], 6)
+        self.assertGreater(stats["tokens_after"], stats["budget"])
+
+    def test_truncate_keeps_head_and_tail_when_excess_exceeds_message(self) -> None:
+        server = load_server({"LMSTUDIO_HEALTH_INTERVAL": "0"})
+        message = {"role": "user", "content": "A" * 1000 + "B" * 1000}
+        server._truncate(message, excess_tokens=10_000)
+        half = server.TRUNCATE_KEEP_CHARS // 2
+        self.assertEqual(message["content"], "A" * half + server.TRUNCATE_MARKER + "B" * half)
+
+    def test_chat_sends_the_compacted_prompt(self) -> None:
+        stub = self.stub()
+        server = self.server(stub, LMSTUDIO_CONTEXT_TOKENS="1024")
+        pack = '{\n  "task": "' + "t" * 600 + '"\n}'
+        messages = [self.SYSTEM, {"role": "user", "content": pack + " first"}, self.SYSTEM,
+                    {"role": "user", "content": pack + " second"}]
+        server.chat(messages)
+        sent = stub.last_request["messages"]
+        self.assertEqual([m["role"] for m in sent], ["system", "user", "user"])
+        self.assertIn("older PACK context omitted", sent[1]["content"])
+        self.assertEqual(sent[2]["content"], pack + " second")
+        snapshot = server._compaction.snapshot()
+        self.assertEqual(snapshot["calls"], 1)
+        self.assertGreater(snapshot["tokens_saved"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+"""Stress test for concurrent appends under LogLock.
+
+By default 64 processes append 10,000 distinct entries to one log, and the
+log must parse back into exactly 10,000 well-formed entries with a matching
+sidecar index. Scale it with LOG_STRESS_PROCESSES and LOG_STRESS_ENTRIES.
+"""
+
+import multiprocessing
+import os
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+import update_agent_conversation_log as ucl
+
+PROCESSES = int(os.environ.get("LOG_STRESS_PROCESSES", "64"))
+ENTRIES = int(os.environ.get("LOG_STRESS_ENTRIES", "10000"))
+BOUNDARY = ucl.DEFAULT_BOUNDARY
+
+
+def _writer(log_path: str, worker: int, count: int) -> None:
+    path = Path(log_path)
+    for i in range(count):
+        entry = ucl.ConversationEntry(
+            summary=f"worker {worker} entry {i}", agent=f"agent{worker}", role="assistant",
+        )
+        ucl.write_entries(path, [entry], project="stress", lock_timeout=120)
+
+
+class ConcurrentAppendTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.log = Path(self.tmp.name) / "agent_conversation_log.md"
+
+    @unittest.skipIf(ucl.fcntl is None, "advisory locking needs fcntl")
+    def test_parallel_writers_produce_exact_entries(self) -> None:
+        shares = [ENTRIES // PROCESSES + (1 if i < ENTRIES % PROCESSES else 0)
+                  for i in range(PROCESSES)]
+        workers = [
+            multiprocessing.Process(target=_writer, args=(str(self.log), i, share))
+            for i, share in enumerate(shares)
+        ]
+        for proc in workers:
+            proc.start()
+        for proc in workers:
+            proc.join()
+        self.assertEqual([proc.exitcode for proc in workers], [0] * PROCESSES)
+
+        entries = list(ucl.iter_log_entries(self.log, BOUNDARY))
+        self.assertEqual(len(entries), ENTRIES)
+        summaries = {logged.entry.summary for logged in entries}
+        self.assertEqual(len(summaries), ENTRIES)
+        for logged in entries:
+            self.assertRegex(logged.entry.summary, r"^worker \d+ entry \d+$")
+            self.assertEqual(logged.project, "stress")
+
+        records = list(ucl.iter_index(self.log))
+        self.assertEqual(len(records), ENTRIES)
+        self.assertEqual([r.offset for r in records], [e.offset for e in entries])
+
+    @unittest.skipIf(ucl.fcntl is None, "advisory locking needs fcntl")
+    def test_lock_wait_is_bounded(self) -> None:
+        with ucl.LogLock(self.log):
+            start = time.monotonic()
+            with self.assertRaises(SystemExit):
+                with ucl.LogLock(self.log, timeout=0.2):
+                    pass
+            self.assertLess(time.monotonic() - start, 2.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+"""Tests for skills.py search and its persistent index."""
+
+import contextlib
+import io
+import os
+import shutil
+import stat
+import tempfile
+import unittest
+from pathlib import Path
+from typing import List
+
+import skills
+
+
+def _skill_text(name: str, description: str, body: str) -> str:
+    return (
+        f"---\nname: {name}\ndescription: {description}\n"
+        f"metadata:\n  short-description: {description}\n---\n\n# {name}\n\n{body}\n"
+    )
+
+
+class SkillIndexTest(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = Path(tmp.name) / "skills"
+        self.index_path = Path(tmp.name) / ".cache" / "skills_index.json"
+        self.write("deploy-kit", "Deploy the agent kit into a repository", "Copies files and updates gitignore.")
+        self.write("log-update", "Append a handoff entry", "Writes the conversation log for the next agent.")
+        self.write("gemini-audit", "Audit a plan with Gemini", "Runs the auditor persona on the plan.")
+
+    def write(self, key: str, description: str, body: str, name: str = "") -> Path:
+        path = self.root / key / "SKILL.md"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(_skill_text(name or key, description, body), encoding="utf-8")
+        return path
+
+    def index(self) -> skills.SkillIndex:
+        """Load, refresh and save, as each search does."""
+        index = skills.SkillIndex.load(self.index_path)
+        if index.refresh(self.root):
+            index.save(self.index_path)
+        return index
+
+    def search(self, query: str) -> List[str]:
+        return [key for key, _ in skills.SkillIndex.load(self.index_path).search(query)]
+
+    def test_only_changed_skills_are_reindexed(self) -> None:
+        self.assertEqual((self.index().updated, self.index().updated), (3, 0))
+
+        path = self.write("log-update", "Append a handoff entry", "Rotates segments monthly.")
+        index = self.index()
+        self.assertEqual((index.updated, index.removed), (1, 0))
+        self.assertEqual(self.search("rotates"), ["log-update"])
+        self.assertEqual(self.search("conversation"), [])
+
+        # Same size and text, newer mtime: re-indexed too
+        stamp = path.stat().st_mtime + 5
+        os.utime(path, (stamp, stamp))
+        self.assertEqual(self.index().updated, 1)
+        self.assertEqual(self.search("deploy"), ["deploy-kit"])
+
+    def test_removed_skills_leave_the_index(self) -> None:
+        self.index()
+        shutil.rmtree(self.root / "gemini-audit")
+        index = self.index()
+        self.assertEqual((index.updated, index.removed), (0, 1))
+        self.assertNotIn("gemini-audit", index.skills)
+        self.assertEqual(self.search("gemini"), [])
+        self.assertNotIn("auditor", skills.SkillIndex.load(self.index_path).tokens)
+
+    def test_torn_save_is_detected_and_rebuilt(self) -> None:
+        self.index()
+        old_json = self.index_path.read_text(encoding="utf-8")
+        self.write("deploy-kit", "Deploy the agent kit", "Now with reflinks.")
+        self.index()
+        # A save interrupted between the postings and the JSON file
+        self.index_path.write_text(old_json, encoding="utf-8")
+        self.assertEqual(skills.SkillIndex.load(self.index_path).skills, {})
+
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            skills._cmd_search(self.root, self.index_path, "reflinks", names_only=True)
+        self.assertEqual(out.getvalue(), "deploy-kit\n")
+        self.assertEqual(len(skills.SkillIndex.load(self.index_path).skills), 3)
+
+    def test_every_term_must_match(self) -> None:
+        self.index()
+        self.assertEqual(sorted(self.search("agent")), ["deploy-kit", "log-update"])
+        self.assertEqual(self.search("agent kit"), ["deploy-kit"])
+        self.assertEqual(self.search("agent auditor"), [])
+        self.assertEqual(self.search("aud"), ["gemini-audit"])      # prefixes match
+
+    def test_name_and_description_outrank_the_body(self) -> None:
+        self.write("session-notes", "Keep session notes", "Before a rollout, read the rollout checklist. "
+                   "A rollout needs the rollout owner to sign off on the rollout.")
+        self.write("rollout", "Roll out a release", "Follow the steps.")
+        self.index()
+        self.assertEqual(self.search("rollout"), ["rollout", "session-notes"])
+
+    def test_index_files_get_the_default_file_mode(self) -> None:
+        self.index()
+        plain = self.index_path.with_name("plain.txt")
+        plain.write_text("", encoding="utf-8")          # created as open() does, under the umask
+        for path in (self.index_path, self.index_path.with_suffix(".postings")):
+            with self.subTest(path=path.name):
+                self.assertEqual(stat.S_IMODE(path.stat().st_mode), stat.S_IMODE(plain.stat().st_mode))
+
+
+if __name__ == "__main__":
+    unittest.main()
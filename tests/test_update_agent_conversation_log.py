@@ -0,0 +1,440 @@
+"""Tests for update_agent_conversation_log.py."""
+
+import contextlib
+import io
+import json
+import random
+import re
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Optional
+from unittest import mock
+
+import update_agent_conversation_log as ucl
+
+BOUNDARY = ucl.DEFAULT_BOUNDARY
+
+
+def _last_entry_by_split(raw: str, boundary: str) -> Optional[str]:
+    """The whole-file extractor tail-seeking replaced, kept as a reference."""
+    if not raw.strip():
+        return None
+    parts = re.split(rf"^{re.escape(boundary)}\s*$", raw, flags=re.MULTILINE)
+    for part in reversed(parts):
+        if part.strip():
+            return part.strip()
+    return None
+
+
+def _entry(summary: str, agent: str = "builder") -> ucl.ConversationEntry:
+    return ucl.ConversationEntry(
+        summary=summary,
+        agent=agent,
+        role="assistant",
+        timestamp=datetime(2026, 1, 1, tzinfo=timezone.utc),
+    )
+
+
+class TailSeekTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.log = Path(self.tmp.name) / "log.md"
+
+    def test_tail_matches_whole_file_split(self) -> None:
+        rng = random.Random(7)
+        pieces = [
+            "# Header\n",
+            f"{BOUNDARY}\n",
+            f"{BOUNDARY}   \n",
+            "Summary: a\n",
+            "text mentioning === MESSAGE BOUNDARY === inline\n",
+            "\n",
+            "   \n",
+            "x" * 90 + "\n",
+        ]
+        for case in range(300):
+            raw = "".join(rng.choice(pieces) for _ in range(rng.randint(0, 12)))
+            if rng.random() < 0.3:
+                raw = raw.rstrip("\n")
+            self.log.write_bytes(raw.encode("utf-8"))
+            block = rng.randint(1, 64)
+            with mock.patch.object(ucl, "TAIL_BLOCK_SIZE", block):
+                tail = ucl._read_log_tail(self.log, BOUNDARY)
+            with self.subTest(case=case, block=block):
+                self.assertEqual(tail.last_entry, _last_entry_by_split(raw, BOUNDARY))
+                self.assertEqual(tail.has_content, bool(raw.strip()))
+                self.assertEqual(tail.ends_with_newline, not raw or raw.endswith("\n"))
+
+    def test_duplicate_of_last_entry_is_skipped(self) -> None:
+        first = ucl.write_entries(self.log, [_entry("one")], lock=False)
+        again = ucl.write_entries(self.log, [_entry("one")], lock=False)
+        forced = ucl.write_entries(self.log, [_entry("one")], lock=False, force=True)
+        self.assertEqual((len(first.appended), len(again.skipped), len(forced.appended)), (1, 1, 1))
+
+    def test_appends_match_single_writes_layout(self) -> None:
+        self.log.write_text("# Log\nno trailing newline", encoding="utf-8")
+        ucl.write_entries(self.log, [_entry("one"), _entry("two")], lock=False)
+        text = self.log.read_text(encoding="utf-8")
+        self.assertTrue(text.startswith(f"# Log\nno trailing newline\n\n{BOUNDARY}\n"))
+        self.assertIn(f"Summary: one\n\n\n{BOUNDARY}\n", text)
+        self.assertEqual([e.entry.summary for e in ucl.iter_log_entries(self.log, BOUNDARY)],
+                         ["one", "two"])
+
+
+class IndexTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.log = Path(self.tmp.name) / "log.md"
+        self.index = ucl._index_path(self.log)
+
+    def append(self, *summaries: str) -> None:
+        ucl.write_entries(self.log, [_entry(s) for s in summaries], lock=False)
+
+    @staticmethod
+    def located(records: list) -> list:
+        # An appended record ends at its own entry; a scanned one also covers
+        # the blank line before the next boundary. Both read the same entry.
+        return [(r.offset, r.timestamp, r.agent, r.role, r.status, r.tags) for r in records]
+
+    def fresh_records(self) -> list:
+        """The records a from-scratch scan of the log produces."""
+        with self.log.open("rb") as handle:
+            return self.located([ucl.IndexRecord.from_raw(offset, raw, BOUNDARY)
+                                 for offset, raw in ucl.iter_entries_forward(handle, BOUNDARY)])
+
+    def assertIndexMatchesLog(self) -> None:
+        ucl.sync_index(self.log, BOUNDARY)
+        records = list(ucl.iter_index(self.log))
+        self.assertEqual(self.located(records), self.fresh_records())
+        self.assertEqual([ucl.read_entry_at(self.log, r, BOUNDARY) for r in records],
+                         [e.text for e in ucl.iter_log_entries(self.log, BOUNDARY)])
+
+    def test_index_matches_log_after_appends(self) -> None:
+        self.log.write_text("# Log\n", encoding="utf-8")
+        self.append("one")
+        self.append("two", "three")
+        records = list(ucl.iter_index(self.log))
+        self.assertEqual(len(records), 3)
+        self.assertEqual(self.located(records), self.fresh_records())
+        self.assertIndexMatchesLog()
+
+    def test_hand_appended_entries_are_indexed_incrementally(self) -> None:
+        self.append("one")
+        with self.log.open("a", encoding="utf-8") as out:
+            out.write(f"\n{BOUNDARY}\nAgent: human\n\nSummary: by hand\n")
+        with mock.patch.object(ucl, "rebuild_index") as rebuild:
+            ucl.sync_index(self.log, BOUNDARY)
+        rebuild.assert_not_called()
+        self.assertEqual([r.agent for r in ucl.iter_index(self.log)], ["builder", "human"])
+
+    def test_torn_index_is_rebuilt(self) -> None:
+        self.append("one", "two", "three")
+        data = self.index.read_bytes()
+        self.index.write_bytes(data[:-10])         # cut mid-record
+        self.assertIndexMatchesLog()
+
+    def test_index_missing_records_catches_up(self) -> None:
+        self.append("one", "two", "three")
+        lines = self.index.read_text(encoding="utf-8").splitlines(keepends=True)
+        self.index.write_text("".join(lines[:1]), encoding="utf-8")
+        self.assertIndexMatchesLog()
+        self.index.write_text("", encoding="utf-8")
+        self.assertIndexMatchesLog()
+        self.index.unlink()
+        self.assertIndexMatchesLog()
+
+    def test_stale_index_for_a_rewritten_log_is_rebuilt(self) -> None:
+        self.append("one", "two")
+        # Same entries shifted by a longer header: the old offsets now point mid-entry
+        self.log.write_bytes(b"# A much longer log header than before\n\n" + self.log.read_bytes())
+        self.assertIndexMatchesLog()
+        # A shorter log than the index covers
+        self.log.write_text(f"{BOUNDARY}\nSummary: x\n", encoding="utf-8")
+        self.assertIndexMatchesLog()
+
+    def test_rebuild_replaces_the_index_atomically(self) -> None:
+        self.append("one", "two")
+        before = self.index.read_bytes()
+        with mock.patch.object(ucl.os, "replace", side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                ucl.rebuild_index(self.log, BOUNDARY)
+        self.assertEqual(self.index.read_bytes(), before)
+        self.assertEqual(sorted(p.name for p in self.log.parent.iterdir()),
+                         ["log.md", "log.md.idx"])
+        self.assertEqual(ucl.rebuild_index(self.log, BOUNDARY), 2)
+        self.assertEqual(self.index.stat().st_mode & 0o777, ucl.INDEX_MODE)
+
+
+class QueryTest(unittest.TestCase):
+    AGENTS = ("builder", "reviewer", "gemini_auditor")
+    START = datetime(2026, 10, 1, tzinfo=timezone.utc)
+
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.log = Path(self.tmp.name) / "log.md"
+        self.log.write_text("# Handoffs\n", encoding="utf-8")
+        rng = random.Random(3)
+        entries = []
+        for i in range(60):
+            entries.append(ucl.ConversationEntry(
+                summary=f"entry {i}",
+                agent=self.AGENTS[i % 3],
+                role=rng.choice(("assistant", "reviewer")),
+                handoff=rng.choice((None, "human", "builder")),
+                status=rng.choice(("ready", "blocked")),
+                context=rng.choice((None, "bugfix")),
+                tags=rng.sample(["api", "docs", "auth"], rng.randint(0, 2)),
+                details="line one\nline two" if i % 5 == 0 else "",
+                timestamp=self.START + timedelta(hours=i),
+            ))
+        ucl.write_entries(self.log, entries[:40], lock=False)
+        ucl.write_entries(self.log, entries[40:], lock=False)
+
+    def query(self, *args: str) -> list:
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            ucl.main(["query", "--logfile", str(self.log), "--format", "jsonl", *args])
+        return [json.loads(line) for line in out.getvalue().splitlines()]
+
+    def summaries(self, *args: str) -> list:
+        return [r["summary"] for r in self.query(*args)]
+
+    def test_agent_filter(self) -> None:
+        self.assertEqual(self.summaries("--agent", "Gemini_Auditor"),
+                         [f"entry {i}" for i in range(2, 60, 3)])
+
+    def test_time_range_is_inclusive(self) -> None:
+        self.assertEqual(
+            self.summaries("--since", "2026-10-01T05:00:00Z", "--until", "2026-10-01T08:00:00"),
+            ["entry 5", "entry 6", "entry 7", "entry 8"],
+        )
+        self.assertEqual(self.summaries("--since", "2026-10-03T11:00:00+02:00"), ["entry 57", "entry 58", "entry 59"])
+
+    def test_tags_must_all_match(self) -> None:
+        records = self.query("--tag", "api", "--tag", "DOCS")
+        self.assertTrue(records)
+        for record in records:
+            self.assertLessEqual({"api", "docs"}, set(record["tags"]))
+
+    def test_records_round_trip(self) -> None:
+        first = self.query("--limit", "1")[0]
+        self.assertEqual(first["summary"], "entry 0")
+        self.assertEqual(first["details"], "line one\nline two")
+        self.assertEqual(first["timestamp"], "2026-10-01T00:00:00Z")
+        self.assertEqual(first["offset"], len("# Handoffs\n\n"))
+
+    def test_newest_first_limit_stops_early(self) -> None:
+        parsed = []
+        parse_entry = ucl.parse_entry
+
+        def counting_parse(text: str) -> object:
+            parsed.append(text)
+            return parse_entry(text)
+
+        with mock.patch.object(ucl, "parse_entry", counting_parse):
+            found = self.summaries("--agent", "builder", "--newest-first", "--limit", "2")
+        self.assertEqual(found, ["entry 57", "entry 54"])
+        self.assertEqual(len(parsed), 6)
+        self.assertEqual(self.summaries("--limit", "0"), [])
+
+    def test_markdown_output_is_the_entry_text(self) -> None:
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            ucl.main(["query", "--logfile", str(self.log), "--newest-first", "--limit", "2"])
+        texts = [e.text for e in ucl.iter_log_entries(self.log, BOUNDARY)][-2:]
+        self.assertEqual(out.getvalue(), f"{BOUNDARY}\n{texts[1]}\n\n{BOUNDARY}\n{texts[0]}\n")
+
+    def test_index_backed_selection_matches_the_full_scan(self) -> None:
+        rng = random.Random(11)
+        for case in range(40):
+            filters = {
+                "agent": rng.choice((None,) + self.AGENTS),
+                "role": rng.choice((None, "assistant", "reviewer")),
+                "handoff": rng.choice((None, "human", "builder")),
+                "status": rng.choice((None, "ready", "blocked")),
+                "tag": rng.choice((None, "api", "docs", "auth")),
+            }
+            last = rng.choice((None, 1, 3, 100))
+            args = [part for key, value in filters.items() if value is not None
+                    for part in (f"--{key}", value)]
+            matched = set(self.summaries(*args))
+            scanned = [e.text for e in ucl.iter_log_entries(self.log, BOUNDARY)
+                       if e.entry.summary in matched]
+            if last is not None:
+                scanned = scanned[-last:]
+            with self.subTest(case=case, filters=filters, last=last):
+                self.assertEqual(ucl.select_entries(self.log, BOUNDARY, last=last, **filters), scanned)
+
+
+class BatchTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.log = Path(self.tmp.name) / "log.md"
+        self.batch = Path(self.tmp.name) / "batch.jsonl"
+
+    def run_batch(self, *records: object) -> str:
+        self.batch.write_text(
+            "".join((r if isinstance(r, str) else json.dumps(r)) + "\n" for r in records),
+            encoding="utf-8",
+        )
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            ucl.main(["--batch", str(self.batch), "--logfile", str(self.log)])
+        return out.getvalue()
+
+    def summaries(self) -> list:
+        return [e.entry.summary for e in ucl.iter_log_entries(self.log, BOUNDARY)]
+
+    def test_records_become_entries(self) -> None:
+        self.run_batch(
+            {"agent": "builder", "summary": "one", "handoff": "reviewer", "tags": "api",
+             "tasks": ["check it", "check it"], "timestamp": "2026-01-02T03:04:05Z"},
+            "",
+            {"agent": "reviewer", "summary": "two", "status": "blocked", "details": "  a\n  b"},
+        )
+        first, second = (e.entry for e in ucl.iter_log_entries(self.log, BOUNDARY))
+        self.assertEqual((first.handoff, first.tags, first.tasks), ("reviewer", ["api"], ["check it"]))
+        self.assertEqual(first.timestamp, datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc))
+        self.assertEqual((second.status, second.details), ("blocked", "a\nb"))
+        self.assertEqual(len(list(ucl.iter_index(self.log))), 2)
+
+    def test_invalid_record_rejects_the_batch_with_its_line(self) -> None:
+        valid = {"agent": "builder", "summary": "one"}
+        cases = {
+            "{not json": "line 2",
+            json.dumps(["a list"]): "line 2: expected a JSON object",
+            json.dumps({"agent": "builder"}): "line 2: missing required field 'summary'",
+            json.dumps(dict(valid, timestamp=1700000000)): "line 2: invalid timestamp 1700000000",
+            json.dumps(dict(valid, timestamp="yesterday")): "line 2: invalid timestamp 'yesterday'",
+            json.dumps(dict(valid, tags=5)): "line 2: 'tags' must be a string or a list",
+        }
+        for bad, message in cases.items():
+            with self.subTest(record=bad):
+                with self.assertRaises(SystemExit) as caught:
+                    self.run_batch(valid, bad, dict(valid, summary="three"))
+                self.assertIn(message, str(caught.exception))
+                self.assertFalse(self.log.exists())
+
+    def test_duplicates_within_a_batch_are_skipped(self) -> None:
+        entry = {"agent": "builder", "summary": "one", "timestamp": "2026-01-01T00:00:00Z"}
+        two = dict(entry, summary="two")
+        out = self.run_batch(entry, entry, two, entry)
+        self.assertEqual(self.summaries(), ["one", "two"])
+        self.assertIn("Appended 2 entries (2 duplicates skipped)", out)
+        # The last logged entry counts as seen for the next batch; older ones do not
+        self.run_batch(two, entry)
+        self.assertEqual(self.summaries(), ["one", "two", "one"])
+
+    def test_one_lock_covers_the_whole_batch(self) -> None:
+        acquired = []
+        real_enter = ucl.LogLock.__enter__
+
+        def counting_enter(lock: ucl.LogLock) -> ucl.LogLock:
+            acquired.append(lock.path)
+            return real_enter(lock)
+
+        appends = []
+        real_open = Path.open
+
+        def tracking_open(path: Path, mode: str = "r", *args: object, **kwargs: object):
+            if path == self.log and "a" in mode:
+                appends.append(mode)
+            return real_open(path, mode, *args, **kwargs)
+
+        records = [{"agent": "builder", "summary": f"entry {i}"} for i in range(50)]
+        with mock.patch.object(ucl.LogLock, "__enter__", counting_enter), \
+                mock.patch.object(Path, "open", tracking_open):
+            self.run_batch(*records)
+        self.assertEqual(len(acquired), 1)
+        self.assertEqual(len(appends), 1)
+        self.assertEqual(len(self.summaries()), 50)
+
+
+class RotationTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.log = Path(self.tmp.name) / "agent_conversation_log.md"
+        self.log.write_text("# Handoffs\n", encoding="utf-8")
+
+    def append(self, summary: str, when: datetime = datetime(2025, 3, 1, tzinfo=timezone.utc)):
+        entry = ucl.ConversationEntry(summary=summary, agent="builder", role="assistant",
+                                      timestamp=when)
+        return ucl.write_entries(self.log, [entry], lock=False)
+
+    def summaries(self, newest_first: bool = False) -> list:
+        return [e.entry.summary
+                for e in ucl.iter_log_entries(self.log, BOUNDARY, newest_first=newest_first)]
+
+    def test_size_rotation_seals_and_reads_as_one_log(self) -> None:
+        ucl.configure_rotation(self.log, rotate="size", max_bytes=300)
+        sealed = [self.append(f"entry {i}").sealed for i in range(10)]
+        manifest = ucl.load_manifest(self.log)
+        self.assertEqual([i.name for i in sealed if i], [s.name for s in manifest.segments])
+        self.assertGreaterEqual(len(manifest.segments), 3)
+        self.assertEqual(manifest.segments[0].name, "agent_conversation_log.2025-03.md")
+        self.assertEqual(manifest.segments[1].name, "agent_conversation_log.2025-03-2.md")
+        for info in manifest.segments:
+            segment = self.log.with_name(info.name)
+            self.assertTrue(segment.read_text(encoding="utf-8").startswith("# Handoffs\n"))
+            self.assertEqual(info.bytes, segment.stat().st_size)
+            self.assertEqual(info.entries, len(list(ucl.iter_index(segment))))
+            self.assertEqual((info.first, info.last), ("2025-03-01T00:00:00Z",) * 2)
+        self.assertEqual(sum(i.entries for i in manifest.segments) + len(list(ucl.iter_index(self.log))), 10)
+        self.assertEqual(self.summaries(), [f"entry {i}" for i in range(10)])
+        self.assertEqual(self.summaries(newest_first=True), [f"entry {i}" for i in reversed(range(10))])
+        self.assertEqual(len(ucl.select_entries(self.log, BOUNDARY, agent="builder")), 10)
+
+    def test_compressed_segments_round_trip(self) -> None:
+        ucl.configure_rotation(self.log, rotate="size", max_bytes=300, compress=True)
+        for i in range(10):
+            self.append(f"entry {i}")
+        manifest = ucl.load_manifest(self.log)
+        self.assertTrue(manifest.segments)
+        for info in manifest.segments:
+            self.assertTrue(info.compressed)
+            self.assertTrue(info.name.endswith(".md.gz"))
+            plain = self.log.with_name(info.name[:-3])
+            self.assertFalse(plain.exists())
+            self.assertFalse(ucl._index_path(plain).exists())
+            with ucl.gzip.open(self.log.with_name(info.name), "rt", encoding="utf-8") as handle:
+                self.assertEqual(handle.read().count(BOUNDARY), info.entries)
+        self.assertEqual(self.summaries(), [f"entry {i}" for i in range(10)])
+        self.assertEqual(self.summaries(newest_first=True), [f"entry {i}" for i in reversed(range(10))])
+        self.assertEqual(
+            [t.rsplit("Summary: ", 1)[1] for t in ucl.select_entries(self.log, BOUNDARY, last=4)],
+            ["entry 6", "entry 7", "entry 8", "entry 9"],
+        )
+
+    def test_monthly_rotation_names_the_months_a_legacy_log_spans(self) -> None:
+        for month in (8, 9, 10):
+            self.append(f"month {month}", datetime(2025, month, 5, tzinfo=timezone.utc))
+        ucl.configure_rotation(self.log, rotate="monthly")
+        result = self.append("now", datetime.now(timezone.utc))
+        self.assertEqual(result.sealed.name, "agent_conversation_log.2025-08_2025-10.md")
+        self.assertEqual((result.sealed.first, result.sealed.last),
+                         ("2025-08-05T00:00:00Z", "2025-10-05T00:00:00Z"))
+        self.assertIsNone(self.append("later", datetime.now(timezone.utc)).sealed)
+        self.assertEqual(self.summaries(), ["month 8", "month 9", "month 10", "now", "later"])
+
+    def test_duplicate_right_after_rotation_is_skipped(self) -> None:
+        for compress in (False, True):
+            with self.subTest(compress=compress):
+                self.log.write_text("# Handoffs\n", encoding="utf-8")
+                ucl.configure_rotation(self.log, rotate="size", max_bytes=100, compress=compress)
+                self.append(f"same {compress}")
+                again = self.append(f"same {compress}")
+                self.assertIsNotNone(again.sealed)
+                self.assertEqual(len(again.skipped), 1)
+                self.assertEqual(self.summaries().count(f"same {compress}"), 1)
+                self.assertEqual(len(self.append(f"other {compress}").appended), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()